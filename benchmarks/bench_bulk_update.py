@@ -0,0 +1,81 @@
+"""
+Write-throughput benchmark for bulk node updates.
+
+Compares the legacy ``AFTER UPDATE`` trigger (which issued a second UPDATE
+per modified row to maintain ``updated_at``) with setting ``updated_at``
+inline in the same statement, as ``DocumentDatabase`` now does.
+
+Usage:
+    python benchmarks/bench_bulk_update.py [--rows 100000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# Add the src directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from doc_manager.database import DocumentDatabase
+
+
+LEGACY_TRIGGER = """
+    CREATE TRIGGER update_{table}_timestamp 
+    AFTER UPDATE ON {table}
+    BEGIN
+        UPDATE {table} 
+        SET updated_at = CURRENT_TIMESTAMP 
+        WHERE id = NEW.id;
+    END
+"""
+
+
+def populate(db: DocumentDatabase, document_name: str, rows: int) -> str:
+    """Create a document table holding ``rows`` flat nodes."""
+    table_name = db.create_document(document_name, document_name)
+    with db.get_connection() as conn:
+        conn.executemany(
+            f"INSERT INTO {table_name} (title, node_type, level, sort_order) "
+            f"VALUES (?, 'section', 2, ?)",
+            ((f"Node {i}", i) for i in range(rows))
+        )
+        conn.commit()
+    return table_name
+
+
+def time_bulk_update(db: DocumentDatabase, table_name: str, inline: bool) -> float:
+    """Time a single UPDATE touching every row of the table."""
+    touch = ", updated_at = CURRENT_TIMESTAMP" if inline else ""
+    with db.get_connection() as conn:
+        start = time.perf_counter()
+        conn.execute(f"UPDATE {table_name} SET level = level + 1{touch}")
+        conn.commit()
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000, help="Rows to update")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DocumentDatabase(os.path.join(tmp, "bench.db"))
+
+        legacy_table = populate(db, "legacy", args.rows)
+        with db.get_connection() as conn:
+            conn.execute(LEGACY_TRIGGER.format(table=legacy_table))
+            conn.commit()
+        inline_table = populate(db, "inline", args.rows)
+
+        legacy = time_bulk_update(db, legacy_table, inline=False)
+        inline = time_bulk_update(db, inline_table, inline=True)
+
+    print(f"Bulk update of {args.rows:,} rows")
+    print(f"  trigger (legacy): {legacy:8.3f}s  {args.rows / legacy:12,.0f} rows/s")
+    print(f"  inline updated_at:{inline:8.3f}s  {args.rows / inline:12,.0f} rows/s")
+    print(f"  speedup: {legacy / inline:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Storage size and read latency benchmark for node body compression.
+
+Stores the same set of large API-reference-style sections with each codec
+(none, zlib, lzma) and reports the resulting database file size and the
+average get_node latency.
+
+Usage:
+    python benchmarks/bench_compression.py [--nodes 100] [--size 200000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Add the src directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from doc_manager.database import DocumentDatabase
+
+
+WORDS = [
+    "request", "response", "client", "server", "token", "handler", "session",
+    "timeout", "buffer", "stream", "callback", "options", "config", "status",
+    "header", "payload", "retry", "cursor", "record", "schema", "index",
+]
+TYPES = ["str", "int", "bool", "float", "Dict[str, Any]", "List[str]", "Optional[int]"]
+
+
+def api_section(rng: random.Random, size: int) -> str:
+    """Generate an API reference section of roughly ``size`` characters."""
+    parts = []
+    length = 0
+    while length < size:
+        name = "_".join(rng.sample(WORDS, 2))
+        params = ", ".join(f"{rng.choice(WORDS)}: {rng.choice(TYPES)}" for _ in range(rng.randint(1, 4)))
+        block = (
+            f"### `{name}({params}) -> {rng.choice(TYPES)}`\n\n"
+            f"Returns the {rng.choice(WORDS)} for the given {rng.choice(WORDS)}. "
+            f"Raises `ValueError` if the {rng.choice(WORDS)} is invalid.\n\n"
+            f"| Parameter | Type | Description |\n|---|---|---|\n"
+            + "".join(
+                f"| `{rng.choice(WORDS)}` | `{rng.choice(TYPES)}` | The {rng.choice(WORDS)} to use. |\n"
+                for _ in range(3)
+            )
+            + "\n"
+        )
+        parts.append(block)
+        length += len(block)
+    return "".join(parts)
+
+
+def run(codec: str, sections: list, tmp: str) -> tuple:
+    """Store all sections with one codec; return (file size, avg read seconds)."""
+    db_path = os.path.join(tmp, f"{codec}.db")
+    db = DocumentDatabase(db_path)
+    db.compression = codec
+    db.compression_threshold = 16384
+
+    node_ids = [db.create_node(f"Section {i}", "api_reference", content=body)
+                for i, body in enumerate(sections)]
+
+    start = time.perf_counter()
+    for node_id in node_ids:
+        db.get_node(node_id)
+    elapsed = (time.perf_counter() - start) / len(node_ids)
+
+    with db.get_connection() as conn:
+        conn.execute("VACUUM")
+    return os.path.getsize(db_path), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--nodes", type=int, default=100, help="Number of sections")
+    parser.add_argument("--size", type=int, default=200_000, help="Characters per section")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    sections = [api_section(rng, args.size) for _ in range(args.nodes)]
+    raw = sum(len(body.encode('utf-8')) for body in sections)
+
+    print(f"{args.nodes} sections, {raw / 1e6:.1f} MB of text")
+    print(f"  {'codec':<6} {'file size':>12} {'ratio':>7} {'get_node':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for codec in ("none", "zlib", "lzma"):
+            size, latency = run(codec, sections, tmp)
+            print(f"  {codec:<6} {size / 1e6:>9.2f} MB {raw / size:>6.2f}x {latency * 1000:>9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Concurrent write throughput with and without the group-committing writer.
+
+Runs the same create_node/update_node workload from many threads, first with
+a connection per call (each committing on its own and contending for the
+write lock), then through the single writer thread, and reports throughput,
+latency and failed writes.
+
+Usage:
+    python benchmarks/bench_group_commit.py [--writers 32] [--writes 100]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# Add the src directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from doc_manager.database import DocumentDatabase
+
+
+def run(db: DocumentDatabase, writers: int, writes: int) -> dict:
+    """Run the workload on writers threads; return timing and error counts."""
+    root = db.create_node("Root", "chapter")
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(writers)
+
+    def worker(index: int) -> None:
+        barrier.wait()
+        node_id = None
+        for i in range(writes):
+            started = time.perf_counter()
+            try:
+                if node_id is None or i % 2 == 0:
+                    node_id = db.create_node(f"Writer {index} node {i}", "section",
+                                             content=f"Body {i} " * 20, parent_id=root)
+                else:
+                    db.update_node(node_id, content=f"Updated {i} " * 20)
+            except Exception as e:
+                with lock:
+                    errors.append(str(e))
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(writers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'elapsed': elapsed,
+        'throughput': len(latencies) / elapsed,
+        'p50': latencies[len(latencies) // 2] if latencies else 0.0,
+        'p99': latencies[int(len(latencies) * 0.99)] if latencies else 0.0,
+        'errors': len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--writers", type=int, default=32, help="Concurrent writer threads")
+    parser.add_argument("--writes", type=int, default=100, help="Writes per thread")
+    args = parser.parse_args()
+
+    print(f"{args.writers} writers x {args.writes} writes")
+    print(f"  {'mode':<14} {'writes/s':>10} {'p50':>10} {'p99':>10} {'errors':>7} {'commits':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("per-call", "group commit"):
+            db = DocumentDatabase(os.path.join(tmp, f"{mode.replace(' ', '_')}.db"))
+            if mode == "group commit":
+                db.start_writer()
+            result = run(db, args.writers, args.writes)
+            commits = db.writer.commits if db.writer else args.writers * args.writes - result['errors']
+            db.stop_writer()
+            print(f"  {mode:<14} {result['throughput']:>10.0f} {result['p50'] * 1000:>8.1f}ms "
+                  f"{result['p99'] * 1000:>8.1f}ms {result['errors']:>7} {commits:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Storage and reconstruction latency of the node revision history.
+
+Edits one long node body a few lines at a time, recording every edit as a
+revision, for several full-copy intervals. Reports the space the history
+takes against storing every revision in full, the cost of an update, and
+how long rebuilding a random earlier revision takes.
+
+Usage:
+    python benchmarks/bench_revisions.py [--revisions 1000] [--lines 400]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Add the src directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from doc_manager.database import DocumentDatabase
+
+
+def run(path: str, interval: int, revisions: int, lines: int) -> None:
+    """Record revisions edits with the given full-copy interval and report the results."""
+    rng = random.Random(42)
+    db = DocumentDatabase(path)
+    db.revision_history = True
+    db.revision_full_interval = interval
+
+    body = [f"Line {i}: " + "lorem ipsum dolor sit amet " * 2 + "\n" for i in range(lines)]
+    node_id = db.create_node("Benchmark", "section", content="".join(body))
+    full_size = 0
+    started = time.perf_counter()
+    for revision in range(revisions):
+        for _ in range(rng.randint(1, 3)):
+            body[rng.randrange(lines)] = f"Edited in revision {revision}: " + "consectetur " * 4 + "\n"
+        text = "".join(body)
+        full_size += len(text)
+        db.update_node(node_id, content=text)
+    update_time = (time.perf_counter() - started) / revisions
+
+    with db.get_connection() as conn:
+        stored = conn.execute("SELECT SUM(LENGTH(content)) FROM node_revisions").fetchone()[0]
+
+    numbers = [row['revision'] for row in db.list_revisions(node_id)]
+    timings = []
+    for revision in rng.sample(numbers, min(200, len(numbers))):
+        started = time.perf_counter()
+        db.get_revision(node_id, revision)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+
+    print(f"  {interval:>8} {stored / 1e6:>9.2f} MB {full_size / stored:>7.1f}x "
+          f"{update_time * 1000:>8.2f}ms {timings[len(timings) // 2] * 1000:>8.2f}ms "
+          f"{timings[int(len(timings) * 0.99)] * 1000:>8.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--revisions", type=int, default=1000, help="Number of edits")
+    parser.add_argument("--lines", type=int, default=400, help="Lines in the node body")
+    parser.add_argument("--interval", type=int, action="append",
+                        help="Full-copy interval to test (repeatable; default 1, 8, 32, 128)")
+    args = parser.parse_args()
+
+    print(f"{args.revisions} revisions of a {args.lines}-line body")
+    print(f"  {'interval':>8} {'stored':>12} {'saving':>8} {'update':>10} {'get p50':>10} {'get p99':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for interval in args.interval or [1, 8, 32, 128]:
+            run(os.path.join(tmp, f"revisions_{interval}.db"), interval, args.revisions, args.lines)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Cost of copy-on-write document snapshots against copying the document.
+
+Builds a document, snapshots it, then edits a growing share of its nodes.
+Reports how long taking the snapshot took, how many node rows it ended up
+saving, and how long diffing and restoring it take, next to the time of a
+full copy of the node and content tables.
+
+Usage:
+    python benchmarks/bench_snapshots.py [--nodes 50000] [--changed 1 10 50]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Add the src directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from doc_manager.database import DocumentDatabase
+
+
+def populate(db: DocumentDatabase, count: int) -> None:
+    """Load count nodes with short bodies into the benchmark document."""
+    db.bulk_load_nodes((
+        {
+            'id': node_id,
+            'parent_id': node_id // 8 or None,
+            'title': f"Section {node_id}",
+            'node_type': 'section',
+            'level': 1,
+            'sort_order': node_id,
+            'content': f"Body of section {node_id}. " * 8,
+        }
+        for node_id in range(1, count + 1)
+    ), "bench")
+
+
+def run(path: str, count: int, percent: float) -> None:
+    """Snapshot, change percent of count nodes, then diff and restore the snapshot."""
+    rng = random.Random(42)
+    db = DocumentDatabase(path)
+    db.revision_history = False
+    db.create_document("bench", "Benchmark")
+    populate(db, count)
+    
+    started = time.perf_counter()
+    with db.get_connection() as conn:
+        conn.execute("CREATE TABLE copy_nodes AS SELECT * FROM doc_bench")
+        conn.execute("CREATE TABLE copy_content AS SELECT * FROM content_doc_bench")
+        conn.commit()
+    copy_time = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    db.create_snapshot("before", "bench")
+    snapshot_time = time.perf_counter() - started
+    
+    for node_id in rng.sample(range(1, count + 1), int(count * percent / 100)):
+        db.update_node(node_id, title=f"Edited {node_id}", document_name="bench")
+    saved = db.list_snapshots("bench")[0]['saved_nodes']
+    
+    started = time.perf_counter()
+    diff = db.diff_snapshots("before", document_name="bench")
+    diff_time = time.perf_counter() - started
+    started = time.perf_counter()
+    db.restore_snapshot("before", "bench")
+    restore_time = time.perf_counter() - started
+    assert len(diff['changed']) == saved
+    
+    print(f"  {percent:>6}% {copy_time * 1000:>9.1f}ms {snapshot_time * 1000:>9.2f}ms "
+          f"{saved:>8} {diff_time * 1000:>9.1f}ms {restore_time * 1000:>9.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--nodes", type=int, default=50_000, help="Nodes in the document")
+    parser.add_argument("--changed", type=float, nargs="+", default=[1, 10, 50],
+                        help="Percentages of nodes to edit after the snapshot")
+    args = parser.parse_args()
+    
+    print(f"{args.nodes:,} nodes")
+    print(f"  {'changed':>7} {'full copy':>11} {'snapshot':>11} {'saved':>8} {'diff':>11} {'restore':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for percent in args.changed:
+            run(os.path.join(tmp, f"snapshots_{percent}.db"), args.nodes, percent)
+
+
+if __name__ == "__main__":
+    main()
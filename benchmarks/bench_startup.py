@@ -0,0 +1,72 @@
+"""
+Server startup benchmark: time from process launch to the first tool response.
+
+Each run starts a fresh interpreter (as Claude Desktop does per session),
+imports the MCP server module and calls the get_documents_list tool once.
+Runs are made against a new database and against one whose schema is
+already current, where schema setup is skipped.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 10]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+CHILD = """
+import json, time
+start = time.perf_counter()
+from doc_manager import simple_server
+imported = time.perf_counter()
+simple_server.get_documents_list()
+print(json.dumps({"import": imported - start, "first_call": time.perf_counter() - imported}))
+"""
+
+
+def launch(db_path: str) -> dict:
+    """Run one server process; return its timings in seconds."""
+    env = dict(os.environ, DOC_MANAGER_DB_PATH=db_path, PYTHONPATH=SRC_DIR)
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD], env=env, check=True,
+        capture_output=True, text=True
+    ).stdout
+    timings = json.loads(output.strip().splitlines()[-1])
+    timings["total"] = time.perf_counter() - start
+    return timings
+
+
+def report(label: str, runs: list) -> None:
+    """Print median timings for a set of runs."""
+    median = {key: statistics.median(run[key] for run in runs) * 1000 for key in runs[0]}
+    print(f"  {label:<16} import {median['import']:7.1f} ms  "
+          f"first tool call {median['first_call']:7.1f} ms  "
+          f"launch to response {median['total']:7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10, help="Launches per scenario")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fresh = [launch(os.path.join(tmp, f"fresh_{i}.db")) for i in range(args.runs)]
+
+        existing = os.path.join(tmp, "existing.db")
+        launch(existing)
+        warm = [launch(existing) for _ in range(args.runs)]
+
+    print(f"Median of {args.runs} launches")
+    report("new database", fresh)
+    report("existing database", warm)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Memory benchmark for loading a large document tree.
+
+Builds a tree of structure-only nodes and measures the peak Python memory
+(tracemalloc) of holding it as nested dicts, the shape get_tree_structure
+returns, versus linked Node objects from build_tree, plus the cost of
+serializing each to JSON.
+
+Usage:
+    python benchmarks/bench_tree_memory.py [--nodes 100000] [--fanout 8]
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Add the src directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from doc_manager.database import DocumentDatabase
+from doc_manager.nodes import tree_to_json
+
+
+def populate(db: DocumentDatabase, count: int, fanout: int) -> None:
+    """Insert count nodes, each parent getting up to fanout children, breadth first."""
+    with db.get_connection() as conn:
+        conn.executemany(
+            "INSERT INTO document_nodes (id, parent_id, title, node_type, level, sort_order, metadata) "
+            "VALUES (?, ?, ?, 'section', ?, ?, ?)",
+            [
+                (
+                    node_id,
+                    (node_id - 2) // fanout + 1 if node_id > 1 else None,
+                    f"Section {node_id}",
+                    1,
+                    node_id * 1024,
+                    json.dumps({"status": "draft", "owner": f"user{node_id % 50}"}),
+                )
+                for node_id in range(1, count + 1)
+            ],
+        )
+        conn.commit()
+
+
+def measure(label: str, load) -> None:
+    """Report the time and peak traced memory of loading, then serializing, a tree."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    tree, serialize = load()
+    loaded = time.perf_counter() - start
+    held = tracemalloc.get_traced_memory()[0]
+    text = serialize(tree)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"  {label:<10} load {loaded:6.2f}s  held {held / 1e6:8.1f} MB  "
+          f"peak with JSON {peak / 1e6:8.1f} MB  ({len(text) / 1e6:.1f} MB of JSON)")
+    del tree, text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--nodes", type=int, default=100_000, help="Number of nodes")
+    parser.add_argument("--fanout", type=int, default=8, help="Children per node")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DocumentDatabase(os.path.join(tmp, "tree.db"))
+        populate(db, args.nodes, args.fanout)
+        print(f"{args.nodes:,} nodes, fanout {args.fanout}")
+
+        measure("dicts", lambda: (
+            db.get_tree_structure(include_content=False),
+            lambda tree: json.dumps(tree, indent=2, default=str),
+        ))
+        measure("Node", lambda: (
+            db.build_tree(include_content=False),
+            lambda tree: tree_to_json(tree, include_content=False),
+        ))
+
+
+if __name__ == "__main__":
+    main()
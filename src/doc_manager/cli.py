@@ -4,9 +4,16 @@ Command-line interface for document management.
 import argparse
 import json
 import sys
-from typing import Optional, Dict, Any
+from pathlib import Path
+from typing import Optional, Dict, Any, List
 
 from .database import DocumentDatabase
+from .migrations import SCHEMA_VERSION, run_migrations
+from .backup import backup_database, snapshot_database
+from .dump import dump_document, load_document
+from .ndjson import export_ndjson, import_ndjson
+from .renderers import RENDERERS, export_all, export_tree
+from .maintenance import run_maintenance
 
 
 class DocumentManagerCLI:
@@ -19,7 +26,8 @@ class DocumentManagerCLI:
     def create_node(self, title: str, node_type: str, 
                    content: Optional[str] = None,
                    parent_id: Optional[int] = None,
-                   metadata: Optional[str] = None) -> None:
+                   metadata: Optional[str] = None,
+                   document_name: Optional[str] = None) -> None:
         """Create a new document node."""
         metadata_dict = {}
         if metadata:
@@ -34,7 +42,8 @@ class DocumentManagerCLI:
             node_type=node_type,
             content=content,
             parent_id=parent_id,
-            metadata=metadata_dict
+            metadata=metadata_dict,
+            document_name=document_name
         )
         
         print(f"Created node with ID: {node_id}")
@@ -43,9 +52,9 @@ class DocumentManagerCLI:
         if parent_id:
             print(f"Parent ID: {parent_id}")
     
-    def get_node(self, node_id: int) -> None:
+    def get_node(self, node_id: int, document_name: Optional[str] = None) -> None:
         """Get and display a document node."""
-        node = self.db.get_node(node_id)
+        node = self.db.get_node(node_id, document_name)
         if node:
             print(json.dumps(node, indent=2, default=str))
         else:
@@ -54,7 +63,9 @@ class DocumentManagerCLI:
     def update_node(self, node_id: int, 
                    title: Optional[str] = None,
                    content: Optional[str] = None,
-                   metadata: Optional[str] = None) -> None:
+                   metadata: Optional[str] = None,
+                   expected_version: Optional[int] = None,
+                   document_name: Optional[str] = None) -> None:
         """Update an existing document node."""
         metadata_dict = None
         if metadata:
@@ -68,7 +79,9 @@ class DocumentManagerCLI:
             node_id=node_id,
             title=title,
             content=content,
-            metadata=metadata_dict
+            metadata=metadata_dict,
+            expected_version=expected_version,
+            document_name=document_name
         )
         
         if success:
@@ -76,17 +89,120 @@ class DocumentManagerCLI:
         else:
             print(f"Failed to update node {node_id} - node may not exist")
     
-    def delete_node(self, node_id: int) -> None:
+    def delete_node(self, node_id: int,
+                    expected_version: Optional[int] = None,
+                    document_name: Optional[str] = None) -> None:
         """Delete a document node."""
-        success = self.db.delete_node(node_id)
-        if success:
-            print(f"Successfully deleted node {node_id} and all its children")
+        deleted = self.db.delete_node(node_id, expected_version, document_name)
+        if deleted:
+            print(f"Successfully deleted node {node_id} and all its children ({deleted} nodes)")
         else:
             print(f"Failed to delete node {node_id} - node may not exist")
     
-    def list_children(self, parent_id: Optional[int] = None) -> None:
+    def patch_metadata(self, node_id: int,
+                       patch: Optional[str] = None,
+                       remove: Optional[List[str]] = None,
+                       expected_version: Optional[int] = None,
+                       document_name: Optional[str] = None) -> None:
+        """Change some metadata keys of a node, leaving the others as they are."""
+        patch_dict = None
+        if patch:
+            try:
+                patch_dict = json.loads(patch)
+            except json.JSONDecodeError:
+                print(f"Error: Invalid JSON patch: {patch}")
+                return
+        
+        if self.db.patch_node_metadata(node_id, patch_dict, remove, expected_version, document_name):
+            print(f"Successfully patched metadata of node {node_id}")
+        else:
+            print(f"Failed to patch metadata of node {node_id} - node may not exist or patch is empty")
+    
+    def move_node(self, node_id: int,
+                  new_parent_id: Optional[int] = None,
+                  expected_version: Optional[int] = None,
+                  document_name: Optional[str] = None) -> None:
+        """Move a node, with its subtree, under a new parent."""
+        if self.db.move_node(node_id, new_parent_id, expected_version, document_name):
+            print(f"Successfully moved node {node_id} to {new_parent_id if new_parent_id else 'root'}")
+        else:
+            print(f"Failed to move node {node_id} - node or parent may not exist")
+    
+    def show_path(self, node_id: int, document_name: Optional[str] = None) -> None:
+        """Show the path from the root to a node."""
+        path = self.db.get_node_path(node_id, document_name)
+        if not path:
+            print(f"Node with ID {node_id} not found.")
+            return
+        print(" > ".join(f"{node['title']} ({node['id']})" for node in path))
+    
+    def show_revisions(self, node_id: int, document_name: Optional[str] = None) -> None:
+        """List the recorded revisions of a node."""
+        revisions = self.db.list_revisions(node_id, document_name)
+        if not revisions:
+            print(f"No revisions recorded for node {node_id}")
+            return
+        print(f"Revisions of node {node_id}:")
+        for revision in revisions:
+            print(f"  {revision['revision']:>5}  {revision['kind']:<5} {revision['size'] or 0:>8} bytes  "
+                  f"{revision['created_at']}  {revision['title']}")
+    
+    def restore_revision(self, node_id: int, revision: int,
+                         expected_version: Optional[int] = None,
+                         document_name: Optional[str] = None) -> None:
+        """Restore a node to one of its revisions."""
+        if self.db.restore_revision(node_id, revision, expected_version, document_name):
+            print(f"Successfully restored node {node_id} to revision {revision}")
+        else:
+            print(f"Failed to restore node {node_id} - node may not exist")
+    
+    def create_snapshot(self, name: str, document_name: Optional[str] = None,
+                        description: Optional[str] = None) -> None:
+        """Record a named snapshot of a document."""
+        snapshot = self.db.create_snapshot(name, document_name, description)
+        print(f"Successfully created snapshot '{name}' at {snapshot['created_at']}")
+    
+    def show_snapshots(self, document_name: Optional[str] = None) -> None:
+        """List the snapshots of a document."""
+        snapshots = self.db.list_snapshots(document_name)
+        if not snapshots:
+            print("No snapshots found.")
+            return
+        for snapshot in snapshots:
+            description = f"  {snapshot['description']}" if snapshot['description'] else ""
+            print(f"  {snapshot['name']:<20} {snapshot['created_at']}  "
+                  f"{snapshot['saved_nodes']:>6} saved nodes{description}")
+    
+    def diff_snapshots(self, name: str, other: Optional[str] = None,
+                       document_name: Optional[str] = None) -> None:
+        """Show how a document changed between two snapshots, or since one."""
+        diff = self.db.diff_snapshots(name, other, document_name)
+        if not any(diff.values()):
+            print("No differences.")
+            return
+        for node in diff['added']:
+            print(f"  + {node['title']} ({node['id']})")
+        for node in diff['removed']:
+            print(f"  - {node['title']} ({node['id']})")
+        for node in diff['changed']:
+            print(f"  ~ {node['title']} ({node['id']}): {', '.join(node['fields'])}")
+    
+    def restore_snapshot(self, name: str, document_name: Optional[str] = None) -> None:
+        """Put a document back as it was at a snapshot."""
+        result = self.db.restore_snapshot(name, document_name)
+        print(f"Successfully restored snapshot '{name}': "
+              f"{result['restored']} node(s) restored, {result['deleted']} deleted")
+    
+    def delete_snapshot(self, name: str, document_name: Optional[str] = None) -> None:
+        """Delete a snapshot of a document."""
+        if self.db.delete_snapshot(name, document_name):
+            print(f"Successfully deleted snapshot '{name}'")
+        else:
+            print(f"Snapshot '{name}' not found")
+    
+    def list_children(self, parent_id: Optional[int] = None, document_name: Optional[str] = None) -> None:
         """List direct children of a node."""
-        children = self.db.get_children(parent_id)
+        children = self.db.get_children(parent_id, document_name, include_content=False)
         if children:
             print(f"Children of node {parent_id if parent_id else 'root'}:")
             for child in children:
@@ -94,9 +210,10 @@ class DocumentManagerCLI:
         else:
             print(f"No children found for node {parent_id if parent_id else 'root'}")
     
-    def search_nodes(self, query: str = "", node_type: Optional[str] = None) -> None:
+    def search_nodes(self, query: str = "", node_type: Optional[str] = None,
+                     document_name: Optional[str] = None) -> None:
         """Search document nodes."""
-        results = self.db.search_nodes(query=query, node_type=node_type)
+        results = self.db.search_nodes(query=query, node_type=node_type, document_name=document_name)
         if results:
             print(f"Found {len(results)} matching nodes:")
             for node in results:
@@ -104,21 +221,22 @@ class DocumentManagerCLI:
         else:
             print("No matching nodes found.")
     
-    def show_tree(self, parent_id: Optional[int] = None) -> None:
+    def show_tree(self, parent_id: Optional[int] = None, document_name: Optional[str] = None) -> None:
         """Display tree structure."""
-        tree = self.db.get_tree_structure(parent_id)
+        tree = self.db.build_tree(parent_id, document_name, include_content=False)
         self._print_tree(tree, 0)
     
     def _print_tree(self, nodes: list, indent: int) -> None:
         """Recursively print tree structure."""
         for node in nodes:
-            print("  " * indent + f"├─ {node['title']} (ID: {node['id']}, Type: {node['node_type']})")
-            if 'children' in node and node['children']:
-                self._print_tree(node['children'], indent + 1)
+            print("  " * indent + f"├─ {node.title} (ID: {node.id}, Type: {node.node_type})")
+            if node.children:
+                self._print_tree(node.children, indent + 1)
     
-    def export_markdown(self, parent_id: Optional[int] = None, output_file: Optional[str] = None) -> None:
+    def export_markdown(self, parent_id: Optional[int] = None, output_file: Optional[str] = None,
+                        document_name: Optional[str] = None) -> None:
         """Export document tree to Markdown."""
-        markdown = self.db.export_tree_to_markdown(parent_id)
+        markdown = self.db.export_tree_to_markdown(parent_id, document_name=document_name)
         
         if output_file:
             with open(output_file, 'w', encoding='utf-8') as f:
@@ -127,9 +245,66 @@ class DocumentManagerCLI:
         else:
             print(markdown)
     
-    def get_nodes_by_type(self, node_type: str) -> None:
+    def dump_document(self, document_name: str, output_file: str,
+                      compress: bool = True, overwrite: bool = False) -> None:
+        """Dump a document to a file for cloning or transfer."""
+        report = dump_document(self.db, document_name, output_file, compress, overwrite)
+        print(f"Dumped '{document_name}' ({report['nodes']} nodes) to {report['path']}")
+        print(f"  Size: {report['size_bytes']:,} bytes, elapsed: {report['duration_seconds']:.2f}s")
+    
+    def load_document(self, input_file: str, document_name: Optional[str] = None,
+                      title: Optional[str] = None) -> None:
+        """Load a document dump as a new document."""
+        report = load_document(self.db, input_file, document_name, title)
+        print(f"Loaded '{report['document_name']}' ({report['nodes']} nodes) from {report['path']}")
+        print(f"  Elapsed: {report['duration_seconds']:.2f}s")
+    
+    def export_ndjson(self, output_file: str, document_name: Optional[str] = None) -> None:
+        """Export nodes as NDJSON to a file, or stdout for '-'."""
+        if output_file == "-":
+            export_ndjson(self.db, sys.stdout, document_name)
+            return
+        with open(output_file, 'w', encoding='utf-8') as f:
+            counts = export_ndjson(self.db, f, document_name)
+        print(f"Exported {counts['nodes']} nodes ({counts['documents']} documents) to {output_file}")
+    
+    def import_ndjson(self, input_file: str, document_name: Optional[str] = None) -> None:
+        """Import NDJSON nodes from a file, or stdin for '-'."""
+        if input_file == "-":
+            counts = import_ndjson(self.db, sys.stdin, document_name)
+        else:
+            with open(input_file, 'r', encoding='utf-8') as f:
+                counts = import_ndjson(self.db, f, document_name)
+        print(f"Imported {counts['nodes']} nodes ({counts['documents_created']} documents created)")
+    
+    def render(self, formats: list, parent_id: Optional[int] = None,
+               name: Optional[str] = None, output_dir: Optional[str] = None,
+               document_name: Optional[str] = None) -> None:
+        """Export the document tree to several formats in one pass."""
+        report = export_tree(self.db, formats, parent_id, document_name=document_name,
+                             filename=name, output_dir=output_dir)
+        for format_name, path in report['files'].items():
+            print(f"  {format_name:<10} {path}")
+        print(f"Exported {report['nodes']} nodes in {report['duration_seconds']:.2f}s")
+    
+    def export_all(self, formats: list, pattern: Optional[str] = None,
+                   output_dir: Optional[str] = None, workers: Optional[int] = None) -> None:
+        """Export every document, or those matching pattern, concurrently."""
+        report = export_all(self.db, formats, pattern=pattern, output_dir=output_dir, workers=workers)
+        print(f"Exported {report['documents']} documents ({report['nodes']:,} nodes, "
+              f"{report['bytes']:,} bytes) to {report['output_dir']}")
+        print(f"  Elapsed: {report['duration_seconds']:.2f}s "
+              f"({report['documents_per_second']:.1f} documents/s, "
+              f"{report['nodes_per_second']:,.0f} nodes/s, "
+              f"{report['bytes_per_second'] / 1024 / 1024:.1f} MiB/s)")
+        for name, error in report['failed'].items():
+            print(f"  Failed: {name}: {error}")
+        if report['failed']:
+            sys.exit(1)
+    
+    def get_nodes_by_type(self, node_type: str, document_name: Optional[str] = None) -> None:
         """Get all nodes of a specific type."""
-        nodes = self.db.get_nodes_by_type(node_type)
+        nodes = self.db.get_nodes_by_type(node_type, document_name)
         if nodes:
             print(f"Found {len(nodes)} nodes of type '{node_type}':")
             for node in nodes:
@@ -144,6 +319,69 @@ class DocumentManagerCLI:
             print(f"No nodes found of type '{node_type}'")
 
 
+def migrate(db_path: str, dry_run: bool = False) -> None:
+    """Apply pending schema migrations and print a report."""
+    Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+    report = run_migrations(db_path, dry_run=dry_run)
+    
+    if not report['migrations']:
+        print(f"Schema is up to date (version {report['from_version']})")
+        return
+    
+    action = "Dry run (rolled back)" if dry_run else "Migrated"
+    print(f"{action}: schema version {report['from_version']} -> {report['to_version']}")
+    for migration in report['migrations']:
+        print(f"  v{migration['version']}: {migration['description']} "
+              f"({migration['tables']} node tables, {migration['duration_seconds']:.3f}s)")
+    print(f"Total: {report['duration_seconds']:.3f}s (latest schema version {SCHEMA_VERSION})")
+
+
+def backup(db_path: str, target: str, compact: bool = False,
+           pages: int = 1024, overwrite: bool = False) -> None:
+    """Back up the database while it stays available to other processes."""
+    if compact:
+        report = snapshot_database(db_path, target, overwrite=overwrite)
+        print(f"Compacted snapshot written to {report['target']}")
+        print(f"  Size: {report['source_size_bytes']:,} -> {report['size_bytes']:,} bytes")
+    else:
+        def progress(copied: int, total: int) -> None:
+            percent = copied / total * 100 if total else 100.0
+            print(f"\r  Copied {copied:,}/{total:,} pages ({percent:.1f}%)", end="", flush=True)
+        
+        report = backup_database(db_path, target, pages_per_step=pages,
+                                 progress=progress, overwrite=overwrite)
+        print()
+        print(f"Backup written to {report['target']}")
+        print(f"  Size: {report['size_bytes']:,} bytes ({report['pages']:,} pages)")
+    print(f"  Elapsed: {report['duration_seconds']:.2f}s")
+
+
+def maintenance(db_path: str, analyze: bool = True, vacuum: bool = True,
+                integrity: bool = True, quick: bool = False, sweep: bool = True) -> None:
+    """Run database maintenance and print a report."""
+    report = run_maintenance(db_path, analyze=analyze, vacuum=vacuum,
+                             integrity=integrity, quick_check=quick, sweep_orphans=sweep)
+    
+    for step in report['steps']:
+        details = ", ".join(f"{key}={value}" for key, value in step.items()
+                            if key not in ('step', 'duration_seconds'))
+        print(f"  {step['step']:<20} {step['duration_seconds']:8.3f}s  {details}")
+    
+    print(f"Size: {report['size_before_bytes']:,} -> {report['size_after_bytes']:,} bytes "
+          f"(reclaimed {report['reclaimed_bytes']:,})")
+    if report['integrity'] is not None:
+        if report['integrity']['ok']:
+            print("Integrity: ok")
+        else:
+            print("Integrity problems:")
+            for message in report['integrity']['messages']:
+                print(f"  {message}")
+    print(f"Elapsed: {report['duration_seconds']:.2f}s")
+    
+    if report['integrity'] is not None and not report['integrity']['ok']:
+        sys.exit(1)
+
+
 def main():
     """Main CLI entry point."""
     parser = argparse.ArgumentParser(description="Document Manager CLI")
@@ -158,10 +396,12 @@ def main():
     create_parser.add_argument("--content", help="Node content")
     create_parser.add_argument("--parent-id", type=int, help="Parent node ID")
     create_parser.add_argument("--metadata", help="Metadata as JSON string")
+    create_parser.add_argument("--document", help="Document name (omit for the default table)")
     
     # Get node command
     get_parser = subparsers.add_parser("get", help="Get a document node")
     get_parser.add_argument("node_id", type=int, help="Node ID")
+    get_parser.add_argument("--document", help="Document name (omit for the default table)")
     
     # Update node command
     update_parser = subparsers.add_parser("update", help="Update a document node")
@@ -169,32 +409,167 @@ def main():
     update_parser.add_argument("--title", help="New title")
     update_parser.add_argument("--content", help="New content")
     update_parser.add_argument("--metadata", help="New metadata as JSON string")
+    update_parser.add_argument("--expected-version", type=int,
+                               help="Only update if the node is still at this version")
+    update_parser.add_argument("--document", help="Document name (omit for the default table)")
     
     # Delete node command
     delete_parser = subparsers.add_parser("delete", help="Delete a document node")
     delete_parser.add_argument("node_id", type=int, help="Node ID")
+    delete_parser.add_argument("--expected-version", type=int,
+                               help="Only delete if the node is still at this version")
+    delete_parser.add_argument("--document", help="Document name (omit for the default table)")
+    
+    # Move node command
+    move_parser = subparsers.add_parser("move", help="Move a node under a new parent")
+    move_parser.add_argument("node_id", type=int, help="Node ID")
+    move_parser.add_argument("--parent-id", type=int, help="New parent node ID (omit to move to the root)")
+    move_parser.add_argument("--expected-version", type=int,
+                             help="Only move if the node is still at this version")
+    move_parser.add_argument("--document", help="Document name (omit for the default table)")
+    
+    # Node path command
+    path_parser = subparsers.add_parser("path", help="Show the path from the root to a node")
+    path_parser.add_argument("node_id", type=int, help="Node ID")
+    path_parser.add_argument("--document", help="Document name (omit for the default table)")
+    
+    # Patch metadata command
+    patch_parser = subparsers.add_parser("patch-metadata", help="Change some metadata keys of a node")
+    patch_parser.add_argument("node_id", type=int, help="Node ID")
+    patch_parser.add_argument("patch", nargs="?", help="JSON merge patch (null values remove keys)")
+    patch_parser.add_argument("--remove", action="append", metavar="KEY", help="Metadata key to remove")
+    patch_parser.add_argument("--expected-version", type=int,
+                              help="Only patch if the node is still at this version")
+    patch_parser.add_argument("--document", help="Document name (omit for the default table)")
+    
+    # Revision history commands
+    revisions_parser = subparsers.add_parser("revisions", help="List the revisions of a node")
+    revisions_parser.add_argument("node_id", type=int, help="Node ID")
+    revisions_parser.add_argument("--document", help="Document name (omit for the default table)")
+    
+    restore_parser = subparsers.add_parser("restore-revision", help="Restore a node to one of its revisions")
+    restore_parser.add_argument("node_id", type=int, help="Node ID")
+    restore_parser.add_argument("revision", type=int, help="Revision number")
+    restore_parser.add_argument("--expected-version", type=int,
+                                help="Only restore if the node is still at this version")
+    restore_parser.add_argument("--document", help="Document name (omit for the default table)")
+    
+    # Snapshot commands
+    snapshot_parser = subparsers.add_parser("snapshot", help="Record a named snapshot of a document")
+    snapshot_parser.add_argument("name", help="Snapshot name")
+    snapshot_parser.add_argument("--description", help="Snapshot description")
+    snapshot_parser.add_argument("--document", help="Document name (omit for the default table)")
+    
+    snapshots_parser = subparsers.add_parser("snapshots", help="List the snapshots of a document")
+    snapshots_parser.add_argument("--document", help="Document name (omit for the default table)")
+    
+    diff_snapshots_parser = subparsers.add_parser(
+        "diff-snapshots", help="Show changes between two snapshots, or since one"
+    )
+    diff_snapshots_parser.add_argument("name", help="Snapshot to compare from")
+    diff_snapshots_parser.add_argument("other", nargs="?", help="Snapshot to compare to (omit for the current state)")
+    diff_snapshots_parser.add_argument("--document", help="Document name (omit for the default table)")
+    
+    restore_snapshot_parser = subparsers.add_parser("restore-snapshot", help="Restore a document to a snapshot")
+    restore_snapshot_parser.add_argument("name", help="Snapshot name")
+    restore_snapshot_parser.add_argument("--document", help="Document name (omit for the default table)")
+    
+    delete_snapshot_parser = subparsers.add_parser("delete-snapshot", help="Delete a snapshot")
+    delete_snapshot_parser.add_argument("name", help="Snapshot name")
+    delete_snapshot_parser.add_argument("--document", help="Document name (omit for the default table)")
     
     # List children command
     list_parser = subparsers.add_parser("list", help="List children of a node")
     list_parser.add_argument("--parent-id", type=int, help="Parent node ID (omit for root nodes)")
+    list_parser.add_argument("--document", help="Document name (omit for the default table)")
     
     # Search command
     search_parser = subparsers.add_parser("search", help="Search document nodes")
     search_parser.add_argument("--query", help="Search query")
     search_parser.add_argument("--type", help="Node type filter")
+    search_parser.add_argument("--document", help="Document name (omit for the default table)")
     
     # Tree command
     tree_parser = subparsers.add_parser("tree", help="Show tree structure")
     tree_parser.add_argument("--parent-id", type=int, help="Root node ID (omit for complete tree)")
+    tree_parser.add_argument("--document", help="Document name (omit for the default table)")
     
     # Export command
     export_parser = subparsers.add_parser("export", help="Export to Markdown")
     export_parser.add_argument("--parent-id", type=int, help="Root node ID for export")
     export_parser.add_argument("--output", help="Output file path")
+    export_parser.add_argument("--document", help="Document name (omit for the default table)")
+    
+    # Render command
+    render_parser = subparsers.add_parser("render", help="Export to several formats in one pass")
+    render_parser.add_argument("--format", action="append", choices=list(RENDERERS), dest="formats",
+                               help="Output format (repeat for several; default markdown)")
+    render_parser.add_argument("--parent-id", type=int, help="Root node ID for export")
+    render_parser.add_argument("--name", help="Output file name without extension")
+    render_parser.add_argument("--output-dir", help="Output directory (default: export directory)")
+    render_parser.add_argument("--document", help="Document name (omit for the default table)")
+    
+    # Export all command
+    export_all_parser = subparsers.add_parser("export-all", help="Export all documents concurrently")
+    export_all_parser.add_argument("--format", action="append", choices=list(RENDERERS), dest="formats",
+                                   help="Output format (repeat for several; default markdown)")
+    export_all_parser.add_argument("--pattern", help="Only documents whose name matches this glob")
+    export_all_parser.add_argument("--output-dir", help="Output directory (default: new directory under the export directory)")
+    export_all_parser.add_argument("--workers", type=int, help="Number of export threads")
     
     # Get by type command
     type_parser = subparsers.add_parser("by-type", help="Get nodes by type")
     type_parser.add_argument("node_type", help="Node type to search for")
+    type_parser.add_argument("--document", help="Document name (omit for the default table)")
+    
+    # Dump command
+    dump_parser = subparsers.add_parser("dump", help="Dump a document to a file")
+    dump_parser.add_argument("document_name", help="Document to dump")
+    dump_parser.add_argument("output", help="Dump file path")
+    dump_parser.add_argument("--no-compress", action="store_true", help="Write the dump without gzip")
+    dump_parser.add_argument("--overwrite", action="store_true",
+                             help="Replace the dump file if it exists")
+    
+    # Load command
+    load_parser = subparsers.add_parser("load", help="Load a document dump as a new document")
+    load_parser.add_argument("input", help="Dump file path")
+    load_parser.add_argument("--name", help="Document name (defaults to the dumped name)")
+    load_parser.add_argument("--title", help="Document title (defaults to the dumped title)")
+    
+    # NDJSON export command
+    export_ndjson_parser = subparsers.add_parser("export-ndjson", help="Export nodes as NDJSON")
+    export_ndjson_parser.add_argument("output", help="Output file path ('-' for stdout)")
+    export_ndjson_parser.add_argument("--document", help="Document to export (omit for the whole database)")
+    
+    # NDJSON import command
+    import_ndjson_parser = subparsers.add_parser("import-ndjson", help="Import nodes from NDJSON")
+    import_ndjson_parser.add_argument("input", help="Input file path ('-' for stdin)")
+    import_ndjson_parser.add_argument("--document", help="Load every node into this document")
+    
+    # Migrate command
+    migrate_parser = subparsers.add_parser("migrate", help="Apply pending schema migrations")
+    migrate_parser.add_argument("--dry-run", action="store_true",
+                                help="Run and time the migrations, then roll them back")
+    
+    # Backup command
+    backup_parser = subparsers.add_parser("backup", help="Back up the database online")
+    backup_parser.add_argument("target", help="Backup file path")
+    backup_parser.add_argument("--compact", action="store_true",
+                               help="Write a compacted snapshot with VACUUM INTO")
+    backup_parser.add_argument("--pages", type=int, default=1024,
+                               help="Pages copied per step (default 1024)")
+    backup_parser.add_argument("--overwrite", action="store_true",
+                               help="Replace the target file if it exists")
+    
+    # Maintenance command
+    maintenance_parser = subparsers.add_parser(
+        "maintenance", help="Sweep orphaned nodes, analyze, vacuum and integrity-check the database")
+    maintenance_parser.add_argument("--no-sweep", action="store_true", help="Skip removing orphaned nodes")
+    maintenance_parser.add_argument("--no-analyze", action="store_true", help="Skip ANALYZE/optimize")
+    maintenance_parser.add_argument("--no-vacuum", action="store_true", help="Skip reclaiming free pages")
+    maintenance_parser.add_argument("--no-integrity", action="store_true", help="Skip the integrity check")
+    maintenance_parser.add_argument("--quick", action="store_true",
+                                    help="Use quick_check instead of the full integrity_check")
     
     args = parser.parse_args()
     
@@ -202,6 +577,24 @@ def main():
         parser.print_help()
         return
     
+    # Migrations run before the database is opened, which would apply them itself
+    if args.command == "migrate":
+        try:
+            migrate(args.db, args.dry_run)
+        except Exception as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        return
+    
+    # Backups read the database file directly and need no schema setup
+    if args.command == "backup":
+        try:
+            backup(args.db, args.target, args.compact, args.pages, args.overwrite)
+        except Exception as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        return
+    
     cli = DocumentManagerCLI(args.db)
     
     try:
@@ -211,29 +604,68 @@ def main():
                 node_type=args.node_type,
                 content=args.content,
                 parent_id=args.parent_id,
-                metadata=args.metadata
+                metadata=args.metadata,
+                document_name=args.document
             )
         elif args.command == "get":
-            cli.get_node(args.node_id)
+            cli.get_node(args.node_id, args.document)
         elif args.command == "update":
             cli.update_node(
                 node_id=args.node_id,
                 title=args.title,
                 content=args.content,
-                metadata=args.metadata
+                metadata=args.metadata,
+                expected_version=args.expected_version,
+                document_name=args.document
             )
         elif args.command == "delete":
-            cli.delete_node(args.node_id)
+            cli.delete_node(args.node_id, args.expected_version, args.document)
+        elif args.command == "move":
+            cli.move_node(args.node_id, args.parent_id, args.expected_version, args.document)
+        elif args.command == "path":
+            cli.show_path(args.node_id, args.document)
+        elif args.command == "patch-metadata":
+            cli.patch_metadata(args.node_id, args.patch, args.remove, args.expected_version, args.document)
+        elif args.command == "revisions":
+            cli.show_revisions(args.node_id, args.document)
+        elif args.command == "restore-revision":
+            cli.restore_revision(args.node_id, args.revision, args.expected_version, args.document)
+        elif args.command == "snapshot":
+            cli.create_snapshot(args.name, args.document, args.description)
+        elif args.command == "snapshots":
+            cli.show_snapshots(args.document)
+        elif args.command == "diff-snapshots":
+            cli.diff_snapshots(args.name, args.other, args.document)
+        elif args.command == "restore-snapshot":
+            cli.restore_snapshot(args.name, args.document)
+        elif args.command == "delete-snapshot":
+            cli.delete_snapshot(args.name, args.document)
         elif args.command == "list":
-            cli.list_children(args.parent_id)
+            cli.list_children(args.parent_id, args.document)
         elif args.command == "search":
-            cli.search_nodes(query=args.query or "", node_type=args.type)
+            cli.search_nodes(query=args.query or "", node_type=args.type, document_name=args.document)
         elif args.command == "tree":
-            cli.show_tree(args.parent_id)
+            cli.show_tree(args.parent_id, args.document)
         elif args.command == "export":
-            cli.export_markdown(args.parent_id, args.output)
+            cli.export_markdown(args.parent_id, args.output, args.document)
+        elif args.command == "render":
+            cli.render(args.formats or ["markdown"], args.parent_id, args.name, args.output_dir, args.document)
+        elif args.command == "export-all":
+            cli.export_all(args.formats or ["markdown"], args.pattern, args.output_dir, args.workers)
         elif args.command == "by-type":
-            cli.get_nodes_by_type(args.node_type)
+            cli.get_nodes_by_type(args.node_type, args.document)
+        elif args.command == "dump":
+            cli.dump_document(args.document_name, args.output,
+                              compress=not args.no_compress, overwrite=args.overwrite)
+        elif args.command == "load":
+            cli.load_document(args.input, args.name, args.title)
+        elif args.command == "export-ndjson":
+            cli.export_ndjson(args.output, args.document)
+        elif args.command == "import-ndjson":
+            cli.import_ndjson(args.input, args.document)
+        elif args.command == "maintenance":
+            maintenance(args.db, analyze=not args.no_analyze, vacuum=not args.no_vacuum,
+                        integrity=not args.no_integrity, quick=args.quick, sweep=not args.no_sweep)
         else:
             print(f"Unknown command: {args.command}")
             parser.print_help()
@@ -15,7 +15,11 @@ class Config:
         self._load_config()
     
     def _load_config(self):
-        """Load configuration from environment variables with defaults."""
+        """Load configuration from environment variables with defaults.
+        
+        No directories are created here; they are created on first use so that
+        importing the package stays cheap.
+        """
         # Database configuration
         self.database_path = os.getenv(
             'DOC_MANAGER_DB_PATH', 
@@ -28,6 +32,9 @@ class Config:
             os.path.expanduser('~/Desktop')
         )
         
+        # Backup configuration
+        self.backup_directory = os.getenv('DOC_MANAGER_BACKUP_DIR', '')
+        
         # Server configuration
         self.server_name = os.getenv('LUMINA_DOCS_SERVER_NAME', 'lumina-docs')
         
@@ -35,14 +42,46 @@ class Config:
         self.debug_mode = os.getenv('DOC_MANAGER_DEBUG', 'false').lower() == 'true'
         self.log_level = os.getenv('DOC_MANAGER_LOG_LEVEL', 'INFO').upper()
         
+        # Storage configuration
+        self.content_dedup = os.getenv('DOC_MANAGER_CONTENT_DEDUP', 'false').lower() == 'true'
+        self.dedup_min_size = int(os.getenv('DOC_MANAGER_DEDUP_MIN_SIZE', '256'))
+        self.compression = os.getenv('DOC_MANAGER_COMPRESSION', 'none').lower()
+        self.compression_threshold = int(os.getenv('DOC_MANAGER_COMPRESSION_THRESHOLD', '16384'))
+        
+        # Apply pending schema migrations automatically on startup
+        self.auto_migrate = os.getenv('DOC_MANAGER_AUTO_MIGRATE', 'true').lower() == 'true'
+        
+        # Run database maintenance in the server every N hours (0 disables it)
+        self.maintenance_interval_hours = float(os.getenv('DOC_MANAGER_MAINTENANCE_INTERVAL_HOURS', '0'))
+        
+        # Serialize the server's mutations on one writer thread, committing
+        # them in groups of up to max_batch, waiting up to delay_ms for more
+        self.group_commit = os.getenv('DOC_MANAGER_GROUP_COMMIT', 'true').lower() == 'true'
+        self.group_commit_max_batch = int(os.getenv('DOC_MANAGER_GROUP_COMMIT_MAX_BATCH', '64'))
+        self.group_commit_delay_ms = float(os.getenv('DOC_MANAGER_GROUP_COMMIT_DELAY_MS', '0'))
+        
+        # Read-only replica: no schema setup, no mutation tools, cached reads.
+        # Immutable additionally tells SQLite the file never changes (only
+        # safe when no process writes to it at all)
+        self.read_only = os.getenv('DOC_MANAGER_READ_ONLY', 'false').lower() == 'true'
+        self.immutable = os.getenv('DOC_MANAGER_IMMUTABLE', 'false').lower() == 'true'
+        
+        # Memory for cached Markdown exports of unchanged subtrees (0 disables it)
+        self.export_cache_mb = float(os.getenv('DOC_MANAGER_EXPORT_CACHE_MB', '64'))
+        
+        # Keep a revision history of node edits, storing a full copy of the
+        # body every N revisions and deltas in between
+        self.revision_history = os.getenv('DOC_MANAGER_REVISION_HISTORY', 'true').lower() == 'true'
+        self.revision_full_interval = int(os.getenv('DOC_MANAGER_REVISION_FULL_INTERVAL', '32'))
+        
+        # Days of change log kept for incremental consumers (0 keeps it forever)
+        self.change_log_retention_days = float(os.getenv('DOC_MANAGER_CHANGE_LOG_RETENTION_DAYS', '30'))
+        
         # Data directory (for relative paths)
         self.data_directory = os.getenv(
             'DOC_MANAGER_DATA_DIR',
             self._get_default_data_dir()
         )
-        
-        # Ensure directories exist
-        self._ensure_directories()
     
     def _get_default_db_path(self) -> str:
         """Get default database path relative to package or data directory."""
@@ -62,26 +101,26 @@ class Config:
         # Otherwise use user's home directory
         return os.path.expanduser('~/.lumina-docs')
     
-    def _ensure_directories(self):
-        """Ensure required directories exist."""
-        # Ensure database directory exists
-        db_dir = os.path.dirname(self.database_path)
-        Path(db_dir).mkdir(parents=True, exist_ok=True)
-        
-        # Ensure export directory exists
-        Path(self.export_directory).mkdir(parents=True, exist_ok=True)
-        
-        # Ensure data directory exists
-        Path(self.data_directory).mkdir(parents=True, exist_ok=True)
-    
     def get_database_path(self) -> str:
-        """Get the database file path."""
+        """Get the database file path (its directory is created by DocumentDatabase)."""
         return self.database_path
     
     def get_export_directory(self) -> str:
-        """Get the export directory path."""
+        """Get the export directory path, creating it if needed."""
+        Path(self.export_directory).mkdir(parents=True, exist_ok=True)
         return self.export_directory
     
+    def get_data_directory(self) -> str:
+        """Get the data directory path, creating it if needed."""
+        Path(self.data_directory).mkdir(parents=True, exist_ok=True)
+        return self.data_directory
+    
+    def get_backup_directory(self) -> str:
+        """Get the backup directory path (default <data_dir>/backups), creating it if needed."""
+        directory = self.backup_directory or os.path.join(self.data_directory, 'backups')
+        Path(directory).mkdir(parents=True, exist_ok=True)
+        return directory
+    
     def get_server_name(self) -> str:
         """Get the MCP server name."""
         return self.server_name
@@ -94,14 +133,90 @@ class Config:
         """Get the log level."""
         return self.log_level
     
+    def is_content_dedup_enabled(self) -> bool:
+        """Check if node bodies are stored in the deduplicated content store."""
+        return self.content_dedup
+    
+    def get_dedup_min_size(self) -> int:
+        """Get the minimum body size in bytes for content deduplication."""
+        return self.dedup_min_size
+    
+    def is_auto_migrate_enabled(self) -> bool:
+        """Check if pending schema migrations are applied automatically on startup."""
+        return self.auto_migrate
+    
+    def get_maintenance_interval(self) -> float:
+        """Get the interval between scheduled maintenance runs in seconds (0 if disabled)."""
+        return self.maintenance_interval_hours * 3600
+    
+    def is_group_commit_enabled(self) -> bool:
+        """Check if the server routes mutations through the group-committing writer thread."""
+        return self.group_commit
+    
+    def get_group_commit_max_batch(self) -> int:
+        """Get the maximum number of mutations committed together."""
+        return self.group_commit_max_batch
+    
+    def get_group_commit_delay(self) -> float:
+        """Get how long the writer waits for more mutations before committing, in seconds."""
+        return self.group_commit_delay_ms / 1000
+    
+    def is_read_only(self) -> bool:
+        """Check if the server runs as a read-only replica."""
+        return self.read_only
+    
+    def is_immutable(self) -> bool:
+        """Check if a read-only replica may treat the database file as never changing."""
+        return self.read_only and self.immutable
+    
+    def get_export_cache_size(self) -> int:
+        """Get the memory budget of the subtree export cache in bytes (0 if disabled)."""
+        return int(self.export_cache_mb * 1024 * 1024)
+    
+    def is_revision_history_enabled(self) -> bool:
+        """Check if node edits are recorded in the revision history."""
+        return self.revision_history
+    
+    def get_revision_full_interval(self) -> int:
+        """Get how many revisions apart full copies of a node body are stored."""
+        return self.revision_full_interval
+    
+    def get_change_log_retention_days(self) -> float:
+        """Get how many days of change log maintenance keeps (0 if kept forever)."""
+        return self.change_log_retention_days
+    
+    def get_compression(self) -> str:
+        """Get the codec for large node bodies ('none', 'zlib' or 'lzma')."""
+        return self.compression
+    
+    def get_compression_threshold(self) -> int:
+        """Get the minimum body size in bytes before it is compressed."""
+        return self.compression_threshold
+    
     def to_dict(self) -> dict:
         """Export configuration as dictionary."""
         return {
             'database_path': self.database_path,
             'export_directory': self.export_directory,
+            'backup_directory': self.backup_directory,
             'server_name': self.server_name,
             'debug_mode': self.debug_mode,
             'log_level': self.log_level,
+            'content_dedup': self.content_dedup,
+            'dedup_min_size': self.dedup_min_size,
+            'compression': self.compression,
+            'compression_threshold': self.compression_threshold,
+            'auto_migrate': self.auto_migrate,
+            'maintenance_interval_hours': self.maintenance_interval_hours,
+            'group_commit': self.group_commit,
+            'group_commit_max_batch': self.group_commit_max_batch,
+            'group_commit_delay_ms': self.group_commit_delay_ms,
+            'read_only': self.read_only,
+            'immutable': self.immutable,
+            'export_cache_mb': self.export_cache_mb,
+            'revision_history': self.revision_history,
+            'revision_full_interval': self.revision_full_interval,
+            'change_log_retention_days': self.change_log_retention_days,
             'data_directory': self.data_directory,
         }
     
@@ -110,9 +225,20 @@ class Config:
         print("Lumina Docs Configuration:")
         print(f"  Database Path: {self.database_path}")
         print(f"  Export Directory: {self.export_directory}")
+        print(f"  Backup Directory: {self.backup_directory or '<data_dir>/backups'}")
         print(f"  Server Name: {self.server_name}")
         print(f"  Debug Mode: {self.debug_mode}")
         print(f"  Log Level: {self.log_level}")
+        print(f"  Content Dedup: {self.content_dedup} (min {self.dedup_min_size} bytes)")
+        print(f"  Compression: {self.compression} (min {self.compression_threshold} bytes)")
+        print(f"  Auto Migrate: {self.auto_migrate}")
+        print(f"  Maintenance Interval: {self.maintenance_interval_hours or 'disabled'} hours")
+        print(f"  Group Commit: {self.group_commit} "
+              f"(max {self.group_commit_max_batch} writes, {self.group_commit_delay_ms} ms delay)")
+        print(f"  Read Only: {self.read_only} (immutable: {self.immutable})")
+        print(f"  Export Cache: {self.export_cache_mb or 'disabled'} MB")
+        print(f"  Revision History: {self.revision_history} (full copy every {self.revision_full_interval})")
+        print(f"  Change Log Retention: {self.change_log_retention_days or 'forever'} days")
         print(f"  Data Directory: {self.data_directory}")
 
 
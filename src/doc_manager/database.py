@@ -3,112 +3,213 @@ Database schema and operations for document management system.
 """
 import sqlite3
 import json
-from typing import Optional, List, Dict, Any, Tuple
+import hashlib
+import io
+import threading
+import lzma
+import zlib
+from itertools import islice
+from typing import Optional, List, Dict, Any, Callable, Iterable, Iterator, Tuple, TypeVar
 from pathlib import Path
 from datetime import datetime
 from .config import config
+from .export_cache import SubtreeCache
+from .nodes import Node, parse_metadata
+from .revisions import apply_delta, make_delta
+from .writer import WriteQueue
+from .migrations import (
+    SCHEMA_VERSION, content_table_name, create_node_table, get_node_tables, get_schema_version,
+    run_migrations
+)
+
+T = TypeVar('T')
+
+# Spacing between the sort_order keys of appended siblings, leaving room to
+# insert between neighbours without renumbering them
+SORT_ORDER_GAP = 1024
+
+# Most change log entries returned by one get_changes_since call
+MAX_CHANGES_BATCH = 10000
+
+# Node columns update_nodes_where can set
+BULK_UPDATE_FIELDS = ('title', 'node_type', 'metadata')
+
+# Node fields diff_snapshots compares (level follows parent_id)
+SNAPSHOT_DIFF_FIELDS = ('parent_id', 'title', 'node_type', 'sort_order', 'metadata', 'content')
+
+# Columns of a node saved for a snapshot, besides the snapshot_id, as written by _preserve_rows
+SNAPSHOT_ROW_COLUMNS = (
+    "node_id, present, parent_id, title, node_type, level, sort_order, metadata, "
+    "content, content_encoding, created_at, version"
+)
+
+# Codecs for compressed node bodies, keyed by the content_encoding flag
+CONTENT_CODECS = {
+    'zlib': (zlib.compress, zlib.decompress),
+    'lzma': (lzma.compress, lzma.decompress),
+}
+
+# Node columns as returned to callers. Bodies live in a side table (aliased c)
+# and, when deduplicated, in the content store (cs); both are joined only when
+# content is requested, and decoded by _row_to_dict
+NODE_CONTENT_EXPR = "COALESCE(cs.content, c.content)"
+NODE_ENCODING_EXPR = "CASE WHEN c.content_hash IS NULL THEN c.content_encoding ELSE cs.encoding END"
+NODE_STRUCTURE_COLUMNS = (
+    "n.id, n.parent_id, n.title, "
+    "n.node_type, n.level, n.sort_order, n.metadata, n.created_at, n.updated_at, n.version"
+)
+NODE_COLUMNS = (
+    "n.id, n.parent_id, n.title, " + NODE_CONTENT_EXPR + " AS content, "
+    + NODE_ENCODING_EXPR + " AS content_encoding, "
+    "n.node_type, n.level, n.sort_order, n.metadata, n.created_at, n.updated_at, n.version"
+)
+# Plain-text body for filtering in SQL; only compressed rows call into Python
+NODE_TEXT_EXPR = (
+    f"CASE WHEN {NODE_ENCODING_EXPR} IS NULL THEN {NODE_CONTENT_EXPR} "
+    f"ELSE decode_content({NODE_CONTENT_EXPR}, {NODE_ENCODING_EXPR}) END"
+)
+
+
+def decode_content(content: Any, encoding: Optional[str]) -> Optional[str]:
+    """Decode a stored node body according to its content_encoding flag."""
+    if content is None or not encoding:
+        return content
+    return CONTENT_CODECS[encoding][1](content).decode('utf-8')
+
+
+class VersionConflictError(ValueError):
+    """A node changed since the version the caller based its write on."""
+    
+    def __init__(self, node_id: int, expected_version: int, current_version: int):
+        super().__init__(
+            f"Node {node_id} is at version {current_version}, not the expected version {expected_version}"
+        )
+        self.node_id = node_id
+        self.expected_version = expected_version
+        self.current_version = current_version
 
 
 class DocumentDatabase:
     """SQLite database manager for structured document management."""
     
-    def __init__(self, db_path: Optional[str] = None):
-        """Initialize database connection and create tables if not exist."""
+    def __init__(self,
+                 db_path: Optional[str] = None,
+                 content_dedup: Optional[bool] = None,
+                 read_only: bool = False,
+                 immutable: bool = False):
+        """Initialize database connection and create tables if not exist.
+        
+        With read_only, connections are opened with SQLite's read-only mode
+        and the schema is neither created nor migrated, so the database must
+        already exist at the current schema. immutable (read-only only) also
+        tells SQLite the file cannot change, skipping locking entirely.
+        """
         # Use config path if not provided
         if db_path is None:
             db_path = config.get_database_path()
         
+        self.db_path = db_path
+        self.read_only = read_only
+        self.immutable = read_only and immutable
+        self._watch_conn: Optional[sqlite3.Connection] = None
+        self._watch_lock = threading.Lock()
+        self.writer: Optional[WriteQueue] = None
+        self.content_dedup = config.is_content_dedup_enabled() if content_dedup is None else content_dedup
+        self.dedup_min_size = config.get_dedup_min_size()
+        self.compression = config.get_compression()
+        self.compression_threshold = config.get_compression_threshold()
+        if self.compression != 'none' and self.compression not in CONTENT_CODECS:
+            raise ValueError(f"Unsupported compression '{self.compression}'")
+        self.revision_history = config.is_revision_history_enabled()
+        self.revision_full_interval = max(1, config.get_revision_full_interval())
+        cache_size = config.get_export_cache_size()
+        self.export_cache = SubtreeCache(cache_size) if cache_size > 0 else None
+        
+        if read_only:
+            if not Path(db_path).exists():
+                raise FileNotFoundError(f"Database not found: {db_path}")
+            with self.get_connection() as conn:
+                version = get_schema_version(conn)
+            if version < SCHEMA_VERSION:
+                raise RuntimeError(
+                    f"Database schema version {version} is older than {SCHEMA_VERSION}; "
+                    f"it must be migrated by a writable instance first"
+                )
+            return
+        
         # Ensure database directory exists
         db_file = Path(db_path)
         db_file.parent.mkdir(parents=True, exist_ok=True)
-        
-        self.db_path = db_path
-        self.init_database()
-        self.init_documents_metadata_table()
+        self.init_schema()
     
     def get_connection(self) -> sqlite3.Connection:
         """Get database connection with row factory."""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         conn.row_factory = sqlite3.Row
+        conn.create_function("decode_content", 2, decode_content, deterministic=True)
         return conn
     
-    def init_database(self) -> None:
-        """Initialize database schema."""
+    def _connect(self, **kwargs: Any) -> sqlite3.Connection:
+        """Open a plain connection, through a read-only URI for read-only databases."""
+        if self.read_only:
+            options = "mode=ro&immutable=1" if self.immutable else "mode=ro"
+            return sqlite3.connect(f"{Path(self.db_path).resolve().as_uri()}?{options}", uri=True, **kwargs)
+        return sqlite3.connect(self.db_path, **kwargs)
+    
+    def start_writer(self, max_batch: int = 64, max_delay: float = 0.0) -> None:
+        """Route all mutations through a single writer thread that commits them in groups."""
+        if self.writer is None:
+            self.writer = WriteQueue(self.get_connection, max_batch, max_delay)
+        self.writer.start()
+    
+    def stop_writer(self) -> None:
+        """Commit queued mutations and go back to writing on per-call connections."""
+        if self.writer is not None:
+            self.writer.stop()
+            self.writer = None
+    
+    def _write(self, operation: Callable[[sqlite3.Connection], T]) -> T:
+        """Run a mutation in a transaction, on the writer thread if one is running.
+        
+        Without a writer the operation gets its own connection and commits on
+        return. With one it is queued and this call waits until the group
+        containing it has been committed.
+        """
+        if self.writer is not None:
+            if self.writer.in_writer_thread():
+                raise RuntimeError("Write operations cannot be nested")
+            return self.writer.submit(operation).result()
+        
         with self.get_connection() as conn:
-            # Create main document nodes table
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS document_nodes (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    parent_id INTEGER,
-                    title TEXT NOT NULL,
-                    content TEXT,
-                    node_type TEXT NOT NULL,
-                    level INTEGER NOT NULL DEFAULT 1,
-                    sort_order INTEGER NOT NULL DEFAULT 0,
-                    metadata TEXT DEFAULT '{}',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (parent_id) REFERENCES document_nodes(id) ON DELETE CASCADE
-                )
-            """)
-            
-            # Create indexes for better query performance
-            conn.execute("""
-                CREATE INDEX IF NOT EXISTS idx_parent_id 
-                ON document_nodes(parent_id)
-            """)
-            
-            conn.execute("""
-                CREATE INDEX IF NOT EXISTS idx_node_type 
-                ON document_nodes(node_type)
-            """)
-            
-            conn.execute("""
-                CREATE INDEX IF NOT EXISTS idx_level_sort 
-                ON document_nodes(level, sort_order)
-            """)
-            
-            # Create trigger to update updated_at timestamp
-            conn.execute("""
-                CREATE TRIGGER IF NOT EXISTS update_timestamp 
-                AFTER UPDATE ON document_nodes
-                BEGIN
-                    UPDATE document_nodes 
-                    SET updated_at = CURRENT_TIMESTAMP 
-                    WHERE id = NEW.id;
-                END
-            """)
-            
-            conn.commit()
+            return operation(conn)
+    
+    def get_data_version(self) -> int:
+        """Value that changes whenever another connection commits to the database.
+        
+        Read from PRAGMA data_version on a connection kept open for the
+        purpose, so callers can cache query results and drop them when the
+        value moves. Always 0 for immutable databases, which cannot change.
+        """
+        if self.immutable:
+            return 0
+        with self._watch_lock:
+            if self._watch_conn is None:
+                self._watch_conn = self._connect(check_same_thread=False)
+            return self._watch_conn.execute("PRAGMA data_version").fetchone()[0]
     
-    def init_documents_metadata_table(self) -> None:
-        """Initialize documents metadata table to track all documents."""
+    def init_schema(self) -> None:
+        """Apply pending schema migrations unless the stored schema version is current."""
         with self.get_connection() as conn:
-            # Create documents metadata table
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS documents_metadata (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    document_name TEXT UNIQUE NOT NULL,
-                    table_name TEXT UNIQUE NOT NULL,
-                    title TEXT NOT NULL,
-                    description TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # Create trigger to update updated_at timestamp for documents
-            conn.execute("""
-                CREATE TRIGGER IF NOT EXISTS update_documents_timestamp 
-                AFTER UPDATE ON documents_metadata
-                BEGIN
-                    UPDATE documents_metadata 
-                    SET updated_at = CURRENT_TIMESTAMP 
-                    WHERE id = NEW.id;
-                END
-            """)
-            
-            conn.commit()
+            version = get_schema_version(conn)
+        if version >= SCHEMA_VERSION:
+            return
+        
+        if not config.is_auto_migrate_enabled():
+            raise RuntimeError(
+                f"Database schema version {version} is older than {SCHEMA_VERSION}; "
+                f"run 'lumina-docs migrate' to upgrade it"
+            )
+        run_migrations(self.db_path)
     
     def create_document(self, document_name: str, title: str, description: Optional[str] = None) -> str:
         """Create a new document with its own table."""
@@ -119,7 +220,7 @@ class DocumentDatabase:
         import re
         table_name = re.sub(r'[^a-zA-Z0-9_]', '', table_name)
         
-        with self.get_connection() as conn:
+        def operation(conn: sqlite3.Connection) -> str:
             try:
                 # Insert document metadata
                 cursor = conn.execute("""
@@ -127,51 +228,10 @@ class DocumentDatabase:
                     VALUES (?, ?, ?, ?)
                 """, (document_name, table_name, title, description))
                 
-                # Create document-specific table
-                conn.execute(f"""
-                    CREATE TABLE {table_name} (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        parent_id INTEGER,
-                        title TEXT NOT NULL,
-                        content TEXT,
-                        node_type TEXT NOT NULL,
-                        level INTEGER NOT NULL DEFAULT 1,
-                        sort_order INTEGER NOT NULL DEFAULT 0,
-                        metadata TEXT DEFAULT '{{}}',
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY (parent_id) REFERENCES {table_name}(id) ON DELETE CASCADE
-                    )
-                """)
-                
-                # Create indexes for the new table
-                conn.execute(f"""
-                    CREATE INDEX idx_{table_name}_parent_id 
-                    ON {table_name}(parent_id)
-                """)
+                # Create document-specific tables at the current schema
+                create_node_table(conn, table_name)
                 
-                conn.execute(f"""
-                    CREATE INDEX idx_{table_name}_node_type 
-                    ON {table_name}(node_type)
-                """)
-                
-                conn.execute(f"""
-                    CREATE INDEX idx_{table_name}_level_sort 
-                    ON {table_name}(level, sort_order)
-                """)
-                
-                # Create trigger for the new table
-                conn.execute(f"""
-                    CREATE TRIGGER update_{table_name}_timestamp 
-                    AFTER UPDATE ON {table_name}
-                    BEGIN
-                        UPDATE {table_name} 
-                        SET updated_at = CURRENT_TIMESTAMP 
-                        WHERE id = NEW.id;
-                    END
-                """)
-                
-                conn.commit()
+                self._log_document_change(conn, document_name, 'create_document')
                 return table_name
                 
             except sqlite3.IntegrityError as e:
@@ -179,6 +239,8 @@ class DocumentDatabase:
                     raise ValueError(f"Document '{document_name}' already exists")
                 else:
                     raise e
+        
+        return self._write(operation)
     
     def get_documents_list(self) -> List[Dict[str, Any]]:
         """Get list of all documents."""
@@ -200,29 +262,59 @@ class DocumentDatabase:
             
             return row['table_name'] if row else None
     
+    def get_document(self, document_name: str) -> Optional[Dict[str, Any]]:
+        """Get the metadata row of a document."""
+        with self.get_connection() as conn:
+            row = conn.execute("""
+                SELECT * FROM documents_metadata 
+                WHERE document_name = ?
+            """, (document_name,)).fetchone()
+            
+            return dict(row) if row else None
+    
+    def _resolve_table_name(self, document_name: Optional[str]) -> str:
+        """Get the node table for a document, or the default table if none given."""
+        if not document_name:
+            return "document_nodes"  # Use default table
+        
+        table_name = self.get_document_table_name(document_name)
+        if not table_name:
+            raise ValueError(f"Document '{document_name}' does not exist")
+        return table_name
+    
     def delete_document(self, document_name: str) -> bool:
         """Delete a document and its table."""
         table_name = self.get_document_table_name(document_name)
         if not table_name:
             return False
             
-        with self.get_connection() as conn:
-            try:
-                # Drop the document table
-                conn.execute(f"DROP TABLE IF EXISTS {table_name}")
-                
-                # Remove from metadata
-                cursor = conn.execute("""
-                    DELETE FROM documents_metadata 
-                    WHERE document_name = ?
-                """, (document_name,))
-                
-                conn.commit()
-                return cursor.rowcount > 0
-                
-            except Exception:
-                return False
+        def operation(conn: sqlite3.Connection) -> bool:
+            self._discard_cached_exports(conn, table_name)
 
+            conn.execute("DELETE FROM node_revisions WHERE table_name = ?", (table_name,))
+            conn.execute("""
+                DELETE FROM snapshot_rows WHERE snapshot_id IN 
+                (SELECT id FROM document_snapshots WHERE table_name = ?)
+            """, (table_name,))
+            conn.execute("DELETE FROM document_snapshots WHERE table_name = ?", (table_name,))
+            
+            # Release shared bodies, then drop the document tables
+            content_table = content_table_name(table_name)
+            self._release_content(conn, content_table, "1=1")
+            conn.execute(f"DROP TABLE IF EXISTS {content_table}")
+            conn.execute(f"DROP TABLE IF EXISTS {table_name}")
+            
+            # Remove from metadata
+            cursor = conn.execute("""
+                DELETE FROM documents_metadata 
+                WHERE document_name = ?
+            """, (document_name,))
+            
+            self._log_document_change(conn, document_name, 'delete_document')
+            return cursor.rowcount > 0
+        
+        return self._write(operation)
+    
     def create_node(self, 
                    title: str, 
                    node_type: str,
@@ -232,63 +324,227 @@ class DocumentDatabase:
                    sort_order: Optional[int] = None,
                    document_name: Optional[str] = None) -> int:
         """Create a new document node."""
-        # Determine table name
-        if document_name:
-            table_name = self.get_document_table_name(document_name)
-            if not table_name:
-                raise ValueError(f"Document '{document_name}' does not exist")
-        else:
-            table_name = "document_nodes"  # Use default table
+        table_name = self._resolve_table_name(document_name)
         
-        with self.get_connection() as conn:
-            # Calculate level based on parent
-            if parent_id is None:
-                level = 1
-            else:
-                parent_level = conn.execute(
-                    f"SELECT level FROM {table_name} WHERE id = ?", 
-                    (parent_id,)
-                ).fetchone()
-                level = (parent_level['level'] + 1) if parent_level else 1
+        def operation(conn: sqlite3.Connection) -> int:
+            return self._insert_node(
+                conn, table_name, title, node_type, content,
+                parent_id, metadata, sort_order
+            )
+        
+        return self._write(operation)
+    
+    def _insert_node(self,
+                     conn: sqlite3.Connection,
+                     table_name: str,
+                     title: str,
+                     node_type: str,
+                     content: Optional[str],
+                     parent_id: Optional[int],
+                     metadata: Optional[Dict[str, Any]],
+                     sort_order: Optional[int]) -> int:
+        """Insert a node, deriving level and sort_order in the same statement."""
+        # Level follows the parent (1 for roots or unknown parents); without an
+        # explicit sort_order the node is appended one gap after its last sibling
+        cursor = conn.execute(f"""
+            INSERT INTO {table_name} 
+            (parent_id, title, node_type, level, sort_order, metadata)
+            VALUES (
+                ?, ?, ?,
+                COALESCE((SELECT level + 1 FROM {table_name} WHERE id = ?), 1),
+                COALESCE(?, COALESCE(
+                    (SELECT MAX(sort_order) FROM {table_name} WHERE parent_id IS ?), 0
+                ) + ?),
+                ?
+            )
+        """, (
+            parent_id, 
+            title, 
+            node_type, 
+            parent_id,
+            sort_order,
+            parent_id,
+            SORT_ORDER_GAP,
+            json.dumps(metadata or {})
+        ))
+        node_id = cursor.lastrowid
+        
+        if content is not None:
+            self._write_content(conn, table_name, node_id, content)
+        
+        self._preserve_rows(conn, table_name, "?", (node_id,), present=False)
+        self._bump_subtree_versions(conn, table_name, node_id)
+        self._log_changes(conn, table_name, 'create', "?", (node_id,))
+        return node_id
+    
+    def insert_before(self,
+                      sibling_id: int,
+                      title: str,
+                      node_type: str,
+                      content: Optional[str] = None,
+                      metadata: Optional[Dict[str, Any]] = None,
+                      document_name: Optional[str] = None) -> int:
+        """Create a new node immediately before an existing sibling."""
+        return self._insert_beside(
+            sibling_id, True, title, node_type, content, metadata, document_name
+        )
+    
+    def insert_after(self,
+                     sibling_id: int,
+                     title: str,
+                     node_type: str,
+                     content: Optional[str] = None,
+                     metadata: Optional[Dict[str, Any]] = None,
+                     document_name: Optional[str] = None) -> int:
+        """Create a new node immediately after an existing sibling."""
+        return self._insert_beside(
+            sibling_id, False, title, node_type, content, metadata, document_name
+        )
+    
+    def _insert_beside(self,
+                       sibling_id: int,
+                       before: bool,
+                       title: str,
+                       node_type: str,
+                       content: Optional[str],
+                       metadata: Optional[Dict[str, Any]],
+                       document_name: Optional[str]) -> int:
+        """Insert a node next to a sibling, touching only the new row when a gap is free."""
+        table_name = self._resolve_table_name(document_name)
+        
+        def operation(conn: sqlite3.Connection) -> int:
+            sibling = conn.execute(
+                f"SELECT parent_id FROM {table_name} WHERE id = ?", 
+                (sibling_id,)
+            ).fetchone()
+            if not sibling:
+                raise ValueError(f"Node {sibling_id} does not exist")
             
-            # Calculate sort_order if not provided
+            parent_id = sibling['parent_id']
+            sort_order = self._sort_order_beside(conn, table_name, sibling_id, before)
             if sort_order is None:
-                max_order = conn.execute(
-                    f"SELECT MAX(sort_order) as max_order FROM {table_name} WHERE parent_id = ?",
-                    (parent_id,)
-                ).fetchone()
-                sort_order = (max_order['max_order'] or 0) + 1
+                # No free key between the neighbours: spread the siblings out again
+                self._rebalance_children(conn, table_name, parent_id)
+                sort_order = self._sort_order_beside(conn, table_name, sibling_id, before)
             
-            # Insert new node
-            cursor = conn.execute(f"""
-                INSERT INTO {table_name} 
-                (parent_id, title, content, node_type, level, sort_order, metadata)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (
-                parent_id, 
-                title, 
-                content, 
-                node_type, 
-                level, 
-                sort_order,
-                json.dumps(metadata or {})
-            ))
+            return self._insert_node(
+                conn, table_name, title, node_type, content,
+                parent_id, metadata, sort_order
+            )
+        
+        return self._write(operation)
+    
+    def _sort_order_beside(self,
+                           conn: sqlite3.Connection,
+                           table_name: str,
+                           sibling_id: int,
+                           before: bool) -> Optional[int]:
+        """Pick a sort_order between a sibling and its neighbour, or None if none is free."""
+        sibling = conn.execute(
+            f"SELECT parent_id, sort_order FROM {table_name} WHERE id = ?", 
+            (sibling_id,)
+        ).fetchone()
+        parent_id, anchor = sibling['parent_id'], sibling['sort_order']
+        
+        # Siblings sharing the anchor's key cannot be split without renumbering
+        ties = conn.execute(
+            f"SELECT COUNT(*) FROM {table_name} WHERE parent_id IS ? AND sort_order = ?",
+            (parent_id, anchor)
+        ).fetchone()[0]
+        if ties > 1:
+            return None
+        
+        if before:
+            neighbour = conn.execute(
+                f"SELECT MAX(sort_order) FROM {table_name} WHERE parent_id IS ? AND sort_order < ?",
+                (parent_id, anchor)
+            ).fetchone()[0]
+            low, high = (0 if neighbour is None else neighbour), anchor
+        else:
+            neighbour = conn.execute(
+                f"SELECT MIN(sort_order) FROM {table_name} WHERE parent_id IS ? AND sort_order > ?",
+                (parent_id, anchor)
+            ).fetchone()[0]
+            if neighbour is None:
+                return anchor + SORT_ORDER_GAP
+            low, high = anchor, neighbour
+        
+        if high - low < 2:
+            return None
+        return (low + high) // 2
+    
+    def reorder_children(self,
+                         parent_id: Optional[int],
+                         ordered_ids: List[int],
+                         document_name: Optional[str] = None) -> int:
+        """Reorder the children of a node.
+        
+        Listed children are placed first, in the given order; any children not
+        listed keep their relative order after them. Returns the number of
+        children renumbered.
+        """
+        table_name = self._resolve_table_name(document_name)
+        
+        def operation(conn: sqlite3.Connection) -> int:
+            rows = conn.execute(
+                f"SELECT id FROM {table_name} WHERE parent_id IS ? ORDER BY sort_order, id",
+                (parent_id,)
+            ).fetchall()
+            current = [row['id'] for row in rows]
+            
+            unknown = set(ordered_ids) - set(current)
+            if unknown:
+                raise ValueError(
+                    f"Nodes {sorted(unknown)} are not children of node {parent_id}"
+                )
             
-            return cursor.lastrowid
+            listed = list(dict.fromkeys(ordered_ids))
+            listed_set = set(listed)
+            remaining = [node_id for node_id in current if node_id not in listed_set]
+            self._bump_subtree_versions(conn, table_name, parent_id)
+            return self._assign_sort_orders(conn, table_name, listed + remaining)
+        
+        return self._write(operation)
+    
+    def rebalance_children(self, parent_id: Optional[int], document_name: Optional[str] = None) -> int:
+        """Respace sibling sort_order keys evenly, keeping their current order."""
+        table_name = self._resolve_table_name(document_name)
+        
+        def operation(conn: sqlite3.Connection) -> int:
+            return self._rebalance_children(conn, table_name, parent_id)
+        
+        return self._write(operation)
+    
+    def _rebalance_children(self, conn: sqlite3.Connection, table_name: str, parent_id: Optional[int]) -> int:
+        """Renumber the children of parent_id to multiples of SORT_ORDER_GAP."""
+        rows = conn.execute(
+            f"SELECT id FROM {table_name} WHERE parent_id IS ? ORDER BY sort_order, id",
+            (parent_id,)
+        ).fetchall()
+        return self._assign_sort_orders(conn, table_name, [row['id'] for row in rows])
     
-    def get_node(self, node_id: int, document_name: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    def _assign_sort_orders(self, conn: sqlite3.Connection, table_name: str, node_ids: List[int]) -> int:
+        """Give node_ids evenly gapped sort_order keys in list order."""
+        for start in range(0, len(node_ids), 500):
+            chunk = node_ids[start:start + 500]
+            self._preserve_rows(conn, table_name, ", ".join("?" * len(chunk)), chunk)
+        conn.executemany(f"""
+            UPDATE {table_name} 
+            SET sort_order = ?, updated_at = CURRENT_TIMESTAMP 
+            WHERE id = ?
+        """, [((index + 1) * SORT_ORDER_GAP, node_id) for index, node_id in enumerate(node_ids)])
+        for start in range(0, len(node_ids), 500):
+            chunk = node_ids[start:start + 500]
+            self._log_changes(conn, table_name, 'move', ", ".join("?" * len(chunk)), chunk)
+        return len(node_ids)
+    
+    def get_node(self, node_id: int, document_name: Optional[str] = None, include_content: bool = True) -> Optional[Dict[str, Any]]:
         """Get a single node by ID."""
-        # Determine table name
-        if document_name:
-            table_name = self.get_document_table_name(document_name)
-            if not table_name:
-                raise ValueError(f"Document '{document_name}' does not exist")
-        else:
-            table_name = "document_nodes"  # Use default table
+        table_name = self._resolve_table_name(document_name)
         
         with self.get_connection() as conn:
             row = conn.execute(
-                f"SELECT * FROM {table_name} WHERE id = ?", 
+                f"{self._node_select(table_name, include_content)} WHERE n.id = ?", 
                 (node_id,)
             ).fetchone()
             
@@ -300,88 +556,310 @@ class DocumentDatabase:
                    node_id: int,
                    title: Optional[str] = None,
                    content: Optional[str] = None,
-                   metadata: Optional[Dict[str, Any]] = None) -> bool:
-        """Update an existing node."""
-        with self.get_connection() as conn:
-            # Build update query dynamically
-            updates = []
-            params = []
-            
-            if title is not None:
-                updates.append("title = ?")
-                params.append(title)
-            
-            if content is not None:
-                updates.append("content = ?")
-                params.append(content)
-            
-            if metadata is not None:
-                updates.append("metadata = ?")
-                params.append(json.dumps(metadata))
-            
-            if not updates:
+                   metadata: Optional[Dict[str, Any]] = None,
+                   expected_version: Optional[int] = None,
+                   document_name: Optional[str] = None) -> bool:
+        """Update an existing node.
+        
+        With expected_version the update only applies if the node is still at
+        that version, and raises VersionConflictError otherwise. With the
+        revision history enabled the new state is recorded as a revision.
+        """
+        if title is None and content is None and metadata is None:
+            return False
+        table_name = self._resolve_table_name(document_name)
+        
+        def operation(conn: sqlite3.Connection) -> bool:
+            return self._update_node(conn, table_name, node_id, title, content, metadata, expected_version)
+        
+        return self._write(operation)
+    
+    def _update_node(self,
+                     conn: sqlite3.Connection,
+                     table_name: str,
+                     node_id: int,
+                     title: Optional[str],
+                     content: Optional[str],
+                     metadata: Optional[Dict[str, Any]],
+                     expected_version: Optional[int],
+                     clear_content: bool = False) -> bool:
+        """Apply an update inside a write; content None leaves the body unless clear_content."""
+        if not self._claim_version(conn, table_name, node_id, expected_version):
+            return False
+        # Read once the claim holds the write lock, so no other writer can slip in between
+        before = self._revision_state(conn, table_name, node_id, claimed=True) if self.revision_history else None
+        self._preserve_rows(conn, table_name, "?", (node_id,))
+        
+        # Build update query dynamically
+        updates = []
+        params = []
+        
+        if title is not None:
+            updates.append("title = ?")
+            params.append(title)
+        
+        if metadata is not None:
+            updates.append("metadata = ?")
+            params.append(json.dumps(metadata))
+        
+        updates.append("updated_at = CURRENT_TIMESTAMP")
+        params.append(node_id)
+        
+        conn.execute(f"""
+            UPDATE {table_name} 
+            SET {', '.join(updates)}
+            WHERE id = ?
+        """, params)
+        
+        if content is not None or clear_content:
+            self._write_content(conn, table_name, node_id, content)
+        
+        self._bump_subtree_versions(conn, table_name, node_id)
+        self._log_changes(conn, table_name, 'update', "?", (node_id,))
+        if before is not None:
+            self._record_revision(conn, table_name, node_id, before)
+        return True
+    
+    def patch_node_metadata(self,
+                            node_id: int,
+                            patch: Optional[Dict[str, Any]] = None,
+                            remove: Optional[List[str]] = None,
+                            expected_version: Optional[int] = None,
+                            document_name: Optional[str] = None) -> bool:
+        """Change some metadata keys of a node in place, without rewriting the rest.
+        
+        patch is applied as a JSON merge patch (RFC 7396): its keys are set,
+        nested objects are merged and null values remove keys. Keys listed in
+        remove are deleted. Version checks work as in update_node.
+        """
+        table_name = self._resolve_table_name(document_name)
+        expression, params = self._metadata_patch(patch, remove)
+        if expression is None:
+            return False
+        
+        def operation(conn: sqlite3.Connection) -> bool:
+            if not self._claim_version(conn, table_name, node_id, expected_version):
                 return False
-            
-            params.append(node_id)
-            
-            cursor = conn.execute(f"""
-                UPDATE document_nodes 
-                SET {', '.join(updates)}
+            # Read once the claim holds the write lock, so no other writer can slip in between
+            before = self._revision_state(conn, table_name, node_id, claimed=True) if self.revision_history else None
+            self._preserve_rows(conn, table_name, "?", (node_id,))
+            conn.execute(f"""
+                UPDATE {table_name} 
+                SET metadata = {expression}, updated_at = CURRENT_TIMESTAMP
                 WHERE id = ?
-            """, params)
-            
-            return cursor.rowcount > 0
+            """, (*params, node_id))
+            self._bump_subtree_versions(conn, table_name, node_id)
+            self._log_changes(conn, table_name, 'update', "?", (node_id,))
+            if before is not None:
+                self._record_revision(conn, table_name, node_id, before)
+            return True
+        
+        return self._write(operation)
     
-    def delete_node(self, node_id: int) -> bool:
-        """Delete a node and all its children."""
-        with self.get_connection() as conn:
-            cursor = conn.execute(
-                "DELETE FROM document_nodes WHERE id = ?", 
-                (node_id,)
-            )
-            return cursor.rowcount > 0
+    def patch_metadata_where(self,
+                             patch: Optional[Dict[str, Any]] = None,
+                             remove: Optional[List[str]] = None,
+                             query: str = "",
+                             node_type: Optional[str] = None,
+                             metadata_filter: Optional[Dict[str, Any]] = None,
+                             document_name: Optional[str] = None) -> int:
+        """Patch the metadata of every node matching the search_nodes filters in one statement.
+        
+        Takes patch and remove as patch_node_metadata does; returns the
+        number of nodes changed.
+        """
+        table_name = self._resolve_table_name(document_name)
+        expression, params = self._metadata_patch(patch, remove)
+        if expression is None:
+            return 0
+        matching, filter_params = self._matching_ids(table_name, query, node_type, metadata_filter)
+        
+        def operation(conn: sqlite3.Connection) -> int:
+            # Mark and log first: the patch may change what the filter matches
+            self._bump_subtree_versions_where(conn, table_name, matching, filter_params)
+            self._log_changes(conn, table_name, 'update', matching, filter_params, "version + 1")
+            self._preserve_rows(conn, table_name, matching, filter_params)
+            cursor = conn.execute(f"""
+                UPDATE {table_name} 
+                SET metadata = {expression}, version = version + 1, updated_at = CURRENT_TIMESTAMP
+                WHERE id IN ({matching})
+            """, (*params, *filter_params))
+            return cursor.rowcount
+        
+        return self._write(operation)
     
-    def get_children(self, parent_id: Optional[int] = None, document_name: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Get direct children of a node."""
-        # Determine table name
-        if document_name:
-            table_name = self.get_document_table_name(document_name)
-            if not table_name:
-                raise ValueError(f"Document '{document_name}' does not exist")
-        else:
-            table_name = "document_nodes"  # Use default table
+    def _metadata_patch(self,
+                        patch: Optional[Dict[str, Any]],
+                        remove: Optional[List[str]]) -> Tuple[Optional[str], List[Any]]:
+        """SQL expression computing patched metadata from the metadata column, with its parameters.
+        
+        The expression is None when there is nothing to change. Stored
+        metadata that is not valid JSON is patched as an empty object, as
+        parse_metadata reads it.
+        """
+        if patch is not None and not isinstance(patch, dict):
+            raise ValueError("Metadata patch must be a JSON object")
+        if not patch and not remove:
+            return None, []
+        
+        expression = "CASE WHEN json_valid(metadata) THEN metadata ELSE '{}' END"
+        params: List[Any] = []
+        if patch:
+            expression = f"json_patch({expression}, ?)"
+            params.append(json.dumps(patch))
+        if remove:
+            expression = f"json_remove({expression}, {', '.join('?' * len(remove))})"
+            params.extend(f'$."{key}"' for key in remove)
+        return expression, params
+    
+    def delete_node(self,
+                    node_id: int,
+                    expected_version: Optional[int] = None,
+                    document_name: Optional[str] = None) -> int:
+        """Delete a node and all its descendants, returning the number of nodes deleted.
+        
+        Foreign keys are not enforced, so the subtree is removed explicitly
+        rather than by ON DELETE CASCADE. Returns 0 if the node does not
+        exist. With expected_version the node is only deleted if it is still
+        at that version, and VersionConflictError is raised otherwise.
+        """
+        table_name = self._resolve_table_name(document_name)
+        
+        def operation(conn: sqlite3.Connection) -> int:
+            if not self._claim_version(conn, table_name, node_id, expected_version):
+                return 0
+            return self._delete_subtrees(conn, table_name, "SELECT ?", (node_id,))
+        
+        return self._write(operation)
+    
+    def update_nodes_where(self,
+                           updates: Dict[str, Any],
+                           query: str = "",
+                           node_type: Optional[str] = None,
+                           metadata_filter: Optional[Dict[str, Any]] = None,
+                           document_name: Optional[str] = None) -> int:
+        """Set fields on every node matching the search_nodes filters in one statement.
+        
+        updates maps title, node_type or metadata to the new value (metadata
+        is replaced whole; see patch_metadata_where to change single keys).
+        Returns the number of nodes updated.
+        """
+        unknown = set(updates) - set(BULK_UPDATE_FIELDS)
+        if unknown:
+            raise ValueError(f"Cannot bulk update {', '.join(sorted(unknown))}; "
+                             f"supported fields are {', '.join(BULK_UPDATE_FIELDS)}")
+        if not updates:
+            return 0
+        
+        table_name = self._resolve_table_name(document_name)
+        matching, filter_params = self._matching_ids(table_name, query, node_type, metadata_filter)
+        assignments = [f"{field} = ?" for field in updates]
+        params = [json.dumps(value or {}) if field == 'metadata' else value for field, value in updates.items()]
+        
+        def operation(conn: sqlite3.Connection) -> int:
+            # Mark and log first: the update may change what the filter matches
+            self._bump_subtree_versions_where(conn, table_name, matching, filter_params)
+            self._log_changes(conn, table_name, 'update', matching, filter_params, "version + 1")
+            self._preserve_rows(conn, table_name, matching, filter_params)
+            cursor = conn.execute(f"""
+                UPDATE {table_name} 
+                SET {', '.join(assignments)}, version = version + 1, updated_at = CURRENT_TIMESTAMP
+                WHERE id IN ({matching})
+            """, (*params, *filter_params))
+            return cursor.rowcount
+        
+        return self._write(operation)
+    
+    def delete_nodes_where(self,
+                           query: str = "",
+                           node_type: Optional[str] = None,
+                           metadata_filter: Optional[Dict[str, Any]] = None,
+                           document_name: Optional[str] = None) -> int:
+        """Delete every node matching the search_nodes filters, with their subtrees.
+        
+        Returns the number of nodes deleted, descendants included.
+        """
+        table_name = self._resolve_table_name(document_name)
+        matching, filter_params = self._matching_ids(table_name, query, node_type, metadata_filter)
+        
+        def operation(conn: sqlite3.Connection) -> int:
+            return self._delete_subtrees(conn, table_name, matching, filter_params)
+        
+        return self._write(operation)
+    
+    def sweep_orphans(self, document_name: Optional[str] = None) -> Dict[str, Any]:
+        """Delete nodes cut off from their document by deletes that left descendants behind.
+        
+        Older versions deleted only the node itself, leaving its descendants
+        with a parent_id that no longer exists. Those nodes, their subtrees
+        and any bodies without a node are removed from the given document,
+        or from every node table when document_name is omitted. Returns the
+        number of nodes and bodies removed, with the node count per table.
+        """
+        def operation(conn: sqlite3.Connection) -> Dict[str, Any]:
+            if document_name is None:
+                tables = get_node_tables(conn)
+            else:
+                tables = [self._resolve_table_name(document_name)]
+            
+            report: Dict[str, Any] = {'nodes': 0, 'bodies': 0, 'tables': {}}
+            for table_name in tables:
+                deleted = self._delete_subtrees(conn, table_name, f"""
+                    SELECT c.id FROM {table_name} c 
+                    WHERE c.parent_id IS NOT NULL 
+                    AND NOT EXISTS (SELECT 1 FROM {table_name} p WHERE p.id = c.parent_id)
+                """, ())
+                
+                content_table = content_table_name(table_name)
+                detached = f"node_id NOT IN (SELECT id FROM {table_name})"
+                self._release_content(conn, content_table, detached)
+                bodies = conn.execute(f"DELETE FROM {content_table} WHERE {detached}").rowcount
+                
+                if deleted:
+                    report['tables'][table_name] = deleted
+                report['nodes'] += deleted
+                report['bodies'] += bodies
+            return report
+        
+        return self._write(operation)
+    
+    def get_children(self, parent_id: Optional[int] = None, document_name: Optional[str] = None, include_content: bool = True) -> List[Dict[str, Any]]:
+        """Get direct children of a node; pass include_content=False for structure only."""
+        table_name = self._resolve_table_name(document_name)
         
         with self.get_connection() as conn:
             if parent_id is None:
                 # Get root nodes
                 rows = conn.execute(f"""
-                    SELECT * FROM {table_name} 
-                    WHERE parent_id IS NULL 
-                    ORDER BY sort_order
+                    {self._node_select(table_name, include_content)} 
+                    WHERE n.parent_id IS NULL 
+                    ORDER BY n.sort_order, n.id
                 """).fetchall()
             else:
                 rows = conn.execute(f"""
-                    SELECT * FROM {table_name} 
-                    WHERE parent_id = ? 
-                    ORDER BY sort_order
+                    {self._node_select(table_name, include_content)} 
+                    WHERE n.parent_id = ? 
+                    ORDER BY n.sort_order, n.id
                 """, (parent_id,)).fetchall()
             
             return [self._row_to_dict(row) for row in rows]
     
-    def get_node_path(self, node_id: int) -> List[Dict[str, Any]]:
+    def get_node_path(self, node_id: int, document_name: Optional[str] = None) -> List[Dict[str, Any]]:
         """Get the full path from root to the specified node."""
+        table_name = self._resolve_table_name(document_name)
+        
         with self.get_connection() as conn:
             # Use recursive CTE to get path
-            rows = conn.execute("""
+            rows = conn.execute(f"""
                 WITH RECURSIVE node_path AS (
                     SELECT id, parent_id, title, node_type, level, 0 as depth
-                    FROM document_nodes 
+                    FROM {table_name} 
                     WHERE id = ?
                     
                     UNION ALL
                     
                     SELECT n.id, n.parent_id, n.title, n.node_type, n.level, np.depth + 1
-                    FROM document_nodes n
+                    FROM {table_name} n
                     JOIN node_path np ON n.id = np.parent_id
                 )
                 SELECT * FROM node_path ORDER BY depth DESC
@@ -393,142 +871,1227 @@ class DocumentDatabase:
                     query: str = "",
                     node_type: Optional[str] = None,
                     metadata_filter: Optional[Dict[str, Any]] = None,
-                    document_name: Optional[str] = None) -> List[Dict[str, Any]]:
+                    document_name: Optional[str] = None,
+                    include_content: bool = True) -> List[Dict[str, Any]]:
         """Search nodes based on various criteria."""
-        # Determine table name
-        if document_name:
-            table_name = self.get_document_table_name(document_name)
-            if not table_name:
-                raise ValueError(f"Document '{document_name}' does not exist")
-        else:
-            table_name = "document_nodes"  # Use default table
+        table_name = self._resolve_table_name(document_name)
         
         with self.get_connection() as conn:
-            sql = f"SELECT * FROM {table_name} WHERE 1=1"
-            params = []
-            
-            # Text search in title and content
-            if query:
-                sql += " AND (title LIKE ? OR content LIKE ?)"
-                params.extend([f"%{query}%", f"%{query}%"])
-            
-            # Filter by node type
-            if node_type:
-                sql += " AND node_type = ?"
-                params.append(node_type)
-            
-            # Filter by metadata (simple key-value matching)
-            if metadata_filter:
-                for key, value in metadata_filter.items():
-                    sql += " AND JSON_EXTRACT(metadata, ?) = ?"
-                    params.extend([f"$.{key}", value])
-            
-            sql += " ORDER BY level, sort_order"
+            # Bodies are joined for text search even when not returned
+            conditions, params = self._node_filter(query, node_type, metadata_filter)
+            sql = f"{self._node_select(table_name, include_content, join_content=include_content or bool(query))} WHERE 1=1{conditions}"
+            sql += " ORDER BY n.level, n.sort_order"
             
             rows = conn.execute(sql, params).fetchall()
             return [self._row_to_dict(row) for row in rows]
     
-    def get_nodes_by_type(self, node_type: str, document_name: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Get all nodes of a specific type."""
-        return self.search_nodes(node_type=node_type, document_name=document_name)
+    def list_revisions(self, node_id: int, document_name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """List the recorded revisions of a node, newest first, without their bodies.
+        
+        A revision is numbered with the node version it captured. kind tells
+        whether its body is stored in full or as a delta, and size is the
+        stored length.
+        """
+        table_name = self._resolve_table_name(document_name)
+        with self.get_connection() as conn:
+            rows = conn.execute("""
+                SELECT revision, kind, title, LENGTH(content) AS size, created_at 
+                FROM node_revisions 
+                WHERE table_name = ? AND node_id = ? 
+                ORDER BY revision DESC
+            """, (table_name, node_id)).fetchall()
+            return [dict(row) for row in rows]
+    
+    def get_revision(self, node_id: int, revision: int, document_name: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Rebuild a node as it was at a revision, or None if it was not recorded."""
+        table_name = self._resolve_table_name(document_name)
+        with self.get_connection() as conn:
+            return self._rebuild_revision(conn, table_name, node_id, revision)
+    
+    def restore_revision(self,
+                         node_id: int,
+                         revision: int,
+                         expected_version: Optional[int] = None,
+                         document_name: Optional[str] = None) -> bool:
+        """Set a node's title, content and metadata back to those of a revision.
+        
+        The restore is an update like any other, so it is itself recorded as
+        a new revision and can be undone. Raises ValueError if the revision
+        was not recorded; returns False if the node does not exist.
+        """
+        table_name = self._resolve_table_name(document_name)
+        
+        def operation(conn: sqlite3.Connection) -> bool:
+            state = self._rebuild_revision(conn, table_name, node_id, revision)
+            if state is None:
+                raise ValueError(f"Node {node_id} has no revision {revision}")
+            return self._update_node(
+                conn, table_name, node_id, state['title'], state['content'], state['metadata'],
+                expected_version, clear_content=state['content'] is None
+            )
+        
+        return self._write(operation)
+    
+    def _revision_state(self,
+                        conn: sqlite3.Connection,
+                        table_name: str,
+                        node_id: int,
+                        claimed: bool = False) -> Optional[Dict[str, Any]]:
+        """The recorded fields of a node (version, title, content, metadata text), or None if missing.
+        
+        With claimed, the node's version was already incremented by
+        _claim_version, and the state is reported at the version before it.
+        """
+        row = conn.execute(f"{self._node_select(table_name)} WHERE n.id = ?", (node_id,)).fetchone()
+        if row is None:
+            return None
+        return {
+            'version': row['version'] - 1 if claimed else row['version'],
+            'title': row['title'],
+            'metadata': row['metadata'],
+            'content': decode_content(row['content'], row['content_encoding']),
+        }
+    
+    def _record_revision(self,
+                         conn: sqlite3.Connection,
+                         table_name: str,
+                         node_id: int,
+                         before: Dict[str, Any]) -> None:
+        """Record a node's state after an update as a revision, given its state before.
+        
+        The new body is stored as a delta against the previous revision. If
+        the previous state was never recorded (the node's first edit, or a
+        change made by a bulk operation) it is first recorded in full, so
+        every delta applies to the revision just before it.
+        """
+        latest = conn.execute("""
+            SELECT revision, chain FROM node_revisions 
+            WHERE table_name = ? AND node_id = ? 
+            ORDER BY revision DESC LIMIT 1
+        """, (table_name, node_id)).fetchone()
+        if latest is None or latest['revision'] != before['version']:
+            self._append_revision(conn, table_name, node_id, before, None, 0)
+            chain = 1
+        else:
+            chain = latest['chain'] + 1
+        
+        after = self._revision_state(conn, table_name, node_id)
+        self._append_revision(conn, table_name, node_id, after, before['content'], chain)
+    
+    def _append_revision(self,
+                         conn: sqlite3.Connection,
+                         table_name: str,
+                         node_id: int,
+                         state: Dict[str, Any],
+                         base: Optional[str],
+                         chain: int) -> None:
+        """Store one revision, as a delta against base when that is worthwhile.
+        
+        A full copy is stored when there is no base, when chain deltas
+        have followed the last full copy for revision_full_interval
+        revisions, or when the delta would be no smaller than the body.
+        """
+        content = state['content']
+        kind, stored = 'full', content
+        if base is not None and content is not None and chain < self.revision_full_interval:
+            delta = make_delta(base, content)
+            if len(delta) < len(content):
+                kind, stored = 'delta', delta
+        if kind == 'full':
+            chain = 0
+        
+        encoding = None
+        if stored is not None:
+            encoded = stored.encode('utf-8')
+            compressed = zlib.compress(encoded)
+            if len(compressed) < len(encoded):
+                stored, encoding = compressed, 'zlib'
+        
+        conn.execute("""
+            INSERT OR REPLACE INTO node_revisions 
+            (table_name, node_id, revision, kind, chain, title, metadata, content, content_encoding)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (table_name, node_id, state['version'], kind, chain, state['title'],
+              state['metadata'], stored, encoding))
+    
+    def _rebuild_revision(self,
+                          conn: sqlite3.Connection,
+                          table_name: str,
+                          node_id: int,
+                          revision: int) -> Optional[Dict[str, Any]]:
+        """Rebuild a revision from the last full copy at or before it and the deltas after that."""
+        rows = conn.execute("""
+            SELECT revision, kind, title, metadata, content, content_encoding, created_at 
+            FROM node_revisions 
+            WHERE table_name = ? AND node_id = ? AND revision <= ? AND revision >= (
+                SELECT MAX(revision) FROM node_revisions 
+                WHERE table_name = ? AND node_id = ? AND revision <= ? AND kind = 'full'
+            )
+            ORDER BY revision
+        """, (table_name, node_id, revision, table_name, node_id, revision)).fetchall()
+        if not rows or rows[-1]['revision'] != revision:
+            return None
+        
+        content = None
+        for row in rows:
+            stored = decode_content(row['content'], row['content_encoding'])
+            content = apply_delta(content, stored) if row['kind'] == 'delta' else stored
+        
+        last = rows[-1]
+        return {
+            'node_id': node_id,
+            'revision': revision,
+            'title': last['title'],
+            'content': content,
+            'metadata': parse_metadata(last['metadata']),
+            'created_at': last['created_at'],
+        }
+    
+    def create_snapshot(self,
+                        name: str,
+                        document_name: Optional[str] = None,
+                        description: Optional[str] = None) -> Dict[str, Any]:
+        """Record a named point-in-time snapshot of a document.
+        
+        Nothing is copied when the snapshot is taken. Afterwards the first
+        change to each node saves the node as it was (copy-on-write), so a
+        snapshot costs one row plus one row per node changed since. Raises
+        ValueError if the document already has a snapshot with this name.
+        """
+        table_name = self._resolve_table_name(document_name)
+        
+        def operation(conn: sqlite3.Connection) -> Dict[str, Any]:
+            try:
+                cursor = conn.execute("""
+                    INSERT INTO document_snapshots (table_name, name, description)
+                    VALUES (?, ?, ?)
+                """, (table_name, name, description))
+            except sqlite3.IntegrityError:
+                raise ValueError(f"Snapshot '{name}' already exists")
+            row = conn.execute(
+                "SELECT name, description, created_at FROM document_snapshots WHERE id = ?",
+                (cursor.lastrowid,)
+            ).fetchone()
+            return dict(row)
+        
+        return self._write(operation)
+    
+    def list_snapshots(self, document_name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """List the snapshots of a document, oldest first, with the number of nodes each has saved."""
+        table_name = self._resolve_table_name(document_name)
+        with self.get_connection() as conn:
+            rows = conn.execute("""
+                SELECT s.name, s.description, s.created_at, COUNT(r.node_id) AS saved_nodes 
+                FROM document_snapshots s 
+                LEFT JOIN snapshot_rows r ON r.snapshot_id = s.id 
+                WHERE s.table_name = ? 
+                GROUP BY s.id ORDER BY s.id
+            """, (table_name,)).fetchall()
+            return [dict(row) for row in rows]
+    
+    def delete_snapshot(self, name: str, document_name: Optional[str] = None) -> bool:
+        """Delete a snapshot, returning False if it does not exist.
+        
+        Earlier snapshots read nodes saved by later ones, so the nodes this
+        snapshot saved are handed to the snapshot before it (unless that one
+        saved its own copy) instead of being dropped.
+        """
+        table_name = self._resolve_table_name(document_name)
+        
+        def operation(conn: sqlite3.Connection) -> bool:
+            snapshot_id = self._snapshot_id(conn, table_name, name)
+            if snapshot_id is None:
+                return False
+            previous = conn.execute(
+                "SELECT MAX(id) FROM document_snapshots WHERE table_name = ? AND id < ?",
+                (table_name, snapshot_id)
+            ).fetchone()[0]
+            if previous is not None:
+                conn.execute(f"""
+                    INSERT OR IGNORE INTO snapshot_rows (snapshot_id, {SNAPSHOT_ROW_COLUMNS}) 
+                    SELECT ?, {SNAPSHOT_ROW_COLUMNS} 
+                    FROM snapshot_rows WHERE snapshot_id = ?
+                """, (previous, snapshot_id))
+            conn.execute("DELETE FROM snapshot_rows WHERE snapshot_id = ?", (snapshot_id,))
+            conn.execute("DELETE FROM document_snapshots WHERE id = ?", (snapshot_id,))
+            return True
+        
+        return self._write(operation)
     
-    def move_node(self, node_id: int, new_parent_id: Optional[int]) -> bool:
-        """Move a node to a new parent."""
+    def diff_snapshots(self,
+                       name: str,
+                       other: Optional[str] = None,
+                       document_name: Optional[str] = None) -> Dict[str, Any]:
+        """Compare a document at snapshot name with snapshot other, or with its current state.
+        
+        Only nodes saved since the earlier of the two are read, as no other
+        node can differ. Returns the nodes added, removed and changed going
+        from name to other, the changed ones with the fields that differ
+        (among SNAPSHOT_DIFF_FIELDS). Raises ValueError for an unknown
+        snapshot.
+        """
+        table_name = self._resolve_table_name(document_name)
         with self.get_connection() as conn:
+            old_id = self._require_snapshot(conn, table_name, name)
+            new_id = None if other is None else self._require_snapshot(conn, table_name, other)
+            since = old_id if new_id is None else min(old_id, new_id)
+            
+            saved_since = """
+                SELECT node_id FROM snapshot_rows WHERE snapshot_id IN 
+                (SELECT id FROM document_snapshots WHERE table_name = ? AND id >= ?)
+            """
+            current = {
+                row['id']: self._snapshot_node(row)
+                for row in conn.execute(
+                    f"{self._node_select(table_name)} WHERE n.id IN ({saved_since})",
+                    (table_name, since)
+                )
+            }
+            states = []
+            for snapshot_id in (old_id, new_id):
+                state = dict(current)
+                if snapshot_id is not None:
+                    sql, params = self._snapshot_rows_sql(table_name, snapshot_id)
+                    for row in conn.execute(sql, params):
+                        state[row['node_id']] = self._snapshot_node(row) if row['present'] else None
+                states.append(state)
+        
+        old, new = states
+        diff: Dict[str, Any] = {'added': [], 'removed': [], 'changed': []}
+        for node_id in sorted(set(old) | set(new)):
+            before, after = old.get(node_id), new.get(node_id)
+            if before is None and after is None:
+                continue
+            if before is None:
+                diff['added'].append({'id': node_id, 'title': after['title']})
+            elif after is None:
+                diff['removed'].append({'id': node_id, 'title': before['title']})
+            else:
+                fields = [field for field in SNAPSHOT_DIFF_FIELDS if before[field] != after[field]]
+                if fields:
+                    diff['changed'].append({'id': node_id, 'title': after['title'], 'fields': fields})
+        return diff
+    
+    def restore_snapshot(self, name: str, document_name: Optional[str] = None) -> Dict[str, int]:
+        """Put a document back as it was at a snapshot, in a single transaction.
+        
+        Only nodes saved since the snapshot are touched: nodes created since
+        are deleted, and the rest get their saved structure, title, metadata
+        and body back with a new version. The restore is saved for later
+        snapshots like any other change, so the snapshot and any later ones
+        stay usable. Raises ValueError for an unknown snapshot; returns the
+        number of nodes restored and deleted.
+        """
+        table_name = self._resolve_table_name(document_name)
+        content_table = content_table_name(table_name)
+        
+        def operation(conn: sqlite3.Connection) -> Dict[str, int]:
+            snapshot_id = self._require_snapshot(conn, table_name, name)
+            sql, params = self._snapshot_rows_sql(table_name, snapshot_id)
+            conn.execute("DROP TABLE IF EXISTS temp.snapshot_state")
+            conn.execute(f"""
+                CREATE TEMP TABLE snapshot_state AS 
+                SELECT r.*, EXISTS (SELECT 1 FROM {table_name} WHERE id = r.node_id) AS existed 
+                FROM ({sql}) r
+            """, params)
+            try:
+                saved = "SELECT node_id FROM temp.snapshot_state"
+                removed = f"{saved} WHERE present = 0"
+                restored = f"{saved} WHERE present = 1"
+                self._preserve_rows(conn, table_name, saved)
+                # Subtrees the nodes leave are marked now, those they return to below
+                self._bump_subtree_versions_where(conn, table_name, saved, ())
+                
+                self._log_changes(conn, table_name, 'delete', removed)
+                conn.execute(
+                    f"DELETE FROM node_revisions WHERE table_name = ? AND node_id IN ({removed})",
+                    (table_name,)
+                )
+                self._release_content(conn, content_table, f"node_id IN ({saved})")
+                conn.execute(f"DELETE FROM {content_table} WHERE node_id IN ({saved})")
+                deleted = conn.execute(f"DELETE FROM {table_name} WHERE id IN ({removed})").rowcount
+                
+                # A node deleted since continues from its saved version. Its
+                # subtree_version was lost with the row and restarts, so cached
+                # exports keyed on it are dropped below
+                count = conn.execute(f"""
+                    INSERT OR REPLACE INTO {table_name} 
+                    (id, parent_id, title, node_type, level, sort_order, metadata, created_at, updated_at,
+                     subtree_version, version)
+                    SELECT s.node_id, s.parent_id, s.title, s.node_type, s.level, s.sort_order, s.metadata,
+                           COALESCE(s.created_at, CURRENT_TIMESTAMP), CURRENT_TIMESTAMP,
+                           COALESCE(n.subtree_version, 0), COALESCE(n.version, s.version, 0) + 1
+                    FROM temp.snapshot_state s 
+                    LEFT JOIN {table_name} n ON n.id = s.node_id 
+                    WHERE s.present = 1
+                """).rowcount
+                # Saved bodies are already encoded, so they are stored inline as they are
+                conn.execute(f"""
+                    INSERT INTO {content_table} (node_id, content, content_encoding) 
+                    SELECT node_id, content, content_encoding FROM temp.snapshot_state 
+                    WHERE present = 1 AND content IS NOT NULL
+                """)
+                
+                self._preserve_rows(conn, table_name, f"{restored} AND NOT existed", present=False)
+                self._log_changes(conn, table_name, 'update', f"{restored} AND existed")
+                self._log_changes(conn, table_name, 'create', f"{restored} AND NOT existed")
+                self._bump_subtree_versions_where(conn, table_name, restored, ())
+                self._discard_cached_exports(conn, table_name)
+                return {'restored': count, 'deleted': deleted}
+            finally:
+                conn.execute("DROP TABLE IF EXISTS temp.snapshot_state")
+        
+        return self._write(operation)
+    
+    def _snapshot_id(self, conn: sqlite3.Connection, table_name: str, name: str) -> Optional[int]:
+        """Id of a document's snapshot by name, or None if there is none."""
+        row = conn.execute(
+            "SELECT id FROM document_snapshots WHERE table_name = ? AND name = ?",
+            (table_name, name)
+        ).fetchone()
+        return row['id'] if row else None
+    
+    def _require_snapshot(self, conn: sqlite3.Connection, table_name: str, name: str) -> int:
+        """Id of a document's snapshot by name; raises ValueError if there is none."""
+        snapshot_id = self._snapshot_id(conn, table_name, name)
+        if snapshot_id is None:
+            raise ValueError(f"Snapshot '{name}' does not exist")
+        return snapshot_id
+    
+    def _snapshot_rows_sql(self, table_name: str, snapshot_id: int) -> Tuple[str, Tuple[Any, ...]]:
+        """Query for the saved rows giving the state at a snapshot of every node changed since.
+        
+        A node is read from the first snapshot at or after this one that
+        saved it: it has not changed between this snapshot and that one.
+        Nodes with no saved row are unchanged and read from the node table.
+        """
+        sql = """
+            SELECT r.* FROM snapshot_rows r 
+            JOIN (
+                SELECT node_id, MIN(snapshot_id) AS snapshot_id FROM snapshot_rows 
+                WHERE snapshot_id IN (SELECT id FROM document_snapshots WHERE table_name = ? AND id >= ?) 
+                GROUP BY node_id
+            ) first ON first.node_id = r.node_id AND first.snapshot_id = r.snapshot_id
+        """
+        return sql, (table_name, snapshot_id)
+    
+    def _snapshot_node(self, row: sqlite3.Row) -> Dict[str, Any]:
+        """The fields snapshots are compared on, from a node or saved snapshot row."""
+        return {
+            'parent_id': row['parent_id'],
+            'title': row['title'],
+            'node_type': row['node_type'],
+            'sort_order': row['sort_order'],
+            'metadata': parse_metadata(row['metadata']),
+            'content': decode_content(row['content'], row['content_encoding']),
+        }
+    
+    def _preserve_rows(self,
+                       conn: sqlite3.Connection,
+                       table_name: str,
+                       node_ids: str,
+                       params: Iterable[Any] = (),
+                       present: bool = True) -> None:
+        """Save the nodes selected by node_ids (a subquery or IN list) for the document's latest snapshot.
+        
+        This is the copy-on-write half of snapshots, called before nodes
+        change: a node is saved the first time it changes after the latest
+        snapshot and not again until the next one. Earlier snapshots read it
+        from there, so each change is saved once however many snapshots
+        precede it. With present False the nodes were just created and a
+        marker that they did not exist yet is saved instead.
+        """
+        snapshot_id = conn.execute(
+            "SELECT MAX(id) FROM document_snapshots WHERE table_name = ?",
+            (table_name,)
+        ).fetchone()[0]
+        if snapshot_id is None:
+            return
+        
+        if not present:
+            conn.execute(f"""
+                INSERT OR IGNORE INTO snapshot_rows (snapshot_id, node_id, present) 
+                SELECT ?, id, 0 FROM {table_name} WHERE id IN ({node_ids})
+            """, (snapshot_id, *params))
+            return
+        conn.execute(f"""
+            INSERT OR IGNORE INTO snapshot_rows (snapshot_id, {SNAPSHOT_ROW_COLUMNS}) 
+            SELECT ?, n.id, 1, n.parent_id, n.title, n.node_type, n.level, n.sort_order, n.metadata, 
+                   {NODE_CONTENT_EXPR}, {NODE_ENCODING_EXPR}, n.created_at, n.version 
+            FROM {table_name} n 
+            LEFT JOIN {content_table_name(table_name)} c ON c.node_id = n.id 
+            LEFT JOIN content_store cs ON cs.hash = c.content_hash 
+            WHERE n.id IN ({node_ids})
+        """, (snapshot_id, *params))
+    
+    def _node_filter(self,
+                     query: str = "",
+                     node_type: Optional[str] = None,
+                     metadata_filter: Optional[Dict[str, Any]] = None) -> Tuple[str, List[Any]]:
+        """AND-ed search conditions on nodes aliased n, with their parameters.
+        
+        A query also matches bodies, so the select they are appended to must
+        join content (see _node_select).
+        """
+        sql = ""
+        params: List[Any] = []
+        
+        # Text search in title and content
+        if query:
+            sql += f" AND (n.title LIKE ? OR {NODE_TEXT_EXPR} LIKE ?)"
+            params.extend([f"%{query}%", f"%{query}%"])
+        
+        # Filter by node type
+        if node_type:
+            sql += " AND n.node_type = ?"
+            params.append(node_type)
+        
+        # Filter by metadata (simple key-value matching)
+        if metadata_filter:
+            for key, value in metadata_filter.items():
+                sql += " AND JSON_EXTRACT(n.metadata, ?) = ?"
+                params.extend([f"$.{key}", value])
+        
+        return sql, params
+    
+    def _matching_ids(self,
+                      table_name: str,
+                      query: str = "",
+                      node_type: Optional[str] = None,
+                      metadata_filter: Optional[Dict[str, Any]] = None) -> Tuple[str, List[Any]]:
+        """Subquery selecting the ids of the nodes search_nodes would return, for bulk operations.
+        
+        At least one filter is required, so a bulk operation never applies
+        to a whole document by accident.
+        """
+        if not (query or node_type or metadata_filter):
+            raise ValueError("At least one filter (query, node_type or metadata_filter) is required")
+        conditions, params = self._node_filter(query, node_type, metadata_filter)
+        select = self._node_select(table_name, include_content=False, join_content=bool(query))
+        return f"SELECT id FROM ({select} WHERE 1=1{conditions})", params
+    
+    def get_nodes_by_type(self, node_type: str, document_name: Optional[str] = None, include_content: bool = True) -> List[Dict[str, Any]]:
+        """Get all nodes of a specific type."""
+        return self.search_nodes(node_type=node_type, document_name=document_name, include_content=include_content)
+    
+    def move_node(self,
+                  node_id: int,
+                  new_parent_id: Optional[int],
+                  expected_version: Optional[int] = None,
+                  document_name: Optional[str] = None) -> bool:
+        """Move a node to a new parent.
+        
+        With expected_version the node is only moved if it is still at that
+        version, and VersionConflictError is raised otherwise. Moving a node
+        under itself or one of its descendants raises ValueError.
+        """
+        table_name = self._resolve_table_name(document_name)
+        
+        def operation(conn: sqlite3.Connection) -> bool:
             # Calculate new level
             if new_parent_id is None:
                 new_level = 1
             else:
                 parent = conn.execute(
-                    "SELECT level FROM document_nodes WHERE id = ?", 
+                    f"SELECT level FROM {table_name} WHERE id = ?", 
                     (new_parent_id,)
                 ).fetchone()
                 if not parent:
                     return False
                 new_level = parent['level'] + 1
+                
+                # The new parent must not be inside the subtree being moved
+                cycle = conn.execute(f"""
+                    WITH RECURSIVE ancestors(id) AS (
+                        SELECT ?
+                        UNION
+                        SELECT t.parent_id FROM {table_name} t 
+                        JOIN ancestors a ON t.id = a.id 
+                        WHERE t.parent_id IS NOT NULL
+                    )
+                    SELECT 1 FROM ancestors WHERE id = ?
+                """, (new_parent_id, node_id)).fetchone()
+                if cycle:
+                    raise ValueError(f"Cannot move node {node_id} under itself or one of its descendants")
+            
+            if not self._claim_version(conn, table_name, node_id, expected_version):
+                return False
+            
+            # The old parent loses the subtree, the new one gains it
+            old = conn.execute(
+                f"SELECT parent_id FROM {table_name} WHERE id = ?", 
+                (node_id,)
+            ).fetchone()
+            if old:
+                self._bump_subtree_versions(conn, table_name, old['parent_id'])
+            
+            # Descendants change level with the node
+            self._preserve_rows(conn, table_name, f"""
+                WITH RECURSIVE subtree(id) AS (
+                    SELECT ?
+                    UNION
+                    SELECT t.id FROM {table_name} t 
+                    JOIN subtree s ON t.parent_id = s.id
+                )
+                SELECT id FROM subtree
+            """, (node_id,))
             
             # Update node and all its descendants
-            cursor = conn.execute("""
-                UPDATE document_nodes 
-                SET parent_id = ?, level = ?
+            cursor = conn.execute(f"""
+                UPDATE {table_name} 
+                SET parent_id = ?, level = ?, updated_at = CURRENT_TIMESTAMP
                 WHERE id = ?
             """, (new_parent_id, new_level, node_id))
             
             # Update levels of all descendants
-            self._update_descendant_levels(conn, node_id)
+            self._update_descendant_levels(conn, table_name, node_id)
             
+            self._bump_subtree_versions(conn, table_name, node_id)
+            self._log_changes(conn, table_name, 'move', "?", (node_id,))
             return cursor.rowcount > 0
+        
+        return self._write(operation)
     
-    def _update_descendant_levels(self, conn: sqlite3.Connection, node_id: int) -> None:
-        """Recursively update levels of all descendant nodes."""
-        # Get current node level
-        current_node = conn.execute(
-            "SELECT level FROM document_nodes WHERE id = ?", 
-            (node_id,)
-        ).fetchone()
+    def _update_descendant_levels(self, conn: sqlite3.Connection, table_name: str, node_id: int) -> None:
+        """Set the level of every descendant of a node from the node's own level.
         
-        if not current_node:
-            return
+        One recursive statement walks the subtree, instead of a query and an
+        update per descendant.
+        """
+        conn.execute(f"""
+            WITH RECURSIVE descendants(id, level) AS (
+                SELECT c.id, p.level + 1 FROM {table_name} c 
+                JOIN {table_name} p ON p.id = c.parent_id 
+                WHERE c.parent_id = ?
+                UNION ALL
+                SELECT c.id, d.level + 1 FROM {table_name} c 
+                JOIN descendants d ON c.parent_id = d.id
+            )
+            UPDATE {table_name} 
+            SET level = (SELECT level FROM descendants WHERE descendants.id = {table_name}.id), 
+                updated_at = CURRENT_TIMESTAMP 
+            WHERE id IN (SELECT id FROM descendants)
+        """, (node_id,))
+    
+    def _node_select(self,
+                     table_name: str,
+                     include_content: bool = True,
+                     join_content: Optional[bool] = None,
+                     extra_columns: str = "") -> str:
+        """SELECT clause for nodes of a table, aliased as n.
         
-        # Update direct children
-        conn.execute("""
-            UPDATE document_nodes 
-            SET level = ? 
-            WHERE parent_id = ?
-        """, (current_node['level'] + 1, node_id))
-        
-        # Recursively update grandchildren
-        children = conn.execute(
-            "SELECT id FROM document_nodes WHERE parent_id = ?", 
-            (node_id,)
-        ).fetchall()
+        Bodies are joined from the side table and content store only when
+        include_content (or join_content, for filtering on them) is set, so
+        structural queries read the narrow node table alone. extra_columns
+        are appended to the column list, for callers joining other tables.
+        """
+        columns = NODE_COLUMNS if include_content else NODE_STRUCTURE_COLUMNS
+        if extra_columns:
+            columns += ", " + extra_columns
+        sql = f"SELECT {columns} FROM {table_name} n"
+        if join_content is None:
+            join_content = include_content
+        if join_content:
+            sql += (
+                f" LEFT JOIN {content_table_name(table_name)} c ON c.node_id = n.id"
+                f" LEFT JOIN content_store cs ON cs.hash = c.content_hash"
+            )
+        return sql
+    
+    def _write_content(self, conn: sqlite3.Connection, table_name: str, node_id: int, content: str) -> None:
+        """Store the body of a node in its side table, replacing any previous one."""
+        content_table = content_table_name(table_name)
+        # Drop the reference to the previous body before storing the new one
+        self._release_content(conn, content_table, "node_id = ?", (node_id,))
+        stored, content_hash, content_encoding = self._store_content(conn, content)
+        conn.execute(f"""
+            INSERT OR REPLACE INTO {content_table} 
+            (node_id, content, content_hash, content_encoding)
+            VALUES (?, ?, ?, ?)
+        """, (node_id, stored, content_hash, content_encoding))
+    
+    def _store_content(self, conn: sqlite3.Connection, content: Optional[str]) -> Tuple[Any, Optional[str], Optional[str]]:
+        """Prepare a body for storage, returning the (content, content_hash, content_encoding) column values.
+        
+        Bodies of at least compression_threshold bytes are compressed with the
+        configured codec when that makes them smaller. With deduplication
+        enabled, bodies of at least dedup_min_size bytes are kept once in
+        content_store and referenced by the SHA-256 hash of their text.
+        """
+        if content is None:
+            return None, None, None
+        
+        encoded = content.encode('utf-8')
+        stored, encoding = content, None
+        if self.compression in CONTENT_CODECS and len(encoded) >= self.compression_threshold:
+            compressed = CONTENT_CODECS[self.compression][0](encoded)
+            if len(compressed) < len(encoded):
+                stored, encoding = compressed, self.compression
         
-        for child in children:
-            self._update_descendant_levels(conn, child['id'])
+        if not self.content_dedup or len(encoded) < self.dedup_min_size:
+            return stored, None, encoding
+        
+        content_hash = hashlib.sha256(encoded).hexdigest()
+        conn.execute("""
+            INSERT INTO content_store (hash, content, encoding, ref_count)
+            VALUES (?, ?, ?, 1)
+            ON CONFLICT(hash) DO UPDATE SET ref_count = ref_count + 1
+        """, (content_hash, stored, encoding))
+        return None, content_hash, None
+    
+    def _release_content(self, conn: sqlite3.Connection, content_table: str, where: str, params: Tuple = ()) -> None:
+        """Drop content store references held by the rows of a side table matching where."""
+        released = f"""
+            WITH released(hash, refs) AS (
+                SELECT content_hash, COUNT(*) FROM {content_table} 
+                WHERE content_hash IS NOT NULL AND ({where}) 
+                GROUP BY content_hash
+            )
+        """
+        conn.execute(released + """
+            UPDATE content_store 
+            SET ref_count = ref_count - (SELECT refs FROM released WHERE released.hash = content_store.hash)
+            WHERE hash IN (SELECT hash FROM released)
+        """, params)
+        conn.execute(released + """
+            DELETE FROM content_store 
+            WHERE ref_count <= 0 AND hash IN (SELECT hash FROM released)
+        """, params)
     
     def _row_to_dict(self, row: sqlite3.Row) -> Dict[str, Any]:
         """Convert SQLite row to dictionary."""
         result = dict(row)
+        # Decompress stored bodies
+        if 'content_encoding' in result:
+            result['content'] = decode_content(result['content'], result.pop('content_encoding'))
+        
         # Parse JSON metadata
-        if result.get('metadata'):
-            try:
-                result['metadata'] = json.loads(result['metadata'])
-            except json.JSONDecodeError:
-                result['metadata'] = {}
-        else:
-            result['metadata'] = {}
+        result['metadata'] = parse_metadata(result.get('metadata'))
         
         return result
     
-    def get_tree_structure(self, parent_id: Optional[int] = None, document_name: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Get complete tree structure starting from parent_id."""
-        children = self.get_children(parent_id, document_name)
+    def _row_to_node(self, row: sqlite3.Row) -> Node:
+        """Convert SQLite row to a Node, decoding its body if it was selected."""
+        keys = row.keys()
+        content = decode_content(row['content'], row['content_encoding']) if 'content' in keys else None
+        return Node(
+            row['id'], row['parent_id'], row['title'], content, row['node_type'],
+            row['level'], row['sort_order'], row['metadata'], row['created_at'], row['updated_at'],
+            row['version']
+        )
+    
+    def iter_nodes(self, document_name: Optional[str] = None, batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """Stream every node of a document in id order with all its columns.
         
-        for child in children:
-            child['children'] = self.get_tree_structure(child['id'], document_name)
+        Rows are fetched in keyset-paginated batches on short-lived reads, so
+        memory stays bounded and writers are not locked out between batches.
+        Bodies are decoded; metadata is kept as its stored JSON text.
+        """
+        table_name = self._resolve_table_name(document_name)
+        select = f"{self._node_select(table_name)} WHERE n.id > ? ORDER BY n.id LIMIT ?"
+        last_id = 0
+        while True:
+            with self.get_connection() as conn:
+                rows = conn.execute(select, (last_id, batch_size)).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                node = dict(row)
+                node['content'] = decode_content(node['content'], node.pop('content_encoding'))
+                yield node
+            last_id = rows[-1]['id']
+    
+    def bulk_load_nodes(self,
+                        nodes: Iterable[Dict[str, Any]],
+                        document_name: Optional[str] = None,
+                        batch_size: int = 500) -> int:
+        """Insert nodes keeping their ids and timestamps, replacing existing rows with the same id.
+        
+        Nodes are dicts shaped like those from iter_nodes (metadata may be a
+        dict or JSON text) and are written with one executemany per batch in
+        a single transaction. Bodies go through the usual compression and
+        deduplication. Parents should come before their children, as they do
+        in id order. A node's version is kept when given, but a replaced row
+        always moves past its current version, so versions never go back.
+        """
+        table_name = self._resolve_table_name(document_name)
+        content_table = content_table_name(table_name)
+        nodes = iter(nodes)
+        
+        def operation(conn: sqlite3.Connection) -> int:
+            loaded = 0
+            while True:
+                batch = list(islice(nodes, batch_size))
+                if not batch:
+                    break
+                # The last row wins when an id repeats within a batch
+                batch = list({node['id']: node for node in batch}.values())
+                
+                node_ids = [node['id'] for node in batch]
+                placeholders = ", ".join("?" * len(node_ids))
+                replaced = {row[0] for row in conn.execute(
+                    f"SELECT id FROM {table_name} WHERE id IN ({placeholders})", node_ids
+                )}
+                # Rows being replaced are saved for snapshots and give up their bodies first
+                self._preserve_rows(conn, table_name, placeholders, node_ids)
+                self._release_content(conn, content_table, f"node_id IN ({placeholders})", tuple(node_ids))
+                conn.execute(f"DELETE FROM {content_table} WHERE node_id IN ({placeholders})", node_ids)
+                
+                # Replaced rows keep their subtree_version so it is never reused,
+                # and count as a newer version than the node they replace
+                conn.executemany(f"""
+                    INSERT OR REPLACE INTO {table_name} 
+                    (id, parent_id, title, node_type, level, sort_order, metadata, created_at, updated_at,
+                     subtree_version, version)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP), COALESCE(?, CURRENT_TIMESTAMP),
+                            COALESCE((SELECT subtree_version FROM {table_name} WHERE id = ?), 0),
+                            MAX(COALESCE(?, 1), COALESCE((SELECT version + 1 FROM {table_name} WHERE id = ?), 1)))
+                """, [(
+                    node['id'],
+                    node.get('parent_id'),
+                    node['title'],
+                    node['node_type'],
+                    node.get('level', 1),
+                    node.get('sort_order', 0),
+                    self._metadata_text(node.get('metadata')),
+                    node.get('created_at'),
+                    node.get('updated_at'),
+                    node['id'],
+                    node.get('version'),
+                    node['id'],
+                ) for node in batch])
+                
+                conn.executemany(f"""
+                    INSERT INTO {content_table} 
+                    (node_id, content, content_hash, content_encoding)
+                    VALUES (?, ?, ?, ?)
+                """, [
+                    (node['id'], *self._store_content(conn, node['content']))
+                    for node in batch if node.get('content') is not None
+                ])
+                
+                # Replaced rows were saved above, so only new ones get a marker
+                self._preserve_rows(conn, table_name, placeholders, node_ids, present=False)
+                for op, ids in (('create', [i for i in node_ids if i not in replaced]),
+                                ('update', [i for i in node_ids if i in replaced])):
+                    if ids:
+                        self._log_changes(conn, table_name, op, ", ".join("?" * len(ids)), ids)
+                loaded += len(batch)
+            
+            # Any subtree may have changed; one pass is cheaper than walking ancestors
+            if loaded:
+                conn.execute(f"UPDATE {table_name} SET subtree_version = subtree_version + 1")
+                self._discard_cached_exports(conn, table_name)
+            return loaded
+        
+        return self._write(operation)
+    
+    def copy_nodes(self, source_document: str, target_document: str) -> int:
+        """Copy every node of a document into another, empty, document, keeping ids and timestamps.
+        
+        The rows are copied with INSERT ... SELECT on the writing connection,
+        so the source is never read through a second connection that the
+        write transaction could lock out. Shared bodies gain a reference per
+        copy. Raises ValueError if the target already has nodes.
+        """
+        source = self._resolve_table_name(source_document)
+        target = self._resolve_table_name(target_document)
+        if source == target:
+            raise ValueError("Cannot copy a document into itself")
+        source_content, target_content = content_table_name(source), content_table_name(target)
+        
+        def operation(conn: sqlite3.Connection) -> int:
+            if conn.execute(f"SELECT 1 FROM {target} LIMIT 1").fetchone():
+                raise ValueError(f"Document '{target_document}' is not empty")
+            copied = conn.execute(f"""
+                INSERT INTO {target} 
+                (id, parent_id, title, node_type, level, sort_order, metadata, created_at, updated_at,
+                 subtree_version, version)
+                SELECT id, parent_id, title, node_type, level, sort_order, metadata, created_at, updated_at,
+                       subtree_version, version 
+                FROM {source}
+            """).rowcount
+            conn.execute(f"""
+                INSERT INTO {target_content} (node_id, content, content_hash, content_encoding)
+                SELECT node_id, content, content_hash, content_encoding FROM {source_content} 
+                WHERE node_id IN (SELECT id FROM {source})
+            """)
+            conn.execute(f"""
+                WITH copied(hash, refs) AS (
+                    SELECT content_hash, COUNT(*) FROM {target_content} 
+                    WHERE content_hash IS NOT NULL GROUP BY content_hash
+                )
+                UPDATE content_store 
+                SET ref_count = ref_count + (SELECT refs FROM copied WHERE copied.hash = content_store.hash)
+                WHERE hash IN (SELECT hash FROM copied)
+            """)
+            
+            copied_ids = f"SELECT id FROM {target}"
+            self._preserve_rows(conn, target, copied_ids, present=False)
+            self._log_changes(conn, target, 'create', copied_ids)
+            # Ids of deleted nodes may come back with a subtree_version already cached
+            self._discard_cached_exports(conn, target)
+            return copied
+        
+        return self._write(operation)
+    
+    def _metadata_text(self, metadata: Any) -> str:
+        """Metadata column value from a dict or already-serialized JSON."""
+        if isinstance(metadata, str):
+            return metadata
+        return json.dumps(metadata or {})
+    
+    def iter_tree(self,
+                  parent_id: Optional[int] = None,
+                  document_name: Optional[str] = None,
+                  include_content: bool = True,
+                  batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """Walk the subtree under parent_id depth-first, in sibling order, with one query.
         
-        return children
+        A recursive CTE builds a path of fixed-width (sort_order, id) keys for
+        each node, so ordering by path yields the same order as recursing
+        through get_children. Each node carries its depth below parent_id
+        (1 for direct children). Rows are fetched in batches from a single
+        read, so the walk sees one consistent tree.
+        """
+        table_name = self._resolve_table_name(document_name)
+        with self.get_connection() as conn:
+            for row in self._tree_rows(conn, table_name, parent_id, include_content, batch_size):
+                yield self._row_to_dict(row)
+    
+    def build_tree(self,
+                   parent_id: Optional[int] = None,
+                   document_name: Optional[str] = None,
+                   include_content: bool = True) -> List[Node]:
+        """Load the subtree under parent_id as linked Node objects, with one query."""
+        table_name = self._resolve_table_name(document_name)
+        roots: List[Node] = []
+        # Innermost open node at each depth of the depth-first walk
+        open_nodes: List[Node] = []
+        with self.get_connection() as conn:
+            for row in self._tree_rows(conn, table_name, parent_id, include_content):
+                node = self._row_to_node(row)
+                depth = row['depth']
+                del open_nodes[depth - 1:]
+                if open_nodes:
+                    open_nodes[-1].children.append(node)
+                else:
+                    roots.append(node)
+                open_nodes.append(node)
+        return roots
+    
+    def _tree_rows(self,
+                   conn: sqlite3.Connection,
+                   table_name: str,
+                   parent_id: Optional[int],
+                   include_content: bool = True,
+                   batch_size: int = 500) -> Iterator[sqlite3.Row]:
+        """Rows of the subtree under parent_id in depth-first sibling order, with their depth."""
+        # Offset each integer by 2**63 so the text keys sort like the signed values;
+        # the sum overflows 64 bits, so the sign picks the leading digit instead
+        offset = ("CASE WHEN {0} < 0 THEN printf('0%019d', {0} + 9223372036854775807 + 1) "
+                  "ELSE printf('1%019d', {0}) END")
+        key = offset.format("{0}.sort_order") + " || '.' || " + offset.format("{0}.id")
+        select = self._node_select(table_name, include_content, extra_columns="tree.depth AS depth")
+        cursor = conn.execute(f"""
+            WITH RECURSIVE tree(id, depth, path) AS (
+                SELECT id, 1, {key.format(table_name)} FROM {table_name} 
+                WHERE parent_id IS ?
+                UNION ALL
+                SELECT child.id, tree.depth + 1, tree.path || '/' || {key.format('child')} 
+                FROM {table_name} child JOIN tree ON child.parent_id = tree.id
+            )
+            {select} JOIN tree ON tree.id = n.id 
+            ORDER BY tree.path
+        """, (parent_id,))
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield from rows
+    
+    def get_tree_structure(self, parent_id: Optional[int] = None, document_name: Optional[str] = None, include_content: bool = True) -> List[Dict[str, Any]]:
+        """Get complete tree structure starting from parent_id."""
+        return [node.to_dict(include_content) for node in self.build_tree(parent_id, document_name, include_content)]
     
     def export_tree_to_markdown(self, parent_id: Optional[int] = None, level: int = 1, document_name: Optional[str] = None) -> str:
-        """Export tree structure to Markdown format."""
-        children = self.get_children(parent_id, document_name)
-        markdown = ""
+        """Export tree structure to Markdown format.
+        
+        With the export cache enabled, subtrees whose subtree_version is
+        unchanged since an earlier export are spliced from the cache; only
+        the nodes on changed branches are read and rendered again.
+        """
+        from .renderers import MarkdownRenderer, render_tree
+        
+        if self.export_cache is None:
+            output = io.StringIO()
+            render_tree(self.iter_tree(parent_id, document_name), [MarkdownRenderer(output, start_level=level)])
+            return output.getvalue()
+        
+        table_name = self._resolve_table_name(document_name)
+        cache = self.export_cache
+        with self.get_connection() as conn:
+            # Read structure and bodies from one snapshot
+            conn.execute("BEGIN")
+            scope = self._cache_scope(conn, table_name)
+            
+            # Walk down one level at a time, expanding only the nodes whose
+            # rendering is not cached; cached texts are held here so eviction
+            # during the export cannot lose them
+            children: Dict[Optional[int], List[Tuple[int, int]]] = {}
+            cached: Dict[int, str] = {}
+            stale: List[int] = []
+            pending, heading = [parent_id], level
+            while pending:
+                found = self._children_versions(conn, table_name, pending)
+                pending = []
+                for node_parent, node_id, version in found:
+                    children.setdefault(node_parent, []).append((node_id, version))
+                    text = cache.get((scope, node_id, heading), version)
+                    if text is None:
+                        pending.append(node_id)
+                    else:
+                        cached[node_id] = text
+                stale.extend(pending)
+                heading += 1
+            
+            nodes = {}
+            for start in range(0, len(stale), 500):
+                chunk = stale[start:start + 500]
+                rows = conn.execute(f"""
+                    {self._node_select(table_name)} 
+                    WHERE n.id IN ({', '.join('?' * len(chunk))})
+                """, chunk).fetchall()
+                nodes.update((row['id'], self._row_to_node(row)) for row in rows)
+        
+        def render(node_id: int, version: int, heading: int) -> str:
+            if node_id in cached:
+                return cached[node_id]
+            parts = [MarkdownRenderer.section(nodes[node_id], heading)]
+            parts.extend(render(child_id, child_version, heading + 1)
+                         for child_id, child_version in children.get(node_id, []))
+            text = "".join(parts)
+            cache.put((scope, node_id, heading), version, text)
+            return text
+        
+        return "".join(render(node_id, version, level) for node_id, version in children.get(parent_id, []))
+    
+    def _children_versions(self,
+                           conn: sqlite3.Connection,
+                           table_name: str,
+                           parent_ids: List[Optional[int]]) -> List[Tuple[Optional[int], int, int]]:
+        """(parent_id, id, subtree_version) of the children of parent_ids, in sibling order."""
+        if parent_ids == [None]:
+            return [tuple(row) for row in conn.execute(f"""
+                SELECT parent_id, id, subtree_version FROM {table_name} 
+                WHERE parent_id IS NULL ORDER BY sort_order, id
+            """)]
+        
+        found = []
+        for start in range(0, len(parent_ids), 500):
+            chunk = parent_ids[start:start + 500]
+            found.extend(tuple(row) for row in conn.execute(f"""
+                SELECT parent_id, id, subtree_version FROM {table_name} 
+                WHERE parent_id IN ({', '.join('?' * len(chunk))}) 
+                ORDER BY parent_id, sort_order, id
+            """, chunk))
+        return found
+    
+    def _claim_version(self,
+                       conn: sqlite3.Connection,
+                       table_name: str,
+                       node_id: int,
+                       expected_version: Optional[int]) -> bool:
+        """Increment a node's version before changing it; False if the node does not exist.
+        
+        The check and increment are one statement, which also takes the write
+        lock, so no other writer can change the node between them. Raises
+        VersionConflictError if expected_version is given and does not match.
+        """
+        cursor = conn.execute(f"""
+            UPDATE {table_name} SET version = version + 1 
+            WHERE id = ? AND version = COALESCE(?, version)
+        """, (node_id, expected_version))
+        if cursor.rowcount:
+            return True
+        
+        row = conn.execute(f"SELECT version FROM {table_name} WHERE id = ?", (node_id,)).fetchone()
+        if row is None:
+            return False
+        raise VersionConflictError(node_id, expected_version, row['version'])
+    
+    def _bump_subtree_versions(self, conn: sqlite3.Connection, table_name: str, node_id: Optional[int]) -> None:
+        """Mark the subtree of node_id and of each of its ancestors as changed."""
+        if node_id is None:
+            return
+        self._bump_subtree_versions_where(conn, table_name, "SELECT ?", (node_id,))
+    
+    def _delete_subtrees(self,
+                         conn: sqlite3.Connection,
+                         table_name: str,
+                         node_ids: str,
+                         params: Iterable[Any]) -> int:
+        """Delete the nodes selected by the node_ids subquery and all their descendants.
         
-        for child in children:
-            # Add title with appropriate heading level
-            markdown += "#" * level + " " + child['title'] + "\n\n"
+        The subtrees are collected once into a temporary table, then their
+        bodies and rows are removed with one statement each. Returns the
+        number of nodes deleted.
+        """
+        conn.execute("DROP TABLE IF EXISTS temp.deleted_nodes")
+        conn.execute("CREATE TEMP TABLE deleted_nodes (id INTEGER PRIMARY KEY)")
+        try:
+            conn.execute(f"""
+                INSERT INTO temp.deleted_nodes 
+                WITH RECURSIVE subtree(id) AS (
+                    {node_ids}
+                    UNION
+                    SELECT t.id FROM {table_name} t 
+                    JOIN subtree s ON t.parent_id = s.id
+                )
+                SELECT id FROM subtree
+            """, tuple(params))
             
-            # Add content if exists
-            if child.get('content'):
-                markdown += child['content'] + "\n\n"
+            deleted = "SELECT id FROM temp.deleted_nodes"
+            self._bump_subtree_versions_where(conn, table_name, f"""
+                SELECT parent_id FROM {table_name} 
+                WHERE id IN ({deleted}) AND parent_id IS NOT NULL
+            """, ())
             
-            # Recursively add children
-            markdown += self.export_tree_to_markdown(child['id'], level + 1, document_name)
+            self._log_changes(conn, table_name, 'delete', deleted)
+            self._preserve_rows(conn, table_name, deleted)
+            conn.execute(
+                f"DELETE FROM node_revisions WHERE table_name = ? AND node_id IN ({deleted})",
+                (table_name,)
+            )
+            
+            content_table = content_table_name(table_name)
+            self._release_content(conn, content_table, f"node_id IN ({deleted})")
+            conn.execute(f"DELETE FROM {content_table} WHERE node_id IN ({deleted})")
+            return conn.execute(f"DELETE FROM {table_name} WHERE id IN ({deleted})").rowcount
+        finally:
+            conn.execute("DROP TABLE IF EXISTS temp.deleted_nodes")
+    
+    def _log_changes(self,
+                     conn: sqlite3.Connection,
+                     table_name: str,
+                     op: str,
+                     node_ids: str,
+                     params: Iterable[Any] = (),
+                     version: str = "version") -> None:
+        """Append change log entries for the nodes selected by node_ids (a subquery or IN list).
         
-        return markdown
+        Entries record each node's version; callers logging ahead of an
+        update pass the version expression the node is about to get.
+        """
+        conn.execute(f"""
+            INSERT INTO change_log (document_name, node_id, op, version)
+            SELECT (SELECT document_name FROM documents_metadata WHERE table_name = ?), id, ?, {version}
+            FROM {table_name} WHERE id IN ({node_ids})
+            ORDER BY id
+        """, (table_name, op, *params))
+    
+    def _log_document_change(self, conn: sqlite3.Connection, document_name: str, op: str) -> None:
+        """Append a change log entry for a whole document being created or deleted."""
+        conn.execute(
+            "INSERT INTO change_log (document_name, op) VALUES (?, ?)",
+            (document_name, op)
+        )
+    
+    def get_changes_since(self, cursor: int = 0, limit: int = 1000) -> Dict[str, Any]:
+        """Read the change log after cursor, oldest first, for incremental consumers.
+        
+        Returns up to limit entries (at most MAX_CHANGES_BATCH) with their seq,
+        document_name (None for the default table), node_id, op, version and
+        changed_at, the cursor to pass next time, and whether more entries
+        are waiting. op is create, update, move (new parent or sibling order;
+        descendants of a moved node are not logged separately), delete, or
+        create_document/delete_document with no node_id. resync_required is
+        set when entries after cursor have already been pruned, so the
+        consumer must re-read the documents instead.
+        """
+        limit = max(1, min(limit, MAX_CHANGES_BATCH))
+        with self.get_connection() as conn:
+            rows = conn.execute("""
+                SELECT seq, document_name, node_id, op, version, changed_at 
+                FROM change_log WHERE seq > ? 
+                ORDER BY seq LIMIT ?
+            """, (cursor, limit + 1)).fetchall()
+            # seq comes from AUTOINCREMENT and is never reused, so with every
+            # entry pruned the next one sqlite_sequence would issue is the oldest
+            oldest = conn.execute("""
+                SELECT COALESCE(
+                    (SELECT MIN(seq) FROM change_log),
+                    (SELECT seq + 1 FROM sqlite_sequence WHERE name = 'change_log')
+                )
+            """).fetchone()[0]
+        
+        changes = [dict(row) for row in rows[:limit]]
+        return {
+            'changes': changes,
+            'cursor': changes[-1]['seq'] if changes else cursor,
+            'has_more': len(rows) > limit,
+            'resync_required': oldest is not None and cursor + 1 < oldest,
+        }
+    
+    def prune_changes(self, older_than_days: float) -> int:
+        """Delete change log entries older than the given number of days, returning how many."""
+        def operation(conn: sqlite3.Connection) -> int:
+            return conn.execute(
+                "DELETE FROM change_log WHERE changed_at < datetime('now', ?)",
+                (f"-{older_than_days} days",)
+            ).rowcount
+        
+        return self._write(operation)
+    
+    def _bump_subtree_versions_where(self,
+                                     conn: sqlite3.Connection,
+                                     table_name: str,
+                                     node_ids: str,
+                                     params: Iterable[Any]) -> None:
+        """Mark the subtrees of the nodes selected by the node_ids subquery and of their ancestors."""
+        conn.execute(f"""
+            WITH RECURSIVE ancestors(id) AS (
+                {node_ids}
+                UNION
+                SELECT t.parent_id FROM {table_name} t 
+                JOIN ancestors a ON t.id = a.id 
+                WHERE t.parent_id IS NOT NULL
+            )
+            UPDATE {table_name} SET subtree_version = subtree_version + 1 
+            WHERE id IN (SELECT id FROM ancestors)
+        """, tuple(params))
+    
+    def _cache_scope(self, conn: sqlite3.Connection, table_name: str) -> Tuple[str, int]:
+        """Export cache scope of a node table.
+        
+        Includes the document's metadata id, which is never reused, so a
+        document deleted and created again under the same name (and table)
+        cannot be served the old document's cached exports.
+        """
+        if table_name == "document_nodes":
+            return (table_name, 0)
+        row = conn.execute(
+            "SELECT id FROM documents_metadata WHERE table_name = ?", 
+            (table_name,)
+        ).fetchone()
+        return (table_name, row['id'] if row else 0)
+    
+    def _discard_cached_exports(self, conn: sqlite3.Connection, table_name: str) -> None:
+        """Drop the cached exports of a node table whose rows are replaced wholesale."""
+        if self.export_cache is not None:
+            self.export_cache.discard_scope(self._cache_scope(conn, table_name))
     
     def clear_all_data(self) -> None:
         """Clear all data from the database (for testing)."""
-        with self.get_connection() as conn:
+        def operation(conn: sqlite3.Connection) -> None:
+            self._discard_cached_exports(conn, "document_nodes")
+            self._log_changes(conn, "document_nodes", 'delete', "SELECT id FROM document_nodes")
+            self._preserve_rows(conn, "document_nodes", "SELECT id FROM document_nodes")
+            conn.execute("DELETE FROM node_revisions WHERE table_name = 'document_nodes'")
+            content_table = content_table_name("document_nodes")
+            self._release_content(conn, content_table, "1=1")
+            conn.execute(f"DELETE FROM {content_table}")
             conn.execute("DELETE FROM document_nodes")
-            conn.commit()
\ No newline at end of file
+        
+        self._write(operation)
+
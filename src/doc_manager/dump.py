@@ -0,0 +1,202 @@
+"""
+Document dump files for fast cloning and transfer between servers.
+
+A dump holds one document: the magic bytes ``LDOC`` and a format version,
+then length-prefixed frames (a 4-byte big-endian length followed by UTF-8
+JSON). The first frame describes the document and the node fields, each node
+is one frame listing its values in field order, and a final frame records the
+node count so truncated files are detected. Files are gzip-compressed unless
+asked otherwise; loading accepts either.
+
+Nodes are streamed in id order on both sides, so dumping and loading run in
+constant memory, and loading keeps node ids, which makes parent links and
+sort keys carry over unchanged.
+"""
+import gzip
+import json
+import os
+import struct
+import time
+from typing import Any, BinaryIO, Dict, Iterator, Optional
+
+from .database import DocumentDatabase
+
+MAGIC = b"LDOC"
+FORMAT_VERSION = 1
+GZIP_MAGIC = b"\x1f\x8b"
+
+# Node values in the order they are written to each node frame
+NODE_FIELDS = [
+    'id', 'parent_id', 'title', 'content', 'node_type',
+    'level', 'sort_order', 'metadata', 'created_at', 'updated_at', 'version',
+]
+
+_VERSION = struct.Struct(">H")
+_LENGTH = struct.Struct(">I")
+
+
+def write_dump(db: DocumentDatabase, document_name: str, stream: BinaryIO) -> int:
+    """Write a document to a binary stream, returning the number of nodes written."""
+    document = db.get_document(document_name)
+    if not document:
+        raise ValueError(f"Document '{document_name}' does not exist")
+
+    stream.write(MAGIC + _VERSION.pack(FORMAT_VERSION))
+    _write_frame(stream, {
+        'document': {
+            'document_name': document['document_name'],
+            'title': document['title'],
+            'description': document['description'],
+        },
+        'fields': NODE_FIELDS,
+    })
+
+    count = 0
+    for node in db.iter_nodes(document_name):
+        _write_frame(stream, [node[field] for field in NODE_FIELDS])
+        count += 1
+
+    _write_frame(stream, {'end': True, 'nodes': count})
+    return count
+
+
+def read_dump(db: DocumentDatabase,
+              stream: BinaryIO,
+              document_name: Optional[str] = None,
+              title: Optional[str] = None) -> Dict[str, Any]:
+    """Load a document from a binary stream as a new document.
+
+    The document keeps its dumped name and title unless document_name or
+    title are given. If the stream is corrupt or truncated the partially
+    loaded document is removed again.
+    """
+    header = stream.read(len(MAGIC) + _VERSION.size)
+    if header[:len(MAGIC)] != MAGIC:
+        raise ValueError("Not a document dump")
+    version = _VERSION.unpack(header[len(MAGIC):])[0]
+    if version > FORMAT_VERSION:
+        raise ValueError(f"Unsupported dump format version {version}")
+
+    frames = _iter_frames(stream)
+    info = next(frames, None)
+    if not isinstance(info, dict) or 'document' not in info:
+        raise ValueError("Dump is missing its document header")
+    fields = info['fields']
+    source = info['document']
+
+    target = document_name or source['document_name']
+    db.create_document(target, title or source['title'], source.get('description'))
+
+    trailer: Dict[str, Any] = {}
+
+    def nodes() -> Iterator[Dict[str, Any]]:
+        for frame in frames:
+            if isinstance(frame, dict):
+                trailer.update(frame)
+                return
+            yield dict(zip(fields, frame))
+
+    try:
+        loaded = db.bulk_load_nodes(nodes(), target)
+        if not trailer.get('end') or trailer.get('nodes') != loaded:
+            raise ValueError("Dump is truncated")
+    except Exception:
+        db.delete_document(target)
+        raise
+
+    return {'document_name': target, 'source_document': source['document_name'], 'nodes': loaded}
+
+
+def dump_document(db: DocumentDatabase,
+                  document_name: str,
+                  path: str,
+                  compress: bool = True,
+                  overwrite: bool = False) -> Dict[str, Any]:
+    """Dump a document to a file and report its size and timing."""
+    if os.path.exists(path) and not overwrite:
+        raise FileExistsError(f"Dump file already exists: {path}")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    started = time.perf_counter()
+
+    opener = gzip.open if compress else open
+    with opener(path, 'wb') as stream:
+        count = write_dump(db, document_name, stream)
+
+    return {
+        'document_name': document_name,
+        'path': path,
+        'nodes': count,
+        'size_bytes': os.path.getsize(path),
+        'duration_seconds': time.perf_counter() - started,
+    }
+
+
+def load_document(db: DocumentDatabase,
+                  path: str,
+                  document_name: Optional[str] = None,
+                  title: Optional[str] = None) -> Dict[str, Any]:
+    """Load a dump file, compressed or not, as a new document."""
+    started = time.perf_counter()
+    with open(path, 'rb') as raw:
+        compressed = raw.read(len(GZIP_MAGIC)) == GZIP_MAGIC
+        raw.seek(0)
+        if compressed:
+            with gzip.GzipFile(fileobj=raw, mode='rb') as stream:
+                report = read_dump(db, stream, document_name, title)
+        else:
+            report = read_dump(db, raw, document_name, title)
+
+    report['path'] = path
+    report['duration_seconds'] = time.perf_counter() - started
+    return report
+
+
+def clone_document(db: DocumentDatabase,
+                   source_document: str,
+                   target_document: str,
+                   title: Optional[str] = None) -> Dict[str, Any]:
+    """Copy a document under a new name.
+
+    Within one database the rows need no serialization, so they are copied
+    table to table in SQL by DocumentDatabase.copy_nodes.
+    """
+    source = db.get_document(source_document)
+    if not source:
+        raise ValueError(f"Document '{source_document}' does not exist")
+    started = time.perf_counter()
+
+    db.create_document(target_document, title or source['title'], source['description'])
+    try:
+        count = db.copy_nodes(source_document, target_document)
+    except Exception:
+        db.delete_document(target_document)
+        raise
+
+    return {
+        'document_name': target_document,
+        'source_document': source_document,
+        'nodes': count,
+        'duration_seconds': time.perf_counter() - started,
+    }
+
+
+def _write_frame(stream: BinaryIO, value: Any) -> None:
+    """Write one length-prefixed JSON frame."""
+    payload = json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    stream.write(_LENGTH.pack(len(payload)))
+    stream.write(payload)
+
+
+def _iter_frames(stream: BinaryIO) -> Iterator[Any]:
+    """Read length-prefixed JSON frames until the end of the stream."""
+    while True:
+        prefix = stream.read(_LENGTH.size)
+        if not prefix:
+            return
+        if len(prefix) < _LENGTH.size:
+            raise ValueError("Dump is truncated")
+        length = _LENGTH.unpack(prefix)[0]
+        payload = stream.read(length)
+        if len(payload) < length:
+            raise ValueError("Dump is truncated")
+        yield json.loads(payload)
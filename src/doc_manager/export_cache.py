@@ -0,0 +1,63 @@
+"""
+In-memory cache of rendered subtrees for repeated exports.
+
+Every node table keeps a subtree_version per node, bumped on the node and all
+its ancestors whenever anything in its subtree changes. A cached rendering is
+stored with the version it was rendered at and is only reused while that
+version is unchanged, so stale output is never served and unchanged branches
+of a modified document are still spliced from the cache.
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+
+class SubtreeCache:
+    """Thread-safe LRU cache of rendered text bounded by its total length."""
+
+    def __init__(self, max_bytes: int):
+        """Create a cache holding at most max_bytes characters of rendered text."""
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Tuple[int, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, version: int) -> Optional[str]:
+        """Get the text cached for key if it was rendered at version."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, version: int, text: str) -> None:
+        """Cache text rendered at version, evicting the least recently used entries."""
+        size = len(text)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old[1])
+            self._entries[key] = (version, text)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def discard_scope(self, scope: Any) -> None:
+        """Drop every entry whose key starts with scope."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == scope]:
+                self.size -= len(self._entries.pop(key)[1])
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
@@ -0,0 +1,190 @@
+"""
+Database maintenance: orphan cleanup, planner statistics, space reclamation and integrity checks.
+
+Deleting documents drops whole tables and deleting nodes leaves free pages
+behind, but SQLite never shrinks the file on its own. run_maintenance
+removes nodes orphaned by older deletes, prunes the change log to its
+retention period, refreshes query planner statistics,
+optimizes any full-text indexes, returns free pages to the filesystem and
+checks integrity, reporting the space reclaimed and the time each step took.
+"""
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from .config import config
+from .database import DocumentDatabase
+
+logger = logging.getLogger(__name__)
+
+# PRAGMA auto_vacuum values
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+def run_maintenance(db_path: str,
+                    analyze: bool = True,
+                    vacuum: bool = True,
+                    integrity: bool = True,
+                    full_vacuum: bool = True,
+                    quick_check: bool = False,
+                    sweep_orphans: bool = True,
+                    prune_changes: bool = True,
+                    database: Optional[DocumentDatabase] = None) -> Dict[str, Any]:
+    """Run the maintenance steps on a database and report what they did.
+
+    The orphan sweep and change log prune go through database when given,
+    so inside the server they are queued on its writer thread instead of
+    competing with it for the write lock; otherwise a DocumentDatabase is
+    opened on db_path for them.
+
+    Vacuuming is incremental once the database uses incremental auto-vacuum.
+    Otherwise, with full_vacuum, the first run switches it over with a full
+    VACUUM (which rewrites the file and blocks writers while it runs);
+    without full_vacuum the step is skipped.
+    """
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    started = time.perf_counter()
+    steps: List[Dict[str, Any]] = []
+    try:
+        size_before = _database_size(conn)
+
+        # Deletes go first, so the pages they free are reclaimed by the vacuum below
+        retention_days = config.get_change_log_retention_days() if prune_changes else 0
+        if database is None and (sweep_orphans or retention_days > 0):
+            database = DocumentDatabase(db_path)
+
+        if sweep_orphans:
+            step_started = time.perf_counter()
+            swept = database.sweep_orphans()
+            steps.append(_step("sweep_orphans", step_started, nodes=swept['nodes'], bodies=swept['bodies']))
+
+        if retention_days > 0:
+            step_started = time.perf_counter()
+            pruned = database.prune_changes(retention_days)
+            steps.append(_step("prune_changes", step_started, entries=pruned))
+
+        if analyze:
+            step_started = time.perf_counter()
+            conn.execute("ANALYZE")
+            conn.execute("PRAGMA optimize")
+            steps.append(_step("analyze", step_started))
+
+        fts_tables = _fts_tables(conn)
+        if fts_tables:
+            step_started = time.perf_counter()
+            for table_name in fts_tables:
+                conn.execute(f"INSERT INTO {table_name}({table_name}) VALUES ('optimize')")
+            steps.append(_step("fts_optimize", step_started, tables=fts_tables))
+
+        if vacuum:
+            step_started = time.perf_counter()
+            freelist = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            auto_vacuum = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+            if auto_vacuum == AUTO_VACUUM_INCREMENTAL:
+                conn.execute("PRAGMA incremental_vacuum")
+                steps.append(_step("incremental_vacuum", step_started, free_pages=freelist))
+            elif full_vacuum:
+                conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                conn.execute("VACUUM")
+                steps.append(_step("vacuum", step_started, free_pages=freelist))
+            else:
+                steps.append(_step("vacuum_skipped", step_started, free_pages=freelist))
+
+        integrity_result = None
+        if integrity:
+            step_started = time.perf_counter()
+            pragma = "quick_check" if quick_check else "integrity_check"
+            messages = [row[0] for row in conn.execute(f"PRAGMA {pragma}").fetchall()]
+            integrity_result = {'ok': messages == ['ok'], 'messages': messages}
+            steps.append(_step(pragma, step_started, ok=integrity_result['ok']))
+
+        size_after = _database_size(conn)
+    finally:
+        conn.close()
+
+    return {
+        'size_before_bytes': size_before,
+        'size_after_bytes': size_after,
+        'reclaimed_bytes': size_before - size_after,
+        'integrity': integrity_result,
+        'steps': steps,
+        'duration_seconds': time.perf_counter() - started,
+    }
+
+
+def _database_size(conn: sqlite3.Connection) -> int:
+    """Size of the database in bytes as seen by SQLite."""
+    page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    return page_count * page_size
+
+
+def _fts_tables(conn: sqlite3.Connection) -> List[str]:
+    """Names of full-text search virtual tables in the database."""
+    rows = conn.execute("""
+        SELECT name FROM sqlite_master
+        WHERE type = 'table' AND (sql LIKE '%USING fts5%' OR sql LIKE '%USING fts4%')
+    """).fetchall()
+    return [row[0] for row in rows]
+
+
+def _step(name: str, started: float, **details: Any) -> Dict[str, Any]:
+    """Report entry for a completed maintenance step."""
+    return {'step': name, 'duration_seconds': time.perf_counter() - started, **details}
+
+
+class MaintenanceScheduler:
+    """Runs maintenance periodically on a background thread.
+
+    Scheduled runs never do a full VACUUM, since it would block writers for
+    the whole rewrite; run 'lumina-docs maintenance' once to switch a database
+    to incremental vacuuming.
+    """
+
+    def __init__(self,
+                 db_path: str,
+                 interval_seconds: float,
+                 database: Optional[DocumentDatabase] = None):
+        """Create a scheduler running maintenance every interval_seconds.
+
+        Pass the server's database to have the sweep and prune steps go
+        through its writer (see run_maintenance).
+        """
+        self.db_path = db_path
+        self.interval_seconds = interval_seconds
+        self.database = database
+        self.last_report: Optional[Dict[str, Any]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start the background thread if it is not already running."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="lumina-docs-maintenance", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background thread after the current run finishes."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self) -> None:
+        """Wait out each interval, then run maintenance, until stopped."""
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                self.last_report = run_maintenance(
+                    self.db_path, full_vacuum=False, quick_check=True, database=self.database
+                )
+                logger.info(
+                    "Maintenance reclaimed %d bytes in %.2fs",
+                    self.last_report['reclaimed_bytes'], self.last_report['duration_seconds']
+                )
+            except Exception:
+                logger.exception("Scheduled maintenance failed")
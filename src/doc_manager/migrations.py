@@ -0,0 +1,314 @@
+"""
+Versioned schema migrations for the document database.
+
+The schema version is stored in ``PRAGMA user_version``. Each migration
+upgrades the shared tables and every node table (``document_nodes`` plus the
+``doc_*`` table of each document) to its version; all pending migrations run
+in a single transaction, so a failure leaves the database untouched.
+"""
+import sqlite3
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+def content_table_name(table_name: str) -> str:
+    """Name of the side table holding the bodies of a node table's rows."""
+    return f"content_{table_name}"
+
+
+def index_prefix(table_name: str) -> str:
+    """Prefix for index names of a node table (the default table predates per-table names)."""
+    return "idx" if table_name == "document_nodes" else f"idx_{table_name}"
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Get the schema version stored in the database."""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def get_node_tables(conn: sqlite3.Connection) -> List[str]:
+    """List the default node table and the table of every document."""
+    tables = ["document_nodes"]
+    exists = conn.execute("""
+        SELECT 1 FROM sqlite_master
+        WHERE type = 'table' AND name = 'documents_metadata'
+    """).fetchone()
+    if exists:
+        tables += [row[0] for row in conn.execute(
+            "SELECT table_name FROM documents_metadata ORDER BY id"
+        ).fetchall()]
+    return tables
+
+
+def ensure_columns(conn: sqlite3.Connection, table_name: str, columns: Dict[str, str]) -> None:
+    """Add any missing columns to an existing table."""
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table_name})")}
+    if not existing:
+        return
+    for name, declaration in columns.items():
+        if name not in existing:
+            conn.execute(f"ALTER TABLE {table_name} ADD COLUMN {name} {declaration}")
+
+
+def create_node_table(conn: sqlite3.Connection, table_name: str) -> None:
+    """Create a node table, its indexes and its content side table at the current schema."""
+    prefix = index_prefix(table_name)
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {table_name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            parent_id INTEGER,
+            title TEXT NOT NULL,
+            node_type TEXT NOT NULL,
+            level INTEGER NOT NULL DEFAULT 1,
+            sort_order INTEGER NOT NULL DEFAULT 0,
+            metadata TEXT DEFAULT '{{}}',
+            subtree_version INTEGER NOT NULL DEFAULT 0,
+            version INTEGER NOT NULL DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (parent_id) REFERENCES {table_name}(id) ON DELETE CASCADE
+        )
+    """)
+
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {prefix}_parent_id ON {table_name}(parent_id)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {prefix}_node_type ON {table_name}(node_type)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {prefix}_level_sort ON {table_name}(level, sort_order)")
+
+    create_content_table(conn, table_name)
+
+
+def create_content_table(conn: sqlite3.Connection, table_name: str) -> None:
+    """Create the side table holding the bodies of a node table."""
+    content_table = content_table_name(table_name)
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {content_table} (
+            node_id INTEGER PRIMARY KEY,
+            content TEXT,
+            content_hash TEXT,
+            content_encoding TEXT
+        )
+    """)
+    conn.execute(f"""
+        CREATE INDEX IF NOT EXISTS idx_{content_table}_hash
+        ON {content_table}(content_hash)
+    """)
+
+
+def _split_content_columns(conn: sqlite3.Connection, table_name: str) -> None:
+    """Move bodies stored inline in an older node table into its side table."""
+    columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table_name})")}
+    if 'content' not in columns:
+        return
+
+    ensure_columns(conn, table_name, {
+        "content_hash": "TEXT",
+        "content_encoding": "TEXT",
+    })
+    conn.execute(f"""
+        INSERT OR IGNORE INTO {content_table_name(table_name)}
+        (node_id, content, content_hash, content_encoding)
+        SELECT id, content, content_hash, content_encoding FROM {table_name}
+        WHERE content IS NOT NULL OR content_hash IS NOT NULL
+    """)
+
+    conn.execute(f"DROP INDEX IF EXISTS {index_prefix(table_name)}_content_hash")
+    for column in ("content", "content_hash", "content_encoding"):
+        if sqlite3.sqlite_version_info >= (3, 35, 0):
+            conn.execute(f"ALTER TABLE {table_name} DROP COLUMN {column}")
+        else:
+            conn.execute(f"UPDATE {table_name} SET {column} = NULL")
+
+
+def _migrate_base_schema(conn: sqlite3.Connection, tables: List[str]) -> None:
+    """Create the base schema, upgrading databases created before versioning.
+
+    Covers everything set up ad hoc at startup before migrations existed: the
+    metadata table, the content store, per-table content side tables, and
+    removal of the legacy updated_at triggers.
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS documents_metadata (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            document_name TEXT UNIQUE NOT NULL,
+            table_name TEXT UNIQUE NOT NULL,
+            title TEXT NOT NULL,
+            description TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS content_store (
+            hash TEXT PRIMARY KEY,
+            content TEXT NOT NULL,
+            encoding TEXT,
+            ref_count INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    ensure_columns(conn, "content_store", {"encoding": "TEXT"})
+
+    # Each legacy trigger fired a second UPDATE per modified row; updated_at
+    # is now set by the UPDATE statements themselves
+    triggers = conn.execute("""
+        SELECT name FROM sqlite_master
+        WHERE type = 'trigger' AND name LIKE 'update%timestamp'
+    """).fetchall()
+    for trigger in triggers:
+        conn.execute(f'DROP TRIGGER IF EXISTS "{trigger[0]}"')
+
+    for table_name in get_node_tables(conn):
+        create_node_table(conn, table_name)
+        _split_content_columns(conn, table_name)
+
+
+def _add_subtree_versions(conn: sqlite3.Connection, tables: List[str]) -> None:
+    """Add the subtree_version counter the export cache is validated against."""
+    for table_name in tables:
+        ensure_columns(conn, table_name, {"subtree_version": "INTEGER NOT NULL DEFAULT 0"})
+
+
+def _add_node_versions(conn: sqlite3.Connection, tables: List[str]) -> None:
+    """Add the per-node version checked by optimistic concurrency control."""
+    for table_name in tables:
+        ensure_columns(conn, table_name, {"version": "INTEGER NOT NULL DEFAULT 1"})
+
+
+def _add_change_log(conn: sqlite3.Connection, tables: List[str]) -> None:
+    """Create the append-only log of node changes read by incremental consumers."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS change_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            document_name TEXT,
+            node_id INTEGER,
+            op TEXT NOT NULL,
+            version INTEGER,
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def _add_node_revisions(conn: sqlite3.Connection, tables: List[str]) -> None:
+    """Create the revision history of node edits, stored as full copies and deltas."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS node_revisions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            node_id INTEGER NOT NULL,
+            revision INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            chain INTEGER NOT NULL DEFAULT 0,
+            title TEXT NOT NULL,
+            metadata TEXT,
+            content TEXT,
+            content_encoding TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (table_name, node_id, revision)
+        )
+    """)
+
+
+def _add_snapshots(conn: sqlite3.Connection, tables: List[str]) -> None:
+    """Create named document snapshots and the copy-on-write pre-images of their nodes."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS document_snapshots (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            name TEXT NOT NULL,
+            description TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (table_name, name)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS snapshot_rows (
+            snapshot_id INTEGER NOT NULL,
+            node_id INTEGER NOT NULL,
+            present INTEGER NOT NULL,
+            parent_id INTEGER,
+            title TEXT,
+            node_type TEXT,
+            level INTEGER,
+            sort_order INTEGER,
+            metadata TEXT,
+            content TEXT,
+            content_encoding TEXT,
+            created_at TIMESTAMP,
+            version INTEGER,
+            PRIMARY KEY (snapshot_id, node_id)
+        )
+    """)
+
+
+class Migration:
+    """A schema upgrade to a given version."""
+
+    def __init__(self, version: int, description: str,
+                 apply: Callable[[sqlite3.Connection, List[str]], None]):
+        """Create a migration; apply receives the connection and the node tables."""
+        self.version = version
+        self.description = description
+        self.apply = apply
+
+
+# Ordered list of migrations; append new ones with the next version number
+# and keep create_node_table in step so new documents start at the latest schema
+MIGRATIONS: List[Migration] = [
+    Migration(1, "Base schema with content side tables and content store", _migrate_base_schema),
+    Migration(2, "Subtree versions for export caching", _add_subtree_versions),
+    Migration(3, "Node versions for optimistic concurrency", _add_node_versions),
+    Migration(4, "Change log for incremental consumers", _add_change_log),
+    Migration(5, "Revision history of node edits", _add_node_revisions),
+    Migration(6, "Copy-on-write document snapshots", _add_snapshots),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1].version
+
+
+def run_migrations(db_path: str, dry_run: bool = False, target: Optional[int] = None) -> Dict[str, Any]:
+    """Apply pending migrations in one transaction and report what was done.
+
+    With dry_run the migrations are executed and timed, then rolled back, so
+    the report shows how long a real run would hold the write lock.
+    """
+    target = SCHEMA_VERSION if target is None else target
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    started = time.perf_counter()
+    try:
+        # Take the write lock before reading the version so concurrent
+        # starters do not apply the same migrations twice
+        conn.execute("BEGIN IMMEDIATE")
+        from_version = get_schema_version(conn)
+        pending = [m for m in MIGRATIONS if from_version < m.version <= target]
+
+        applied = []
+        for migration in pending:
+            migration_started = time.perf_counter()
+            tables = get_node_tables(conn)
+            migration.apply(conn, tables)
+            conn.execute(f"PRAGMA user_version = {migration.version}")
+            applied.append({
+                'version': migration.version,
+                'description': migration.description,
+                'tables': len(tables),
+                'duration_seconds': time.perf_counter() - migration_started,
+            })
+
+        if dry_run:
+            conn.execute("ROLLBACK")
+        else:
+            conn.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+    return {
+        'from_version': from_version,
+        'to_version': applied[-1]['version'] if applied else from_version,
+        'dry_run': dry_run,
+        'migrations': applied,
+        'duration_seconds': time.perf_counter() - started,
+    }
@@ -0,0 +1,128 @@
+"""
+Streaming NDJSON import and export of nodes.
+
+Each line is one JSON object. A ``document`` record carries a document's name,
+title and description; the ``node`` records after it carry every node column
+(metadata as a JSON object) plus the name of the document they belong to, or
+null for the default node table. Nodes keep their ids, so parent links and
+sort keys survive a round trip, and importing the same export again updates
+the nodes in place.
+
+Both directions stream: export reads nodes in id-ordered batches and import
+hands consecutive nodes of a document to bulk_load_nodes in batches, so memory
+use does not grow with the size of the data.
+"""
+import json
+from itertools import groupby
+from typing import Any, Dict, Iterable, Iterator, Optional, TextIO
+
+from .database import DocumentDatabase
+
+
+def export_ndjson(db: DocumentDatabase, stream: TextIO, document_name: Optional[str] = None) -> Dict[str, int]:
+    """Write one document, or the whole database if none is given, as NDJSON lines.
+
+    Returns the number of documents and nodes written.
+    """
+    if document_name:
+        document = db.get_document(document_name)
+        if not document:
+            raise ValueError(f"Document '{document_name}' does not exist")
+        documents = [document]
+    else:
+        documents = [None] + sorted(db.get_documents_list(), key=lambda doc: doc['id'])
+
+    counts = {'documents': 0, 'nodes': 0}
+    for document in documents:
+        name = document['document_name'] if document else None
+        if document:
+            _write_line(stream, {
+                'type': 'document',
+                'document_name': name,
+                'title': document['title'],
+                'description': document['description'],
+            })
+            counts['documents'] += 1
+
+        for node in db.iter_nodes(name):
+            _write_line(stream, {'type': 'node', 'document': name, **node,
+                                 'metadata': _parse_metadata(node['metadata'])})
+            counts['nodes'] += 1
+    return counts
+
+
+def import_ndjson(db: DocumentDatabase,
+                  lines: Iterable[str],
+                  document_name: Optional[str] = None,
+                  batch_size: int = 500) -> Dict[str, int]:
+    """Load NDJSON lines, creating missing documents and upserting nodes by id.
+
+    With document_name every node goes into that document (created if
+    needed) whatever document it was exported from; nodes sharing an id then
+    replace one another. Returns the number of documents created and nodes
+    loaded.
+    """
+    counts = {'documents_created': 0, 'nodes': 0}
+    # Document records are only noted while nodes stream, since the node
+    # batches of the previous document are still being written then
+    documents: Dict[str, Dict[str, Any]] = {}
+
+    def ensure_document(name: str) -> None:
+        info = documents.get(name, {})
+        if not db.get_document(name):
+            db.create_document(name, info.get('title') or name, info.get('description'))
+            counts['documents_created'] += 1
+
+    def node_records() -> Iterator[Dict[str, Any]]:
+        for record in _iter_records(lines):
+            if record.get('type') == 'document':
+                documents[record['document_name']] = record
+            elif record.get('type') == 'node':
+                yield record
+            else:
+                raise ValueError(f"Unknown NDJSON record type: {record.get('type')!r}")
+
+    def target(record: Dict[str, Any]) -> Optional[str]:
+        return document_name or record.get('document')
+
+    if document_name:
+        ensure_document(document_name)
+
+    for name, nodes in groupby(node_records(), key=target):
+        if name:
+            ensure_document(name)
+        counts['nodes'] += db.bulk_load_nodes(nodes, name, batch_size)
+
+    if not document_name:
+        # Documents exported without any nodes
+        for name in documents:
+            ensure_document(name)
+    return counts
+
+
+def _write_line(stream: TextIO, record: Dict[str, Any]) -> None:
+    """Write one record as a compact JSON line."""
+    stream.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+    stream.write("\n")
+
+
+def _parse_metadata(metadata: Optional[str]) -> Any:
+    """Metadata as a JSON value, keeping unparseable text as it is."""
+    if not metadata:
+        return {}
+    try:
+        return json.loads(metadata)
+    except json.JSONDecodeError:
+        return metadata
+
+
+def _iter_records(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """Parse non-empty lines, reporting the line number of invalid JSON."""
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON on line {number}: {e}")
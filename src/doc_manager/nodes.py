@@ -0,0 +1,106 @@
+"""
+Compact in-memory node representation for building large trees.
+
+A dict per node with a nested children list costs several hundred bytes of
+overhead before any content, which adds up to gigabytes for trees of
+hundreds of thousands of nodes. Node keeps the same fields in __slots__,
+leaves metadata as its stored JSON text until it is needed, and is turned
+into plain dicts only when a tree is handed to callers or serialized.
+"""
+import json
+from typing import Any, Dict, List, Optional
+
+
+def parse_metadata(metadata: Optional[str]) -> Dict[str, Any]:
+    """Parse a stored metadata column, treating missing or invalid JSON as empty."""
+    if not metadata:
+        return {}
+    try:
+        return json.loads(metadata)
+    except json.JSONDecodeError:
+        return {}
+
+
+class Node:
+    """A node row with its children, stored in slots rather than a dict."""
+
+    __slots__ = (
+        'id', 'parent_id', 'title', 'content', 'node_type', 'level',
+        'sort_order', 'metadata', 'created_at', 'updated_at', 'version', 'children',
+    )
+
+    # Fields reported by to_dict, in the order of the node columns
+    FIELDS = __slots__[:-1]
+
+    def __init__(self,
+                 id: int,
+                 parent_id: Optional[int],
+                 title: str,
+                 content: Optional[str],
+                 node_type: str,
+                 level: int,
+                 sort_order: int,
+                 metadata: Optional[str],
+                 created_at: Optional[str],
+                 updated_at: Optional[str],
+                 version: int = 1):
+        """Create a node; metadata is the stored JSON text."""
+        self.id = id
+        self.parent_id = parent_id
+        self.title = title
+        self.content = content
+        self.node_type = node_type
+        self.level = level
+        self.sort_order = sort_order
+        self.metadata = metadata
+        self.created_at = created_at
+        self.updated_at = updated_at
+        self.version = version
+        self.children: List['Node'] = []
+
+    def __getitem__(self, key: str) -> Any:
+        """Read a field like a node dict, so renderers accept either."""
+        if key == 'metadata':
+            return parse_metadata(self.metadata)
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Read a field like dict.get."""
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def to_dict(self, include_content: bool = True) -> Dict[str, Any]:
+        """Convert the node and its subtree to nested dicts as returned by get_tree_structure."""
+        result = self.to_json_fields(include_content)
+        result['children'] = [child.to_dict(include_content) for child in self.children]
+        return result
+
+    def to_json_fields(self, include_content: bool = True) -> Dict[str, Any]:
+        """The node's fields for json.dumps, with children still as Node objects.
+
+        Used as the encoder's default hook, so only the node being written
+        is converted and the nested dicts of a whole tree never coexist.
+        """
+        result = {field: getattr(self, field) for field in self.FIELDS}
+        if not include_content:
+            del result['content']
+        result['metadata'] = parse_metadata(self.metadata)
+        result['children'] = self.children
+        return result
+
+    def __repr__(self) -> str:
+        return f"Node(id={self.id!r}, title={self.title!r}, children={len(self.children)})"
+
+
+def tree_to_json(nodes: List[Node], include_content: bool = True, indent: Optional[int] = 2) -> str:
+    """Serialize a tree of nodes to JSON in the shape of get_tree_structure."""
+    def default(value: Any) -> Any:
+        if isinstance(value, Node):
+            return value.to_json_fields(include_content)
+        return str(value)
+
+    return json.dumps(nodes, indent=indent, default=default)
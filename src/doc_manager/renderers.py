@@ -0,0 +1,334 @@
+"""
+Export renderers fed from a single walk of the document tree.
+
+render_tree drives any number of renderers from one stream of nodes in
+depth-first order (as produced by DocumentDatabase.iter_tree): each renderer
+is told when a node is entered and when its subtree is finished, and writes
+its output incrementally, so exporting several formats costs one database
+pass and no format needs the whole tree in memory.
+
+New formats subclass Renderer and are added to RENDERERS under their name.
+"""
+import fnmatch
+import html
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, List, Optional, TextIO, Tuple, Type
+
+from .config import config
+from .database import DocumentDatabase
+
+
+class Renderer:
+    """Base class for renderers; subclasses override the hooks they need."""
+
+    # File extension of the rendered output
+    extension = ""
+
+    def __init__(self, stream: TextIO, title: Optional[str] = None, start_level: int = 1):
+        """Create a renderer writing to stream."""
+        self.stream = stream
+        self.title = title
+        self.start_level = start_level
+
+    def start(self) -> None:
+        """Called once before the first node."""
+
+    def enter(self, node: Dict[str, Any], depth: int) -> None:
+        """Called for each node, before the nodes below it."""
+
+    def leave(self, node: Dict[str, Any], depth: int) -> None:
+        """Called for each node once all the nodes below it were entered."""
+
+    def finish(self) -> None:
+        """Called once after the last node."""
+
+
+class MarkdownRenderer(Renderer):
+    """Nodes as Markdown headings followed by their content."""
+
+    extension = "md"
+
+    def enter(self, node: Dict[str, Any], depth: int) -> None:
+        """Write the node heading and content."""
+        self.stream.write(self.section(node, self.start_level + depth - 1))
+
+    @staticmethod
+    def section(node: Dict[str, Any], level: int) -> str:
+        """Markdown for a node's own heading and content, without its children."""
+        text = "#" * level + " " + node['title'] + "\n\n"
+        if node.get('content'):
+            text += node['content'] + "\n\n"
+        return text
+
+
+class HTMLRenderer(Renderer):
+    """A standalone HTML page with a table of contents linking to nested sections.
+
+    The body is spooled to a temporary file while the tree is walked, since
+    the table of contents has to come first; only the headings are kept in
+    memory.
+    """
+
+    extension = "html"
+
+    def start(self) -> None:
+        """Open the spool for the page body."""
+        self._body = tempfile.SpooledTemporaryFile(max_size=1024 * 1024, mode='w+', encoding='utf-8')
+        self._toc: List[Tuple[int, int, str]] = []
+
+    def enter(self, node: Dict[str, Any], depth: int) -> None:
+        """Open the node's section and write its heading and paragraphs."""
+        anchor = f"node-{node['id']}"
+        heading = min(self.start_level + depth - 1, 6)
+        self._toc.append((depth, node['id'], node['title']))
+        self._body.write(f'<section id="{anchor}">\n')
+        self._body.write(f"<h{heading}>{html.escape(node['title'])}</h{heading}>\n")
+        for paragraph in (node.get('content') or "").split("\n\n"):
+            if paragraph.strip():
+                self._body.write(f"<p>{html.escape(paragraph.strip())}</p>\n")
+
+    def leave(self, node: Dict[str, Any], depth: int) -> None:
+        """Close the node's section."""
+        self._body.write("</section>\n")
+
+    def finish(self) -> None:
+        """Write the page head, the table of contents and the spooled body."""
+        title = html.escape(self.title or "Document")
+        self.stream.write(
+            "<!DOCTYPE html>\n<html>\n<head>\n<meta charset=\"utf-8\">\n"
+            f"<title>{title}</title>\n</head>\n<body>\n<h1>{title}</h1>\n"
+        )
+        self._write_toc()
+        self.stream.write("<main>\n")
+        self._body.seek(0)
+        shutil.copyfileobj(self._body, self.stream)
+        self._body.close()
+        self.stream.write("</main>\n</body>\n</html>\n")
+
+    def _write_toc(self) -> None:
+        """Write the headings as nested lists, each sublist inside its parent's item."""
+        self.stream.write('<nav class="toc">\n')
+        open_lists = 0
+        for depth, node_id, title in self._toc:
+            if depth > open_lists:
+                self.stream.write("<ul>\n" * (depth - open_lists))
+            else:
+                self.stream.write("</li>\n" + "</ul>\n</li>\n" * (open_lists - depth))
+            open_lists = depth
+            self.stream.write(f'<li><a href="#node-{node_id}">{html.escape(title)}</a>\n')
+        if open_lists:
+            self.stream.write("</li>\n" + "</ul>\n</li>\n" * (open_lists - 1) + "</ul>\n")
+        self.stream.write("</nav>\n")
+
+
+class JSONRenderer(Renderer):
+    """The tree as a nested JSON array of nodes with their children."""
+
+    extension = "json"
+
+    def start(self) -> None:
+        """Open the top-level array."""
+        self.stream.write("[")
+        # Whether a node was already written at each open nesting level
+        self._written = [False]
+
+    def enter(self, node: Dict[str, Any], depth: int) -> None:
+        """Write the node's fields and open its children array."""
+        if self._written[-1]:
+            self.stream.write(",")
+        self._written[-1] = True
+        fields = {key: value for key, value in node.items() if key != 'depth'}
+        self.stream.write(json.dumps(fields, ensure_ascii=False)[:-1] + ', "children": [')
+        self._written.append(False)
+
+    def leave(self, node: Dict[str, Any], depth: int) -> None:
+        """Close the node's children array and object."""
+        self._written.pop()
+        self.stream.write("]}")
+
+    def finish(self) -> None:
+        """Close the top-level array."""
+        self.stream.write("]\n")
+
+
+# Renderers by format name
+RENDERERS: Dict[str, Type[Renderer]] = {
+    'markdown': MarkdownRenderer,
+    'html': HTMLRenderer,
+    'json': JSONRenderer,
+}
+
+
+def render_tree(nodes: Iterable[Dict[str, Any]], renderers: List[Renderer]) -> int:
+    """Feed depth-first nodes carrying a depth to every renderer, returning the node count."""
+    for renderer in renderers:
+        renderer.start()
+
+    open_nodes: List[Dict[str, Any]] = []
+    count = 0
+    for node in nodes:
+        depth = node['depth']
+        # Finish the subtrees this node is not part of
+        while len(open_nodes) >= depth:
+            closed = open_nodes.pop()
+            for renderer in renderers:
+                renderer.leave(closed, len(open_nodes) + 1)
+        for renderer in renderers:
+            renderer.enter(node, depth)
+        open_nodes.append(node)
+        count += 1
+
+    while open_nodes:
+        closed = open_nodes.pop()
+        for renderer in renderers:
+            renderer.leave(closed, len(open_nodes) + 1)
+    for renderer in renderers:
+        renderer.finish()
+    return count
+
+
+def export_tree(db: DocumentDatabase,
+                formats: Iterable[str] = ('markdown',),
+                parent_id: Optional[int] = None,
+                document_name: Optional[str] = None,
+                filename: Optional[str] = None,
+                start_level: int = 1,
+                output_dir: Optional[str] = None) -> Dict[str, Any]:
+    """Render a tree to one file per format in a single database pass.
+
+    Files are named filename plus each format's extension and written to
+    output_dir, or the configured export directory.
+    """
+    formats = list(dict.fromkeys(formats))
+    unknown = [name for name in formats if name not in RENDERERS]
+    if unknown:
+        raise ValueError(f"Unknown export format(s): {', '.join(unknown)}; "
+                         f"available: {', '.join(RENDERERS)}")
+    if not formats:
+        raise ValueError("No export format given")
+
+    if not filename:
+        timestamp = time.strftime("%Y%m%d_%H%M%S")
+        doc_suffix = f"_{document_name}" if document_name else ""
+        filename = f"document_export{doc_suffix}_{timestamp}"
+    output_dir = output_dir or config.get_export_directory()
+    os.makedirs(output_dir, exist_ok=True)
+
+    title = None
+    if document_name:
+        document = db.get_document(document_name)
+        if not document:
+            raise ValueError(f"Document '{document_name}' does not exist")
+        title = document['title']
+
+    started = time.perf_counter()
+    nodes = db.iter_tree(parent_id, document_name)
+    files: Dict[str, str] = {}
+    streams = []
+    try:
+        renderers = []
+        for name in formats:
+            path = os.path.join(output_dir, f"{filename}.{RENDERERS[name].extension}")
+            stream = open(path, 'w', encoding='utf-8')
+            streams.append(stream)
+            renderers.append(RENDERERS[name](stream, title=title, start_level=start_level))
+            files[name] = path
+        count = render_tree(nodes, renderers)
+    finally:
+        for stream in streams:
+            stream.close()
+
+    return {
+        'files': files,
+        'nodes': count,
+        'duration_seconds': time.perf_counter() - started,
+    }
+
+
+def export_all(db: DocumentDatabase,
+               formats: Iterable[str] = ('markdown',),
+               document_names: Optional[List[str]] = None,
+               pattern: Optional[str] = None,
+               output_dir: Optional[str] = None,
+               workers: Optional[int] = None) -> Dict[str, Any]:
+    """Export many documents concurrently, one subdirectory per document.
+
+    Exports every document, or those named in document_names and/or whose
+    name matches the glob pattern. Documents are rendered on a thread pool
+    reading through read-only connections, into
+    ``<output_dir>/<document>/<document>.<ext>``; output_dir defaults to a
+    timestamped directory under the export directory. A document that fails
+    is reported without stopping the others.
+    """
+    formats = list(formats)
+    unknown = [name for name in formats if name not in RENDERERS]
+    if unknown:
+        raise ValueError(f"Unknown export format(s): {', '.join(unknown)}; "
+                         f"available: {', '.join(RENDERERS)}")
+
+    documents = [doc['document_name'] for doc in db.get_documents_list()]
+    if document_names is not None:
+        missing = sorted(set(document_names) - set(documents))
+        if missing:
+            raise ValueError(f"Document(s) do not exist: {', '.join(missing)}")
+        documents = [name for name in documents if name in document_names]
+    if pattern:
+        documents = [name for name in documents if fnmatch.fnmatchcase(name, pattern)]
+
+    if not output_dir:
+        timestamp = time.strftime("%Y%m%d_%H%M%S")
+        output_dir = os.path.join(config.get_export_directory(), f"export_all_{timestamp}")
+    reader = DocumentDatabase(db.db_path, read_only=True)
+
+    # Directory names safe for the filesystem, kept distinct when names clash,
+    # ignoring case since macOS and Windows filesystems do
+    safe_names: Dict[str, str] = {}
+    taken = set()
+    for name in documents:
+        safe_name = base = re.sub(r'[^\w.-]', '_', name)
+        suffix = 1
+        while safe_name.lower() in taken:
+            suffix += 1
+            safe_name = f"{base}_{suffix}"
+        safe_names[name] = safe_name
+        taken.add(safe_name.lower())
+
+    def export_one(document_name: str) -> Dict[str, Any]:
+        safe_name = safe_names[document_name]
+        report = export_tree(reader, formats, document_name=document_name, filename=safe_name,
+                             output_dir=os.path.join(output_dir, safe_name))
+        report['bytes'] = sum(os.path.getsize(path) for path in report['files'].values())
+        return report
+
+    started = time.perf_counter()
+    exported: Dict[str, Dict[str, Any]] = {}
+    failed: Dict[str, str] = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(export_one, name): name for name in documents}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                exported[name] = future.result()
+            except Exception as e:
+                failed[name] = str(e)
+    duration = time.perf_counter() - started
+
+    nodes = sum(report['nodes'] for report in exported.values())
+    size = sum(report['bytes'] for report in exported.values())
+    return {
+        'output_dir': output_dir,
+        'documents': len(exported),
+        'nodes': nodes,
+        'bytes': size,
+        'failed': failed,
+        'duration_seconds': duration,
+        'documents_per_second': len(exported) / duration if duration else 0.0,
+        'nodes_per_second': nodes / duration if duration else 0.0,
+        'bytes_per_second': size / duration if duration else 0.0,
+    }
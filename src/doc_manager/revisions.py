@@ -0,0 +1,43 @@
+"""
+Line-based deltas for node revision history.
+
+Each revision of a node body is stored either in full or as a delta against
+the revision before it. A delta is a JSON list of operations over the lines
+of the previous body: a [start, end] pair copies that range of old lines and
+a string inserts new text. Edits to long bodies usually touch a few lines,
+so their deltas are a small fraction of a full copy; every few revisions a
+full copy is stored so rebuilding any revision applies a bounded number of
+deltas.
+"""
+import json
+from difflib import SequenceMatcher
+from typing import List, Union
+
+DeltaOp = Union[List[int], str]
+
+
+def make_delta(old: str, new: str) -> str:
+    """Delta turning old into new, as compact JSON."""
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    ops: List[DeltaOp] = []
+    matcher = SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append([i1, i2])
+        elif j2 > j1:
+            # Replacements and inserts carry the new lines; deletes are just skipped
+            ops.append("".join(new_lines[j1:j2]))
+    return json.dumps(ops, separators=(',', ':'), ensure_ascii=False)
+
+
+def apply_delta(old: str, delta: str) -> str:
+    """Rebuild the text a delta was made for from the text it was made against."""
+    old_lines = old.splitlines(keepends=True)
+    parts = []
+    for op in json.loads(delta):
+        if isinstance(op, str):
+            parts.append(op)
+        else:
+            parts.extend(old_lines[op[0]:op[1]])
+    return "".join(parts)
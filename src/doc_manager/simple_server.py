@@ -2,23 +2,105 @@
 """
 Lumina Docs - Intelligent Document Management MCP Server using FastMCP.
 """
+import functools
 import json
-from typing import Any, Dict, List, Optional
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
 from mcp.server.fastmcp import FastMCP
 from .database import DocumentDatabase
 from .config import config
 from .markdown_parser import MarkdownImporter
+from .backup import backup_database as run_backup, snapshot_database
+from .dump import clone_document as run_clone
+from .ndjson import export_ndjson as run_ndjson_export, import_ndjson as run_ndjson_import
+from .maintenance import MaintenanceScheduler
+from .nodes import tree_to_json
+from .renderers import export_all, export_tree
 
-# Initialize the database
-db = DocumentDatabase()
+# Database and Markdown importer are created on first use, so the server can
+# answer the MCP handshake without touching the database
+_db: Optional[DocumentDatabase] = None
+_markdown_importer: Optional[MarkdownImporter] = None
+_maintenance: Optional[MaintenanceScheduler] = None
+
+
+def get_db() -> DocumentDatabase:
+    """Get the shared database, opening it on first use."""
+    global _db, _maintenance
+    if _db is None:
+        if config.is_read_only():
+            _db = DocumentDatabase(read_only=True, immutable=config.is_immutable())
+            return _db
+        _db = DocumentDatabase()
+        if config.is_group_commit_enabled():
+            _db.start_writer(config.get_group_commit_max_batch(), config.get_group_commit_delay())
+        if config.get_maintenance_interval() > 0:
+            _maintenance = MaintenanceScheduler(_db.db_path, config.get_maintenance_interval(), _db)
+            _maintenance.start()
+    return _db
+
+
+def get_markdown_importer() -> MarkdownImporter:
+    """Get the shared Markdown importer, creating it on first use."""
+    global _markdown_importer
+    if _markdown_importer is None:
+        _markdown_importer = MarkdownImporter(get_db())
+    return _markdown_importer
 
-# Initialize Markdown importer
-markdown_importer = MarkdownImporter(db)
 
 # Create MCP server
 mcp = FastMCP(config.get_server_name())
 
-@mcp.tool()
+
+def mutation_tool() -> Callable:
+    """Register a tool that modifies documents, unless the server is a read-only replica."""
+    if config.is_read_only():
+        return lambda func: func
+    return mcp.tool()
+
+
+# Responses of read tools on a read-only replica, valid for one data version
+RESPONSE_CACHE_SIZE = 1024
+_response_cache: "OrderedDict[str, str]" = OrderedDict()
+_response_cache_version: Optional[int] = None
+_response_cache_lock = threading.Lock()
+
+
+def cached_read(func: Callable[..., str]) -> Callable[..., str]:
+    """Cache a read tool's responses on read-only replicas.
+    
+    A replica never writes, so its cached responses stay valid until another
+    process commits, which PRAGMA data_version reveals; the whole cache is
+    dropped then. Writable servers call the tool directly.
+    """
+    if not config.is_read_only():
+        return func
+    
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> str:
+        global _response_cache_version
+        key = json.dumps([func.__name__, args, kwargs], sort_keys=True, default=str)
+        version = get_db().get_data_version()
+        with _response_cache_lock:
+            if version != _response_cache_version:
+                _response_cache.clear()
+                _response_cache_version = version
+            elif key in _response_cache:
+                _response_cache.move_to_end(key)
+                return _response_cache[key]
+        
+        result = func(*args, **kwargs)
+        with _response_cache_lock:
+            if version == _response_cache_version:
+                _response_cache[key] = result
+                if len(_response_cache) > RESPONSE_CACHE_SIZE:
+                    _response_cache.popitem(last=False)
+        return result
+    
+    return wrapper
+
+@mutation_tool()
 def create_document(
     document_name: str,
     title: str,
@@ -34,7 +116,7 @@ def create_document(
     用途：当你需要开始一个新的文档项目时使用，比如创建技术文档、产品手册、会议记录等。
     每个文档都有独立的存储空间，互不干扰。"""
     try:
-        table_name = db.create_document(
+        table_name = get_db().create_document(
             document_name=document_name,
             title=title,
             description=description
@@ -46,6 +128,7 @@ def create_document(
         return f"Failed to create document: {str(e)}"
 
 @mcp.tool()
+@cached_read
 def get_documents_list() -> str:
     """获取系统中所有文档的列表和基本信息。
     
@@ -57,14 +140,14 @@ def get_documents_list() -> str:
     
     用途：查看当前系统中有哪些文档，选择要操作的文档，或者了解文档的基本信息。"""
     try:
-        documents = db.get_documents_list()
+        documents = get_db().get_documents_list()
         if not documents:
             return "No documents found."
         return json.dumps(documents, indent=2, default=str)
     except Exception as e:
         return f"Failed to get documents list: {str(e)}"
 
-@mcp.tool()
+@mutation_tool()
 def create_node(
     title: str, 
     node_type: str, 
@@ -87,7 +170,7 @@ def create_node(
     
     用途：构建文档的层级结构，添加章节、段落等内容单元。"""
     try:
-        node_id = db.create_node(
+        node_id = get_db().create_node(
             title=title,
             node_type=node_type,
             content=content,
@@ -104,6 +187,7 @@ def create_node(
         return f"Failed to create node: {str(e)}"
 
 @mcp.tool()
+@cached_read
 def get_node(node_id: int, document_name: Optional[str] = None) -> str:
     """根据节点ID获取指定节点的完整信息。
     
@@ -119,7 +203,7 @@ def get_node(node_id: int, document_name: Optional[str] = None) -> str:
     
     用途：查看特定节点的详细信息，检查节点属性。"""
     try:
-        node = db.get_node(node_id, document_name)
+        node = get_db().get_node(node_id, document_name)
         if not node:
             doc_info = f" in document '{document_name}'" if document_name else " in default table"
             return f"Node with ID {node_id} not found{doc_info}."
@@ -129,12 +213,14 @@ def get_node(node_id: int, document_name: Optional[str] = None) -> str:
     except Exception as e:
         return f"Failed to get node: {str(e)}"
 
-@mcp.tool()
+@mutation_tool()
 def update_node(
     node_id: int,
     title: Optional[str] = None,
     content: Optional[str] = None,
-    metadata: Optional[Dict[str, Any]] = None
+    metadata: Optional[Dict[str, Any]] = None,
+    expected_version: Optional[int] = None,
+    document_name: Optional[str] = None
 ) -> str:
     """更新现有节点的内容信息。
     
@@ -143,43 +229,187 @@ def update_node(
     - title: 新的标题（可选，不填则不更新）
     - content: 新的内容（可选，不填则不更新）
     - metadata: 新的元数据（可选，不填则不更新）
+    - expected_version: 期望的节点版本号（可选，取自 get_node 返回的 version；
+      节点已被他人修改时更新失败并返回冲突错误）
+    - document_name: 节点所在的文档名称（可选，不填则使用默认表）
     
     用途：修改节点的标题、内容或元数据信息。更新时间会自动更新。
+    每次成功修改后节点的 version 加 1，可直接用于下一次修改而无需重新读取。
     注意：不能通过此方法更改节点的层级关系或类型。"""
-    success = db.update_node(
-        node_id=node_id,
-        title=title,
-        content=content,
-        metadata=metadata
-    )
+    try:
+        success = get_db().update_node(
+            node_id=node_id,
+            title=title,
+            content=content,
+            metadata=metadata,
+            expected_version=expected_version,
+            document_name=document_name
+        )
+    except ValueError as e:
+        return f"Error: {str(e)}"
+    except Exception as e:
+        return f"Failed to update node: {str(e)}"
     if success:
         return f"Successfully updated node {node_id}"
     else:
         return f"Failed to update node {node_id} - node may not exist"
 
-@mcp.tool()
-def delete_node(node_id: int) -> str:
+@mutation_tool()
+def delete_node(node_id: int, expected_version: Optional[int] = None, document_name: Optional[str] = None) -> str:
     """删除指定的节点及其所有子节点。
     
     参数：
     - node_id: 要删除的节点ID
+    - expected_version: 期望的节点版本号（可选；节点已被他人修改时不删除并返回冲突错误）
+    - document_name: 节点所在的文档名称（可选，不填则使用默认表）
     
     注意：此操作会级联删除该节点下的所有子节点，不可恢复！
     
     用途：移除不需要的文档章节或段落。删除父节点时，其下所有子节点也会被删除。"""
-    success = db.delete_node(node_id)
-    if success:
-        return f"Successfully deleted node {node_id} and all its children"
+    try:
+        deleted = get_db().delete_node(node_id, expected_version, document_name)
+    except ValueError as e:
+        return f"Error: {str(e)}"
+    except Exception as e:
+        return f"Failed to delete node: {str(e)}"
+    if deleted:
+        return f"Successfully deleted node {node_id} and all its children ({deleted} nodes)"
     else:
         return f"Failed to delete node {node_id} - node may not exist"
 
+@mutation_tool()
+def patch_node_metadata(
+    node_id: int,
+    patch: Optional[Dict[str, Any]] = None,
+    remove: Optional[List[str]] = None,
+    expected_version: Optional[int] = None,
+    document_name: Optional[str] = None
+) -> str:
+    """局部修改节点的元数据，只改动指定的键，其余元数据保持不变。
+    
+    参数：
+    - node_id: 要修改的节点ID
+    - patch: 要合并的元数据（JSON Merge Patch 语义：设置其中的键，嵌套对象逐层合并，值为null的键被删除），
+      如 {'status': 'reviewed', 'review': {'by': 'alice'}}（可选）
+    - remove: 要删除的元数据键列表，如 ['draft_note']（可选）
+    - expected_version: 期望的节点版本号（可选；节点已被他人修改时不修改并返回冲突错误）
+    - document_name: 节点所在的文档名称（可选，不填则使用默认表）
+    
+    用途：修改单个元数据键时无需先读取整个元数据再整体写回，修改在数据库中直接完成。"""
+    try:
+        success = get_db().patch_node_metadata(node_id, patch, remove, expected_version, document_name)
+        if success:
+            return f"Successfully patched metadata of node {node_id}"
+        return f"Failed to patch metadata of node {node_id} - node may not exist or patch is empty"
+    except ValueError as e:
+        return f"Error: {str(e)}"
+    except Exception as e:
+        return f"Failed to patch metadata: {str(e)}"
+
+@mutation_tool()
+def patch_metadata_where(
+    patch: Optional[Dict[str, Any]] = None,
+    remove: Optional[List[str]] = None,
+    query: str = "",
+    node_type: Optional[str] = None,
+    metadata_filter: Optional[Dict[str, Any]] = None,
+    document_name: Optional[str] = None
+) -> str:
+    """批量局部修改所有匹配节点的元数据，用一条语句完成。
+    
+    参数：
+    - patch: 要合并的元数据，语义同 patch_node_metadata（可选）
+    - remove: 要删除的元数据键列表（可选）
+    - query / node_type / metadata_filter: 筛选条件，与 search_nodes 相同，至少提供一个
+    - document_name: 文档名称（可选，不填则使用默认表）
+    
+    用途：批量打标签、修改状态，如将所有 'business_flow' 类型节点标记为 {'status': 'reviewed'}。
+    返回被修改的节点数量。"""
+    try:
+        count = get_db().patch_metadata_where(
+            patch=patch,
+            remove=remove,
+            query=query,
+            node_type=node_type,
+            metadata_filter=metadata_filter,
+            document_name=document_name
+        )
+        return f"Successfully patched metadata of {count} nodes"
+    except ValueError as e:
+        return f"Error: {str(e)}"
+    except Exception as e:
+        return f"Failed to patch metadata: {str(e)}"
+
+@mutation_tool()
+def update_nodes_where(
+    updates: Dict[str, Any],
+    query: str = "",
+    node_type: Optional[str] = None,
+    metadata_filter: Optional[Dict[str, Any]] = None,
+    document_name: Optional[str] = None
+) -> str:
+    """批量修改所有匹配节点的字段，在一个事务中用一条语句完成。
+    
+    参数：
+    - updates: 要设置的字段及新值，支持 'title'、'node_type'、'metadata'（整体替换），
+      如 {'node_type': 'process_flow'}
+    - query / node_type / metadata_filter: 筛选条件，与 search_nodes 相同，至少提供一个
+    - document_name: 文档名称（可选，不填则使用默认表）
+    
+    用途：批量重新分类或重命名，如将所有 'business_flow' 节点改为 'process_flow' 类型，
+    无需逐个调用 update_node。返回被修改的节点数量。"""
+    try:
+        count = get_db().update_nodes_where(
+            updates=updates,
+            query=query,
+            node_type=node_type,
+            metadata_filter=metadata_filter,
+            document_name=document_name
+        )
+        return f"Successfully updated {count} nodes"
+    except ValueError as e:
+        return f"Error: {str(e)}"
+    except Exception as e:
+        return f"Failed to update nodes: {str(e)}"
+
+@mutation_tool()
+def delete_nodes_where(
+    query: str = "",
+    node_type: Optional[str] = None,
+    metadata_filter: Optional[Dict[str, Any]] = None,
+    document_name: Optional[str] = None
+) -> str:
+    """批量删除所有匹配的节点及其全部子节点，在一个事务中完成。
+    
+    参数：
+    - query / node_type / metadata_filter: 筛选条件，与 search_nodes 相同，至少提供一个
+    - document_name: 文档名称（可选，不填则使用默认表）
+    
+    注意：匹配节点下的所有子节点也会被删除，不可恢复！
+    
+    用途：清理文档，如删除所有元数据为 {'status': 'draft'} 的节点。返回被删除的节点总数（含子节点）。"""
+    try:
+        count = get_db().delete_nodes_where(
+            query=query,
+            node_type=node_type,
+            metadata_filter=metadata_filter,
+            document_name=document_name
+        )
+        return f"Successfully deleted {count} nodes"
+    except ValueError as e:
+        return f"Error: {str(e)}"
+    except Exception as e:
+        return f"Failed to delete nodes: {str(e)}"
+
 @mcp.tool()
-def get_children(parent_id: Optional[int] = None, document_name: Optional[str] = None) -> str:
+@cached_read
+def get_children(parent_id: Optional[int] = None, document_name: Optional[str] = None, include_content: bool = True) -> str:
     """获取指定节点的直接子节点列表。
     
     参数：
     - parent_id: 父节点ID（可选，不填则获取根节点）
     - document_name: 文档名称（可选，不填则从默认表查找）
+    - include_content: 是否返回节点内容（默认True；只浏览目录时设为False更快）
     
     返回信息：
     - 按排序顺序返回所有直接子节点
@@ -187,7 +417,7 @@ def get_children(parent_id: Optional[int] = None, document_name: Optional[str] =
     
     用途：查看文档的层级结构，浏览某个章节下的所有小节。"""
     try:
-        children = db.get_children(parent_id, document_name)
+        children = get_db().get_children(parent_id, document_name, include_content)
         return json.dumps(children, indent=2, default=str)
     except ValueError as e:
         return f"Error: {str(e)}"
@@ -195,6 +425,7 @@ def get_children(parent_id: Optional[int] = None, document_name: Optional[str] =
         return f"Failed to get children: {str(e)}"
 
 @mcp.tool()
+@cached_read
 def search_nodes(
     query: str = "",
     node_type: Optional[str] = None,
@@ -212,7 +443,7 @@ def search_nodes(
     用途：快速找到包含特定内容的节点，支持全文搜索、类型筛选和元数据过滤。
     搜索结果按层级和排序顺序返回。"""
     try:
-        results = db.search_nodes(
+        results = get_db().search_nodes(
             query=query,
             node_type=node_type,
             metadata_filter=metadata_filter,
@@ -225,6 +456,7 @@ def search_nodes(
         return f"Failed to search nodes: {str(e)}"
 
 @mcp.tool()
+@cached_read
 def get_nodes_by_type(node_type: str, document_name: Optional[str] = None) -> str:
     """获取指定类型的所有节点，用于一致性分析和批量操作。
     
@@ -239,7 +471,7 @@ def get_nodes_by_type(node_type: str, document_name: Optional[str] = None) -> st
     用途：分析文档结构，检查特定类型节点的一致性，或对同类型节点进行批量处理。
     例如：查看所有章节标题的命名规范，或找出所有图片节点。"""
     try:
-        nodes = db.get_nodes_by_type(node_type, document_name)
+        nodes = get_db().get_nodes_by_type(node_type, document_name)
         return json.dumps(nodes, indent=2, default=str)
     except ValueError as e:
         return f"Error: {str(e)}"
@@ -247,11 +479,212 @@ def get_nodes_by_type(node_type: str, document_name: Optional[str] = None) -> st
         return f"Failed to get nodes by type: {str(e)}"
 
 @mcp.tool()
-def get_node_path(node_id: int) -> str:
+@cached_read
+def list_revisions(node_id: int, document_name: Optional[str] = None) -> str:
+    """列出节点的历史修订版本（从新到旧），不包含正文。
+    
+    参数：
+    - node_id: 节点ID
+    - document_name: 节点所在的文档名称（可选，不填则使用默认表）
+    
+    返回信息：
+    - 每个修订的 revision（即当时的节点 version）、标题、存储方式（full 全量/delta 增量）、存储大小和时间
+    
+    用途：查看节点的编辑历史，选择要查看或恢复的版本。"""
+    try:
+        revisions = get_db().list_revisions(node_id, document_name)
+        return json.dumps(revisions, indent=2, default=str)
+    except ValueError as e:
+        return f"Error: {str(e)}"
+    except Exception as e:
+        return f"Failed to list revisions: {str(e)}"
+
+@mcp.tool()
+@cached_read
+def get_revision(node_id: int, revision: int, document_name: Optional[str] = None) -> str:
+    """获取节点在某个历史修订时的完整内容。
+    
+    参数：
+    - node_id: 节点ID
+    - revision: 修订号（来自 list_revisions）
+    - document_name: 节点所在的文档名称（可选，不填则使用默认表）
+    
+    返回信息：该修订时的标题、内容和元数据。
+    
+    用途：对比历史版本，或在恢复前确认旧版本的内容。"""
+    try:
+        state = get_db().get_revision(node_id, revision, document_name)
+        if state is None:
+            return f"Revision {revision} of node {node_id} not found."
+        return json.dumps(state, indent=2, default=str)
+    except ValueError as e:
+        return f"Error: {str(e)}"
+    except Exception as e:
+        return f"Failed to get revision: {str(e)}"
+
+@mutation_tool()
+def restore_revision(
+    node_id: int,
+    revision: int,
+    expected_version: Optional[int] = None,
+    document_name: Optional[str] = None
+) -> str:
+    """将节点的标题、内容和元数据恢复为某个历史修订（撤销编辑）。
+    
+    参数：
+    - node_id: 节点ID
+    - revision: 要恢复的修订号（来自 list_revisions）
+    - expected_version: 期望的节点版本号（可选；节点已被他人修改时不恢复并返回冲突错误）
+    - document_name: 节点所在的文档名称（可选，不填则使用默认表）
+    
+    注意：恢复操作本身会记录为一个新的修订，因此也可以再次撤销。"""
+    try:
+        if get_db().restore_revision(node_id, revision, expected_version, document_name):
+            return f"Successfully restored node {node_id} to revision {revision}"
+        return f"Failed to restore node {node_id} - node may not exist"
+    except ValueError as e:
+        return f"Error: {str(e)}"
+    except Exception as e:
+        return f"Failed to restore revision: {str(e)}"
+
+@mutation_tool()
+def create_snapshot(
+    name: str,
+    document_name: Optional[str] = None,
+    description: Optional[str] = None
+) -> str:
+    """为文档创建一个命名的时间点快照，用于大规模重构前的回滚保护。
+    
+    参数：
+    - name: 快照名称（同一文档内唯一）
+    - document_name: 文档名称（可选，不填则使用默认表）
+    - description: 快照说明（可选）
+    
+    注意：创建快照不复制任何数据；之后每个节点第一次被修改时才保存其原始状态（写时复制），
+    因此快照的开销只与快照后被修改的节点数有关。"""
+    try:
+        snapshot = get_db().create_snapshot(name, document_name, description)
+        return f"Successfully created snapshot '{name}' at {snapshot['created_at']}"
+    except ValueError as e:
+        return f"Error: {str(e)}"
+    except Exception as e:
+        return f"Failed to create snapshot: {str(e)}"
+
+@mcp.tool()
+@cached_read
+def list_snapshots(document_name: Optional[str] = None) -> str:
+    """列出文档的所有快照（从旧到新）。
+    
+    参数：
+    - document_name: 文档名称（可选，不填则使用默认表）
+    
+    返回信息：每个快照的名称、说明、创建时间，以及为其保存的节点数（saved_nodes）。"""
+    try:
+        snapshots = get_db().list_snapshots(document_name)
+        return json.dumps(snapshots, indent=2, default=str)
+    except ValueError as e:
+        return f"Error: {str(e)}"
+    except Exception as e:
+        return f"Failed to list snapshots: {str(e)}"
+
+@mcp.tool()
+@cached_read
+def diff_snapshots(
+    name: str,
+    other: Optional[str] = None,
+    document_name: Optional[str] = None
+) -> str:
+    """比较文档在两个快照之间的差异，或快照与当前状态的差异。
+    
+    参数：
+    - name: 作为基准的快照名称
+    - other: 要比较的另一个快照名称（可选，不填则与文档当前状态比较）
+    - document_name: 文档名称（可选，不填则使用默认表）
+    
+    返回信息：
+    - added: 从 name 到 other 新增的节点
+    - removed: 被删除的节点
+    - changed: 被修改的节点及其变化的字段（parent_id、title、node_type、sort_order、metadata、content）
+    
+    用途：在恢复快照前确认会撤销哪些修改。"""
+    try:
+        diff = get_db().diff_snapshots(name, other, document_name)
+        return json.dumps(diff, indent=2, default=str)
+    except ValueError as e:
+        return f"Error: {str(e)}"
+    except Exception as e:
+        return f"Failed to diff snapshots: {str(e)}"
+
+@mutation_tool()
+def restore_snapshot(name: str, document_name: Optional[str] = None) -> str:
+    """将文档恢复到某个快照时的状态（在单个事务中完成）。
+    
+    参数：
+    - name: 快照名称
+    - document_name: 文档名称（可选，不填则使用默认表）
+    
+    注意：快照之后新建的节点会被删除，其余被修改的节点恢复结构、标题、元数据和内容，
+    并获得新的版本号；该快照及之后的快照在恢复后仍然可用。"""
+    try:
+        result = get_db().restore_snapshot(name, document_name)
+        return (f"Successfully restored snapshot '{name}': "
+                f"{result['restored']} node(s) restored, {result['deleted']} deleted")
+    except ValueError as e:
+        return f"Error: {str(e)}"
+    except Exception as e:
+        return f"Failed to restore snapshot: {str(e)}"
+
+@mutation_tool()
+def delete_snapshot(name: str, document_name: Optional[str] = None) -> str:
+    """删除文档的一个快照。
+    
+    参数：
+    - name: 快照名称
+    - document_name: 文档名称（可选，不填则使用默认表）
+    
+    注意：更早的快照仍然可以正常恢复和比较。"""
+    try:
+        if get_db().delete_snapshot(name, document_name):
+            return f"Successfully deleted snapshot '{name}'"
+        return f"Snapshot '{name}' not found"
+    except ValueError as e:
+        return f"Error: {str(e)}"
+    except Exception as e:
+        return f"Failed to delete snapshot: {str(e)}"
+
+@mcp.tool()
+@cached_read
+def get_changes_since(cursor: int = 0, limit: int = 1000) -> str:
+    """按顺序读取节点变更日志，供搜索索引、分析等下游系统增量同步。
+    
+    参数：
+    - cursor: 上次调用返回的 cursor（首次同步传0）
+    - limit: 本次最多返回的变更条数（默认1000，最多10000）
+    
+    返回信息：
+    - changes: 变更列表，每条包含 seq、document_name（默认表为null）、node_id、
+      op（create/update/move/delete/create_document/delete_document）、version、changed_at
+    - cursor: 下次调用时传入的游标
+    - has_more: 是否还有未读取的变更
+    - resync_required: 为true时表示部分变更已被清理，需要重新全量读取文档
+    
+    用途：只处理上次同步之后发生变化的节点，无需重新读取整个文档。"""
+    try:
+        changes = get_db().get_changes_since(cursor, limit)
+        return json.dumps(changes, indent=2, default=str)
+    except ValueError as e:
+        return f"Error: {str(e)}"
+    except Exception as e:
+        return f"Failed to get changes: {str(e)}"
+
+@mcp.tool()
+@cached_read
+def get_node_path(node_id: int, document_name: Optional[str] = None) -> str:
     """获取从根节点到指定节点的完整路径。
     
     参数：
     - node_id: 目标节点的ID
+    - document_name: 节点所在的文档名称（可选，不填则使用默认表）
     
     返回信息：
     - 从根节点到目标节点的完整路径链
@@ -259,16 +692,23 @@ def get_node_path(node_id: int) -> str:
     
     用途：了解节点在文档中的位置，生成面包屑导航，或分析节点的层级关系。
     对于深层嵌套的节点特别有用。"""
-    path = db.get_node_path(node_id)
-    return json.dumps(path, indent=2, default=str)
+    try:
+        path = get_db().get_node_path(node_id, document_name)
+        return json.dumps(path, indent=2, default=str)
+    except ValueError as e:
+        return f"Error: {str(e)}"
+    except Exception as e:
+        return f"Failed to get node path: {str(e)}"
 
 @mcp.tool()
-def get_tree_structure(parent_id: Optional[int] = None, document_name: Optional[str] = None) -> str:
+@cached_read
+def get_tree_structure(parent_id: Optional[int] = None, document_name: Optional[str] = None, include_content: bool = True) -> str:
     """获取完整的文档树状结构，包含所有层级关系。
     
     参数：
     - parent_id: 起始节点ID（可选，不填则从根节点开始）
     - document_name: 文档名称（可选，不填则从默认表获取）
+    - include_content: 是否返回节点内容（默认True；只生成目录时设为False更快）
     
     返回信息：
     - 嵌套的树状结构，包含所有子节点
@@ -277,8 +717,8 @@ def get_tree_structure(parent_id: Optional[int] = None, document_name: Optional[
     用途：查看文档的完整结构，生成目录，或导出整个文档层级。
     适合需要了解文档全貌的场景。"""
     try:
-        tree = db.get_tree_structure(parent_id, document_name)
-        return json.dumps(tree, indent=2, default=str)
+        tree = get_db().build_tree(parent_id, document_name, include_content)
+        return tree_to_json(tree, include_content)
     except ValueError as e:
         return f"Error: {str(e)}"
     except Exception as e:
@@ -305,7 +745,7 @@ def export_to_markdown(filename: Optional[str] = None, parent_id: Optional[int]
     
     try:
         # 生成 markdown 内容
-        markdown = db.export_tree_to_markdown(parent_id, start_level, document_name)
+        markdown = get_db().export_tree_to_markdown(parent_id, start_level, document_name)
         
         # 确定文件名
         if not filename:
@@ -334,12 +774,85 @@ def export_to_markdown(filename: Optional[str] = None, parent_id: Optional[int]
         return f"导出失败：{str(e)}"
 
 @mcp.tool()
-def move_node(node_id: int, new_parent_id: Optional[int] = None) -> str:
+def export_document(
+    formats: List[str],
+    filename: Optional[str] = None,
+    parent_id: Optional[int] = None,
+    start_level: int = 1,
+    document_name: Optional[str] = None
+) -> str:
+    """一次遍历文档树，同时导出为多种格式并保存到导出目录。
+    
+    参数：
+    - formats: 导出格式列表，可选 markdown、html（带目录的单文件网页）、json（嵌套节点树）
+    - filename: 输出文件名，不含扩展名（可选，不填则自动生成带时间戳的文件名）
+    - parent_id: 导出的起始节点ID（可选，不填则从根节点开始）
+    - start_level: 标题的起始级别（默认为1）
+    - document_name: 源文档名称（可选，不填则从默认表导出）
+    
+    输出：
+    - 每种格式在配置的导出目录生成一个文件
+    - 只读取一次数据库，边遍历边写入，大文档也不会占用大量内存
+    
+    用途：发布文档为网页、与其他工具交换结构化数据，或同时生成多种格式的副本。"""
+    try:
+        report = export_tree(get_db(), formats, parent_id, document_name, filename, start_level)
+        files = "\n".join(f"- {name}: {path}" for name, path in report['files'].items())
+        return f"Exported {report['nodes']} nodes in {report['duration_seconds']:.2f}s:\n{files}"
+    except ValueError as e:
+        return f"Error: {str(e)}"
+    except Exception as e:
+        return f"导出失败：{str(e)}"
+
+@mcp.tool()
+def export_all_documents(
+    formats: Optional[List[str]] = None,
+    document_names: Optional[List[str]] = None,
+    pattern: Optional[str] = None,
+    workers: Optional[int] = None
+) -> str:
+    """并发批量导出多个文档到导出目录下的一个新目录，每个文档一个子目录。
+    
+    参数：
+    - formats: 导出格式列表，可选 markdown、html、json（默认仅markdown）
+    - document_names: 要导出的文档名称列表（可选，不填则导出全部文档）
+    - pattern: 文档名称通配符过滤，如 "api_*"（可选）
+    - workers: 并发线程数（可选，默认由线程池自动决定）
+    
+    输出：
+    - 使用只读连接在线程池中并行导出，不影响写入操作
+    - 返回导出目录、文档数、节点数、失败列表和吞吐量
+    
+    用途：一次调用导出整个文档库，替代逐个文档调用export_to_markdown。"""
+    try:
+        report = export_all(get_db(), formats or ['markdown'], document_names, pattern, workers=workers)
+        result = f"Exported {report['documents']} documents ({report['nodes']} nodes, " \
+                 f"{report['bytes']:,} bytes) to: {report['output_dir']}\n" \
+                 f"耗时：{report['duration_seconds']:.2f} 秒，" \
+                 f"{report['documents_per_second']:.1f} 文档/秒，{report['nodes_per_second']:.0f} 节点/秒"
+        if report['failed']:
+            failures = "\n".join(f"- {name}: {error}" for name, error in report['failed'].items())
+            result += f"\n\n导出失败的文档：\n{failures}"
+        return result
+    except ValueError as e:
+        return f"Error: {str(e)}"
+    except Exception as e:
+        return f"导出失败：{str(e)}"
+
+@mutation_tool()
+def move_node(
+    node_id: int,
+    new_parent_id: Optional[int] = None,
+    expected_version: Optional[int] = None,
+    document_name: Optional[str] = None
+) -> str:
     """将节点移动到新的父节点下，重新组织文档结构。
     
     参数：
     - node_id: 要移动的节点ID
     - new_parent_id: 新的父节点ID（可选，不填则移动到根级别）
+    - expected_version: 期望的节点版本号（可选；节点已被他人修改时不移动并返回冲突错误）
+    - document_name: 节点所在的文档名称（可选，不填则使用默认表）
     
     操作：
     - 自动调整节点的层级深度
@@ -348,13 +861,110 @@ def move_node(node_id: int, new_parent_id: Optional[int] = None) -> str:
     
     用途：重新组织文档结构，调整章节顺序，或将内容移动到不同的章节下。
     注意：移动操作会影响节点及其所有子节点的层级关系。"""
-    success = db.move_node(node_id, new_parent_id)
+    try:
+        success = get_db().move_node(node_id, new_parent_id, expected_version, document_name)
+    except ValueError as e:
+        return f"Error: {str(e)}"
+    except Exception as e:
+        return f"Failed to move node: {str(e)}"
     if success:
         return f"Successfully moved node {node_id} to new parent {new_parent_id}"
     else:
         return f"Failed to move node {node_id} - node or parent may not exist"
 
-@mcp.tool()
+@mutation_tool()
+def insert_before(
+    sibling_id: int,
+    title: str,
+    node_type: str,
+    content: Optional[str] = None,
+    metadata: Optional[Dict[str, Any]] = None,
+    document_name: Optional[str] = None
+) -> str:
+    """在指定兄弟节点之前插入新节点。
+    
+    参数：
+    - sibling_id: 参照的兄弟节点ID，新节点会插在它前面
+    - title: 节点标题（必需）
+    - node_type: 节点类型，如 'chapter'、'section'、'paragraph' 等
+    - content: 节点的具体内容（可选）
+    - metadata: 附加元数据，JSON格式（可选）
+    - document_name: 目标文档名称（可选，不填则使用默认表）
+    
+    用途：在已有章节之间插入新内容，无需重新编号后续兄弟节点。"""
+    try:
+        node_id = get_db().insert_before(
+            sibling_id=sibling_id,
+            title=title,
+            node_type=node_type,
+            content=content,
+            metadata=metadata,
+            document_name=document_name
+        )
+        return f"Successfully inserted node {node_id} before node {sibling_id}\nTitle: {title}\nType: {node_type}"
+    except ValueError as e:
+        return f"Error: {str(e)}"
+    except Exception as e:
+        return f"Failed to insert node: {str(e)}"
+
+@mutation_tool()
+def insert_after(
+    sibling_id: int,
+    title: str,
+    node_type: str,
+    content: Optional[str] = None,
+    metadata: Optional[Dict[str, Any]] = None,
+    document_name: Optional[str] = None
+) -> str:
+    """在指定兄弟节点之后插入新节点。
+    
+    参数：
+    - sibling_id: 参照的兄弟节点ID，新节点会插在它后面
+    - title: 节点标题（必需）
+    - node_type: 节点类型，如 'chapter'、'section'、'paragraph' 等
+    - content: 节点的具体内容（可选）
+    - metadata: 附加元数据，JSON格式（可选）
+    - document_name: 目标文档名称（可选，不填则使用默认表）
+    
+    用途：在已有章节之间插入新内容，无需重新编号后续兄弟节点。"""
+    try:
+        node_id = get_db().insert_after(
+            sibling_id=sibling_id,
+            title=title,
+            node_type=node_type,
+            content=content,
+            metadata=metadata,
+            document_name=document_name
+        )
+        return f"Successfully inserted node {node_id} after node {sibling_id}\nTitle: {title}\nType: {node_type}"
+    except ValueError as e:
+        return f"Error: {str(e)}"
+    except Exception as e:
+        return f"Failed to insert node: {str(e)}"
+
+@mutation_tool()
+def reorder_children(
+    ordered_ids: List[int],
+    parent_id: Optional[int] = None,
+    document_name: Optional[str] = None
+) -> str:
+    """调整指定节点下子节点的排列顺序。
+    
+    参数：
+    - ordered_ids: 子节点ID列表，按期望的顺序排列；未列出的子节点保持原有相对顺序排在其后
+    - parent_id: 父节点ID（可选，不填则调整根节点的顺序）
+    - document_name: 文档名称（可选，不填则使用默认表）
+    
+    用途：重新排列章节顺序，例如把某一节移动到最前面。"""
+    try:
+        count = get_db().reorder_children(parent_id, ordered_ids, document_name)
+        return f"Successfully reordered {count} children of node {parent_id if parent_id else 'root'}"
+    except ValueError as e:
+        return f"Error: {str(e)}"
+    except Exception as e:
+        return f"Failed to reorder children: {str(e)}"
+
+@mutation_tool()
 def delete_document(document_name: str) -> str:
     """删除整个文档及其对应的数据表。
     
@@ -370,7 +980,7 @@ def delete_document(document_name: str) -> str:
     
     用途：清理不再需要的文档，释放存储空间。请在执行前确认文档确实不再需要。"""
     try:
-        success = db.delete_document(document_name)
+        success = get_db().delete_document(document_name)
         if success:
             return f"Successfully deleted document '{document_name}'"
         else:
@@ -378,7 +988,124 @@ def delete_document(document_name: str) -> str:
     except Exception as e:
         return f"Failed to delete document: {str(e)}"
 
+@mutation_tool()
+def clone_document(source_document: str, target_document: str, title: Optional[str] = None) -> str:
+    """复制整个文档为一个新文档，保留全部节点、层级结构和时间戳。
+    
+    参数：
+    - source_document: 要复制的源文档名称
+    - target_document: 新文档名称（不能与已有文档重名）
+    - title: 新文档标题（可选，默认沿用源文档标题）
+    
+    操作：
+    - 按ID顺序流式读取源文档节点，批量写入新文档，内存占用恒定
+    - 节点ID保持不变，父子关系和排序无需重新计算
+    
+    用途：基于现有文档创建模板副本、做修改前的分支或实验性改写。"""
+    try:
+        report = run_clone(get_db(), source_document, target_document, title)
+        return f"Successfully cloned '{source_document}' to '{target_document}' " \
+               f"({report['nodes']} nodes, {report['duration_seconds']:.2f}s)"
+    except ValueError as e:
+        return f"Error: {str(e)}"
+    except Exception as e:
+        return f"Failed to clone document: {str(e)}"
+
+@mcp.tool()
+def backup_database(target_path: Optional[str] = None, compact: bool = False) -> str:
+    """在服务运行期间在线备份数据库，不阻塞其他写入操作。
+    
+    参数：
+    - target_path: 备份文件路径（可选，不填则在备份目录生成带时间戳的文件名）
+    - compact: 是否生成压缩整理后的快照（VACUUM INTO），默认False
+    
+    操作：
+    - 默认使用SQLite在线备份API按页分批复制，每批之间让出写锁
+    - compact模式生成去除空闲页的紧凑副本，适合归档或传输
+    
+    用途：在大规模修改前或定期对文档库做安全备份。"""
+    import os
+    from datetime import datetime
+    
+    try:
+        if not target_path:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            suffix = "snapshot" if compact else "backup"
+            target_path = os.path.join(config.get_backup_directory(), f"documents_{suffix}_{timestamp}.db")
+        
+        source_path = get_db().db_path
+        if compact:
+            report = snapshot_database(source_path, target_path)
+        else:
+            report = run_backup(source_path, target_path)
+        
+        return f"备份完成（{report['mode']}）：{report['target']}\n" \
+               f"大小：{report['size_bytes']:,} 字节\n" \
+               f"耗时：{report['duration_seconds']:.2f} 秒"
+    except FileExistsError as e:
+        return f"Error: {str(e)}"
+    except Exception as e:
+        return f"备份失败：{str(e)}"
+
 @mcp.tool()
+def export_ndjson(document_name: Optional[str] = None, filename: Optional[str] = None) -> str:
+    """将节点无损导出为NDJSON文件（每行一个JSON对象），用于与其他系统交换数据。
+    
+    参数：
+    - document_name: 要导出的文档名称（可选，不填则导出整个数据库）
+    - filename: 输出文件名（可选，不填则自动生成带时间戳的文件名）
+    
+    导出内容：
+    - 文档记录：名称、标题、描述
+    - 节点记录：ID、父节点ID、标题、内容、类型、层级、排序、元数据和时间戳
+    
+    用途：批量同步、迁移或备份节点数据，比Markdown导出更快且不丢失结构信息。"""
+    import os
+    from datetime import datetime
+    
+    try:
+        if not filename:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            filename = f"{document_name or 'all'}_{timestamp}.ndjson"
+        elif not filename.endswith('.ndjson'):
+            filename += '.ndjson'
+        
+        file_path = os.path.join(config.get_export_directory(), filename)
+        with open(file_path, 'w', encoding='utf-8') as f:
+            counts = run_ndjson_export(get_db(), f, document_name)
+        
+        return f"Successfully exported {counts['nodes']} nodes " \
+               f"({counts['documents']} documents) to: {file_path}"
+    except ValueError as e:
+        return f"Error: {str(e)}"
+    except Exception as e:
+        return f"Failed to export NDJSON: {str(e)}"
+
+@mutation_tool()
+def import_ndjson(file_path: str, document_name: Optional[str] = None) -> str:
+    """从NDJSON文件流式导入节点，按节点ID插入或更新。
+    
+    参数：
+    - file_path: NDJSON文件路径（由export_ndjson或其他系统生成）
+    - document_name: 目标文档名称（可选，填写则所有节点导入该文档，不存在时自动创建）
+    
+    操作：
+    - 逐行读取、分批写入，内存占用与文件大小无关
+    - 自动创建文件中出现但尚不存在的文档
+    - 节点ID已存在时覆盖原节点，重复导入同一文件结果不变
+    
+    用途：从其他系统批量同步节点，或恢复export_ndjson导出的数据。"""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            counts = run_ndjson_import(get_db(), f, document_name)
+        return f"Successfully imported {counts['nodes']} nodes " \
+               f"({counts['documents_created']} documents created) from: {file_path}"
+    except (ValueError, FileNotFoundError) as e:
+        return f"Error: {str(e)}"
+    except Exception as e:
+        return f"Failed to import NDJSON: {str(e)}"
+
+@mutation_tool()
 def import_markdown_file(
     file_path: str,
     document_name: Optional[str] = None
@@ -397,7 +1124,7 @@ def import_markdown_file(
     
     用途：导入单个Markdown文档，保持原有结构和层次关系。"""
     try:
-        result = markdown_importer.import_file(file_path, document_name)
+        result = get_markdown_importer().import_file(file_path, document_name)
         
         return f"✓ 成功导入文档: {result['document_name']}\n" \
                f"表名: {result['table_name']}\n" \
@@ -411,7 +1138,7 @@ def import_markdown_file(
     except Exception as e:
         return f"导入失败：{str(e)}"
 
-@mcp.tool()
+@mutation_tool()
 def import_markdown_batch(
     file_patterns: List[str],
     skip_errors: bool = True
@@ -430,7 +1157,7 @@ def import_markdown_batch(
     
     用途：批量导入文档目录或多个相关文档到系统中。"""
     try:
-        result = markdown_importer.import_batch(file_patterns, skip_errors)
+        result = get_markdown_importer().import_batch(file_patterns, skip_errors)
         
         # 构建结果摘要
         summary = f"=== 批量导入完成 ===\n"
@@ -0,0 +1,137 @@
+"""
+Single writer thread with group commit.
+
+Concurrent writers on separate connections each take SQLite's write lock in
+turn and fail with "database is locked" once the busy timeout runs out.
+WriteQueue instead runs every mutation on one connection owned by a
+dedicated thread: operations are queued, executed one after another inside a
+shared transaction, and committed together once the queue is drained or a
+batch is full. Each operation runs in its own savepoint, so one failing
+operation is rolled back alone, and callers get their results through
+futures that complete only after the commit that made their change durable.
+"""
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# An operation receives the writer's connection and returns its result
+Operation = Callable[[sqlite3.Connection], Any]
+
+_STOP = object()
+
+
+class WriteQueue:
+    """Serializes write operations onto one connection and commits them in groups."""
+
+    def __init__(self,
+                 connect: Callable[[], sqlite3.Connection],
+                 max_batch: int = 64,
+                 max_delay: float = 0.0):
+        """Create a writer; connect opens the connection the writer thread uses.
+
+        A group is committed when max_batch operations have run, or when the
+        queue is empty and max_delay seconds have passed since the group's
+        first operation (0 commits as soon as the queue runs dry).
+        """
+        self.connect = connect
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.commits = 0
+        self.operations = 0
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start the writer thread if it is not already running."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="lumina-docs-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Commit queued operations and stop the writer thread."""
+        if self._thread and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    def in_writer_thread(self) -> bool:
+        """Check if the caller is the writer thread itself."""
+        return threading.current_thread() is self._thread
+
+    def submit(self, operation: Operation) -> "Future[Any]":
+        """Queue an operation, returning a future for its result."""
+        if not (self._thread and self._thread.is_alive()):
+            raise RuntimeError("Writer thread is not running")
+        future: "Future[Any]" = Future()
+        self._queue.put((operation, future))
+        return future
+
+    def _run(self) -> None:
+        """Take operations off the queue and run them in committed groups until stopped."""
+        conn = self.connect()
+        conn.isolation_level = None
+        try:
+            stopping = False
+            while not stopping:
+                item = self._queue.get()
+                if item is _STOP:
+                    break
+                group = [item]
+                started = time.monotonic()
+                while len(group) < self.max_batch:
+                    timeout = self.max_delay - (time.monotonic() - started)
+                    try:
+                        item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    group.append(item)
+                self._run_group(conn, group)
+        finally:
+            conn.close()
+
+    def _run_group(self, conn: sqlite3.Connection, group: List[Tuple[Operation, "Future[Any]"]]) -> None:
+        """Run a group of operations in one transaction and complete their futures."""
+        outcomes: List[Tuple["Future[Any]", bool, Any]] = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for operation, future in group:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                conn.execute("SAVEPOINT operation")
+                try:
+                    result = operation(conn)
+                except BaseException as e:
+                    conn.execute("ROLLBACK TO operation")
+                    conn.execute("RELEASE operation")
+                    outcomes.append((future, False, e))
+                else:
+                    conn.execute("RELEASE operation")
+                    outcomes.append((future, True, result))
+            conn.execute("COMMIT")
+        except Exception as e:
+            logger.exception("Group commit failed")
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for operation, future in group:
+                if not future.done():
+                    if not future.running():
+                        future.set_running_or_notify_cancel()
+                    future.set_exception(e)
+            return
+
+        self.commits += 1
+        self.operations += len(outcomes)
+        for future, succeeded, value in outcomes:
+            if succeeded:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
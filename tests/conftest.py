@@ -0,0 +1,12 @@
+"""Shared fixtures for the document database tests."""
+import pytest
+
+from doc_manager.database import DocumentDatabase
+
+
+@pytest.fixture
+def db(tmp_path):
+    """A fresh database with one named document, 'Guide'."""
+    database = DocumentDatabase(str(tmp_path / "documents.db"))
+    database.create_document("Guide", "Guide")
+    return database
@@ -0,0 +1,41 @@
+"""Tests for the change log read by incremental consumers."""
+
+
+def age_change_log(db, days):
+    """Backdate every change log entry by the given number of days."""
+    with db.get_connection() as conn:
+        conn.execute("UPDATE change_log SET changed_at = datetime('now', ?)", (f"-{days} days",))
+        conn.commit()
+
+
+def test_changes_are_read_in_order_from_cursor(db):
+    node_id = db.create_node("Root", "section", document_name="Guide")
+    db.update_node(node_id, title="Renamed", document_name="Guide")
+    
+    batch = db.get_changes_since(0)
+    assert [change['op'] for change in batch['changes']] == ['create_document', 'create', 'update']
+    assert not batch['has_more'] and not batch['resync_required']
+    assert db.get_changes_since(batch['cursor'])['changes'] == []
+
+
+def test_resync_required_when_entries_after_cursor_were_pruned(db):
+    db.create_node("Root", "section", document_name="Guide")
+    cursor = db.get_changes_since(0, limit=1)['cursor']
+    db.create_node("Second", "section", document_name="Guide")
+    age_change_log(db, 10)
+    db.create_node("Third", "section", document_name="Guide")
+    
+    db.prune_changes(5)
+    assert db.get_changes_since(cursor)['resync_required']
+
+
+def test_resync_required_when_whole_log_was_pruned(db):
+    db.create_node("Root", "section", document_name="Guide")
+    cursor = db.get_changes_since(0, limit=1)['cursor']
+    latest = db.get_changes_since(0)['cursor']
+    age_change_log(db, 10)
+    
+    assert db.prune_changes(5) > 0
+    assert db.get_changes_since(cursor)['resync_required']
+    caught_up = db.get_changes_since(latest)
+    assert caught_up['changes'] == [] and not caught_up['resync_required']
@@ -0,0 +1,138 @@
+"""Tests for node operations on the table of a named document."""
+import sys
+
+import pytest
+
+from doc_manager.cli import main
+from doc_manager.database import VersionConflictError
+
+
+@pytest.fixture
+def tree(db):
+    """Root > Chapter > Section in the Guide document, plus a second root."""
+    root = db.create_node("Root", "document", document_name="Guide")
+    chapter = db.create_node("Chapter", "chapter", parent_id=root, document_name="Guide")
+    section = db.create_node("Section", "section", parent_id=chapter, content="text", document_name="Guide")
+    other = db.create_node("Other", "document", document_name="Guide")
+    return {'root': root, 'chapter': chapter, 'section': section, 'other': other}
+
+
+def test_update_node_in_document(db, tree):
+    node = db.get_node(tree['section'], "Guide")
+    assert db.update_node(tree['section'], title="Renamed", content="new",
+                          expected_version=node['version'], document_name="Guide")
+    
+    updated = db.get_node(tree['section'], "Guide")
+    assert (updated['title'], updated['content'], updated['version']) == ("Renamed", "new", node['version'] + 1)
+    assert db.get_node(tree['section']) is None
+    with pytest.raises(VersionConflictError):
+        db.update_node(tree['section'], title="Stale", expected_version=node['version'], document_name="Guide")
+
+
+def test_update_missing_node_in_document(db, tree):
+    assert not db.update_node(999, title="Nothing", document_name="Guide")
+
+
+def test_delete_node_in_document_removes_subtree(db, tree):
+    assert db.delete_node(tree['chapter'], document_name="Guide") == 2
+    assert db.get_node(tree['chapter'], "Guide") is None
+    assert db.get_node(tree['section'], "Guide") is None
+    assert [node['id'] for node in db.get_children(None, "Guide")] == [tree['root'], tree['other']]
+
+
+def test_move_node_in_document_updates_levels(db, tree):
+    assert db.move_node(tree['chapter'], tree['other'], document_name="Guide")
+    assert db.get_node(tree['chapter'], "Guide")['parent_id'] == tree['other']
+    assert db.get_node(tree['section'], "Guide")['level'] == 3
+    
+    db.move_node(tree['chapter'], None, document_name="Guide")
+    assert db.get_node(tree['section'], "Guide")['level'] == 2
+    with pytest.raises(ValueError):
+        db.move_node(tree['chapter'], tree['section'], document_name="Guide")
+
+
+def test_get_node_path_in_document(db, tree):
+    path = db.get_node_path(tree['section'], "Guide")
+    assert [node['id'] for node in path] == [tree['root'], tree['chapter'], tree['section']]
+    assert db.get_node_path(tree['section']) == []
+
+
+def test_unknown_document_raises(db):
+    with pytest.raises(ValueError):
+        db.update_node(1, title="Nothing", document_name="Missing")
+
+
+def run_cli(monkeypatch, capsys, db, *args):
+    """Run the CLI against db's file and return its output."""
+    monkeypatch.setattr(sys, "argv", ["lumina-docs", "--db", db.db_path, *args])
+    main()
+    return capsys.readouterr().out
+
+
+def test_cli_mutations_on_document(monkeypatch, capsys, db):
+    cli = lambda *args: run_cli(monkeypatch, capsys, db, *args, "--document", "Guide")
+    
+    assert "Created node with ID: 1" in cli("create", "Root", "document")
+    cli("create", "Chapter", "chapter", "--parent-id", "1")
+    cli("create", "Other", "document")
+    assert db.get_node(2, "Guide")['parent_id'] == 1
+    assert db.get_node(1) is None
+    
+    assert "Successfully updated" in cli("update", "2", "--title", "Intro", "--expected-version", "1")
+    assert "Successfully patched" in cli("patch-metadata", "2", '{"status": "done"}')
+    assert "Successfully moved" in cli("move", "2", "--parent-id", "3")
+    assert "Other (3) > Intro (2)" in cli("path", "2")
+    assert "Intro" in cli("list", "--parent-id", "3")
+    assert "Intro" in cli("search", "--query", "Intro")
+    assert "Intro" in cli("tree")
+    assert "Intro" in cli("by-type", "chapter")
+    assert "Intro" in cli("export")
+    assert "Successfully deleted node 3" in cli("delete", "3")
+    assert db.get_node(2, "Guide") is None
+
+
+def test_cli_render_document(monkeypatch, capsys, db, tmp_path):
+    db.create_node("Guide root", "document", document_name="Guide")
+    db.create_node("Default root", "document")
+    output = run_cli(monkeypatch, capsys, db, "render", "--document", "Guide", "--name", "guide",
+                     "--output-dir", str(tmp_path))
+    assert "Exported 1 nodes" in output
+    text = (tmp_path / "guide.md").read_text(encoding="utf-8")
+    assert "Guide root" in text and "Default root" not in text
+
+
+def test_delete_missing_document(db):
+    assert not db.delete_document("Missing")
+
+
+def test_failed_delete_document_rolls_back(db, tree, monkeypatch):
+    def fail(*args):
+        raise RuntimeError("log unavailable")
+    monkeypatch.setattr(db, '_log_document_change', fail)
+    
+    with pytest.raises(RuntimeError):
+        db.delete_document("Guide")
+    
+    assert db.get_document("Guide")
+    assert db.get_node(tree['section'], "Guide")['content'] == "text"
+    
+    monkeypatch.undo()
+    assert db.delete_document("Guide")
+    assert db.get_document("Guide") is None
+
+
+def test_iter_tree_follows_sibling_order_with_negative_sort_orders(db):
+    orders = [5, -1, 0, -2**63, 2**63 - 1, -10, 3, -1]
+    root = db.create_node("Root", "document", sort_order=-7, document_name="Guide")
+    for index, order in enumerate(orders):
+        parent = db.create_node(f"Node {index}", "section", parent_id=root, sort_order=order, document_name="Guide")
+        for child_order in orders[:3]:
+            db.create_node("Child", "section", parent_id=parent, sort_order=child_order, document_name="Guide")
+    db.create_node("Later", "document", sort_order=-8, document_name="Guide")
+    
+    def walk(parent_id):
+        for node in db.get_children(parent_id, "Guide"):
+            yield node['id']
+            yield from walk(node['id'])
+    
+    assert [node['id'] for node in db.iter_tree(document_name="Guide")] == list(walk(None))
@@ -0,0 +1,39 @@
+"""Tests for document dump files."""
+from doc_manager.dump import clone_document, dump_document, load_document
+
+
+def test_dump_and_load_keep_every_node_column(db, tmp_path):
+    root = db.create_node("Root", "document", content="body", metadata={"a": 1}, document_name="Guide")
+    child = db.create_node("Child", "section", parent_id=root, document_name="Guide")
+    for step in range(3):
+        db.update_node(child, title=f"Child {step}", document_name="Guide")
+    
+    path = str(tmp_path / "guide.ldoc")
+    dump_document(db, "Guide", path)
+    load_document(db, path, document_name="Copy")
+    
+    assert list(db.iter_nodes("Copy")) == list(db.iter_nodes("Guide"))
+    assert db.get_node(child, "Copy")['version'] == 4
+
+
+def test_bulk_load_never_moves_a_version_back(db):
+    node_id = db.create_node("Root", "document", document_name="Guide")
+    for step in range(4):
+        db.update_node(node_id, title=f"Root {step}", document_name="Guide")
+    
+    db.bulk_load_nodes([{'id': node_id, 'title': "Loaded", 'node_type': "document", 'version': 2}], "Guide")
+    assert db.get_node(node_id, "Guide")['version'] == 6
+
+
+def test_clone_document_larger_than_page_cache(db):
+    # About 6 MB of bodies, well past SQLite's default 2 MB page cache
+    db.bulk_load_nodes((
+        {'id': node_id, 'parent_id': node_id // 8 or None, 'title': f"Section {node_id}",
+         'node_type': "section", 'sort_order': node_id, 'content': f"{node_id:06d} " * 220}
+        for node_id in range(1, 4001)
+    ), "Guide")
+    
+    report = clone_document(db, "Guide", "Copy")
+    
+    assert report['nodes'] == 4000
+    assert list(db.iter_nodes("Copy")) == list(db.iter_nodes("Guide"))
@@ -0,0 +1,20 @@
+"""Tests for database maintenance."""
+from doc_manager.maintenance import run_maintenance
+
+
+def test_sweep_and_prune_go_through_the_given_writer(db):
+    db.start_writer()
+    try:
+        root = db.create_node("Root", "document", document_name="Guide")
+        child = db.create_node("Child", "section", parent_id=root, document_name="Guide")
+        with db.writer.connect() as conn:
+            conn.execute("DELETE FROM doc_guide WHERE id = ?", (root,))
+        before = db.writer.operations
+        
+        report = run_maintenance(db.db_path, analyze=False, vacuum=False, integrity=False, database=db)
+        
+        assert db.writer.operations == before + 2
+        assert report['steps'][0]['step'] == 'sweep_orphans' and report['steps'][0]['nodes'] == 1
+        assert db.get_node(child, "Guide") is None
+    finally:
+        db.stop_writer()
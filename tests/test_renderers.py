@@ -0,0 +1,16 @@
+"""Tests for exporting documents to files."""
+from doc_manager.renderers import export_all
+
+
+def test_export_all_keeps_directories_distinct_ignoring_case(db, tmp_path):
+    db.create_document("Guide one", "First")
+    db.create_document("guide?one", "Second")
+    db.create_node("First root", "document", document_name="Guide one")
+    db.create_node("Second root", "document", document_name="guide?one")
+    
+    report = export_all(db, ["markdown"], document_names=["Guide one", "guide?one"],
+                        output_dir=str(tmp_path))
+    
+    assert not report['failed']
+    directories = [path.name.lower() for path in tmp_path.iterdir() if path.is_dir()]
+    assert len(directories) == len(set(directories)) == 2
@@ -0,0 +1,34 @@
+"""Tests for the error responses of the MCP server tools."""
+import sqlite3
+
+import pytest
+
+simple_server = pytest.importorskip("doc_manager.simple_server")
+
+
+@pytest.fixture
+def server_db(db, monkeypatch):
+    """Point the server's tools at the test database."""
+    monkeypatch.setattr(simple_server, "_db", db)
+    return db
+
+
+@pytest.mark.parametrize("tool, args", [
+    ("update_node", {'node_id': 1, 'title': "New"}),
+    ("delete_node", {'node_id': 1}),
+    ("move_node", {'node_id': 1, 'new_parent_id': None}),
+])
+def test_node_tools_report_unexpected_errors(server_db, monkeypatch, tool, args):
+    def fail(*args, **kwargs):
+        raise sqlite3.OperationalError("database is locked")
+    
+    monkeypatch.setattr(server_db, tool, fail)
+    result = getattr(simple_server, tool)(**args)
+    assert result.startswith("Failed to") and "database is locked" in result
+
+
+def test_node_tools_report_version_conflicts(server_db):
+    node_id = server_db.create_node("Root", "document")
+    server_db.update_node(node_id, title="Changed")
+    result = simple_server.update_node(node_id, title="Stale", expected_version=1)
+    assert result.startswith("Error:") and "version" in result
@@ -0,0 +1,91 @@
+"""Tests for copy-on-write document snapshots."""
+import random
+
+import pytest
+
+from doc_manager.database import DocumentDatabase
+
+
+def node_state(db, document_name="Guide"):
+    """Comparable (id, parent, title, content, level, sort_order, metadata) tuples of a document."""
+    return sorted(
+        (n['id'], n['parent_id'], n['title'], n['content'], n['level'], n['sort_order'], n['metadata'])
+        for n in db.iter_nodes(document_name)
+    )
+
+
+def test_restore_undoes_changes_since_snapshot(db):
+    root = db.create_node("Root", "section", content="root", document_name="Guide")
+    child = db.create_node("Child", "section", content="child", parent_id=root, document_name="Guide")
+    other = db.create_node("Other", "section", document_name="Guide")
+    before = node_state(db)
+    
+    db.create_snapshot("before", "Guide")
+    db.update_node(root, title="Renamed", content="changed", document_name="Guide")
+    db.move_node(child, other, document_name="Guide")
+    db.create_node("New", "section", parent_id=child, document_name="Guide")
+    db.delete_node(other, document_name="Guide")
+    
+    diff = db.diff_snapshots("before", document_name="Guide")
+    assert [node['id'] for node in diff['removed']] == [child, other]
+    assert diff['changed'] == [{'id': root, 'title': "Renamed", 'fields': ['title', 'content']}]
+    
+    assert db.restore_snapshot("before", "Guide") == {'restored': 3, 'deleted': 0}
+    assert node_state(db) == before
+    assert db.diff_snapshots("before", document_name="Guide") == {'added': [], 'removed': [], 'changed': []}
+
+
+def test_unknown_or_duplicate_snapshot_raises(db):
+    db.create_snapshot("first", "Guide")
+    with pytest.raises(ValueError):
+        db.create_snapshot("first", "Guide")
+    with pytest.raises(ValueError):
+        db.restore_snapshot("missing", "Guide")
+
+
+def test_restore_does_not_serve_stale_cached_export(db):
+    assert db.export_cache is not None
+    node_id = db.create_node("Old title", "section", document_name="Guide")
+    # Cache the node's export at the subtree_version a recreated row would restart from
+    assert "Old title" in db.export_tree_to_markdown(document_name="Guide")
+    db.update_node(node_id, title="New title", document_name="Guide")
+    db.create_snapshot("snap", "Guide")
+    db.delete_node(node_id, document_name="Guide")
+    db.restore_snapshot("snap", "Guide")
+    
+    assert db.get_node(node_id, "Guide")['title'] == "New title"
+    assert "New title" in db.export_tree_to_markdown(document_name="Guide")
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_cached_export_matches_uncached_with_restores(db, seed):
+    rng = random.Random(seed)
+    uncached = DocumentDatabase(db.db_path)
+    uncached.export_cache = None
+    db.create_snapshot("start", "Guide")
+    
+    actions = ["create"] * 3 + ["update"] * 2 + ["delete"] * 2 + ["move", "snapshot"] + ["restore"] * 2
+    for step in range(100):
+        node_ids = [node['id'] for node in db.iter_nodes("Guide")]
+        action = rng.choice(actions)
+        if action == "create" or not node_ids:
+            parent_id = rng.choice(node_ids) if node_ids and rng.random() < 0.7 else None
+            db.create_node(f"Node {step}", "section", content=f"Body {step}",
+                           parent_id=parent_id, document_name="Guide")
+        elif action == "update":
+            db.update_node(rng.choice(node_ids), title=f"Title {step}", document_name="Guide")
+        elif action == "delete":
+            db.delete_node(rng.choice(node_ids), document_name="Guide")
+        elif action == "move":
+            try:
+                db.move_node(rng.choice(node_ids), rng.choice(node_ids + [None]), document_name="Guide")
+            except ValueError:
+                pass
+        elif action == "snapshot":
+            db.create_snapshot(f"snap {step}", "Guide")
+        else:
+            snapshot = rng.choice(db.list_snapshots("Guide"))
+            db.restore_snapshot(snapshot['name'], "Guide")
+        
+        assert db.export_tree_to_markdown(document_name="Guide") == \
+            uncached.export_tree_to_markdown(document_name="Guide")